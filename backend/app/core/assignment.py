@@ -0,0 +1,117 @@
+import logging
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+ASSIGNMENT_MODES = ('none', 'greedy', 'optimal')
+
+# Componentes maiores que isso (linhas × colunas) são resolvidos pelo guloso
+MAX_COMPONENT_CELLS = 4_000_000
+
+# Custo atribuído a pares inexistentes na matriz densa de um componente
+MISSING_EDGE_COST = 1e6
+
+logger = logging.getLogger(__name__)
+
+
+def pair_costs(day_diff: np.ndarray, cents_diff: np.ndarray, similarity: np.ndarray,
+               date_tolerance_days: int, tolerance_cents: int) -> np.ndarray:
+    """Custo de cada par candidato: distância de data + distância de valor + (1 - similaridade).
+
+    Cada termo é normalizado para 0..1 pela respectiva tolerância.
+    """
+    date_cost = np.abs(day_diff) / (date_tolerance_days + 1)
+    value_cost = np.abs(cents_diff) / (tolerance_cents + 1)
+    return date_cost + value_cost + (1.0 - similarity)
+
+
+def assign_greedy(bank_pos: np.ndarray, internal_pos: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """Pareamento um-para-um guloso: aceita os pares de menor custo cujos lados estão livres.
+
+    Retorna a máscara booleana dos pares escolhidos.
+    """
+    chosen = np.zeros(len(cost), dtype=bool)
+    used_bank = set()
+    used_internal = set()
+
+    # Desempate determinístico pela ordem original (banco, interno)
+    for k in np.lexsort((internal_pos, bank_pos, cost)).tolist():
+        b = bank_pos[k]
+        i = internal_pos[k]
+        if b in used_bank or i in used_internal:
+            continue
+        used_bank.add(b)
+        used_internal.add(i)
+        chosen[k] = True
+
+    return chosen
+
+
+def _components(bank_pos: np.ndarray, internal_pos: np.ndarray) -> np.ndarray:
+    """Rotula cada par com o componente conexo do grafo bipartido de candidatos"""
+    bank_nodes, bank_local = np.unique(bank_pos, return_inverse=True)
+    internal_nodes, internal_local = np.unique(internal_pos, return_inverse=True)
+    n_bank = len(bank_nodes)
+    n_nodes = n_bank + len(internal_nodes)
+
+    graph = coo_matrix(
+        (np.ones(len(bank_pos), dtype=np.int8), (bank_local, internal_local + n_bank)),
+        shape=(n_nodes, n_nodes)
+    )
+    _, labels = connected_components(graph, directed=False)
+    return labels[bank_local]
+
+
+def assign_optimal(bank_pos: np.ndarray, internal_pos: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """Pareamento um-para-um ótimo (Húngaro) resolvido por componente conexo.
+
+    Cada componente do grafo de candidatos vira uma pequena matriz de custo
+    independente; pares isolados são aceitos diretamente. Retorna a máscara
+    booleana dos pares escolhidos.
+    """
+    n = len(cost)
+    chosen = np.zeros(n, dtype=bool)
+    if n == 0:
+        return chosen
+
+    labels = _components(bank_pos, internal_pos)
+    order = np.argsort(labels, kind='stable')
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+
+    for group in np.split(order, boundaries):
+        if len(group) == 1:
+            chosen[group[0]] = True
+            continue
+
+        rows, row_idx = np.unique(bank_pos[group], return_inverse=True)
+        cols, col_idx = np.unique(internal_pos[group], return_inverse=True)
+
+        if len(rows) * len(cols) > MAX_COMPONENT_CELLS:
+            logger.debug("⚠️ Componente com %dx%d pares: usando pareamento guloso", len(rows), len(cols))
+            chosen[group] = assign_greedy(bank_pos[group], internal_pos[group], cost[group])
+            continue
+
+        matrix = np.full((len(rows), len(cols)), MISSING_EDGE_COST)
+        edge_of = np.full((len(rows), len(cols)), -1, dtype=np.int64)
+        matrix[row_idx, col_idx] = cost[group]
+        edge_of[row_idx, col_idx] = group
+
+        r, c = linear_sum_assignment(matrix)
+        edges = edge_of[r, c]
+        chosen[edges[edges >= 0]] = True
+
+    return chosen
+
+
+def assign(bank_pos: np.ndarray, internal_pos: np.ndarray, cost: np.ndarray,
+           mode: str = 'optimal') -> np.ndarray:
+    """Aplica o modo de pareamento escolhido e retorna a máscara dos pares mantidos"""
+    if mode == 'none':
+        return np.ones(len(cost), dtype=bool)
+    if mode == 'greedy':
+        return assign_greedy(bank_pos, internal_pos, cost)
+    if mode == 'optimal':
+        return assign_optimal(bank_pos, internal_pos, cost)
+    raise ValueError(f"Modo de pareamento '{mode}' não suportado. Opções: {list(ASSIGNMENT_MODES)}")
@@ -0,0 +1,168 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+# Valor sem "R$" com sinal opcional à esquerda (ex.: -1.234,56)
+AMOUNT = r'-?\s?\d{1,3}(?:\.\d{3})*,\d{2}'
+
+MONTHS_PT = {'JAN': 1, 'FEV': 2, 'MAR': 3, 'ABR': 4, 'MAI': 5, 'JUN': 6,
+             'JUL': 7, 'AGO': 8, 'SET': 9, 'OUT': 10, 'NOV': 11, 'DEZ': 12}
+
+# Colunas de saída (data ISO, descrição, centavos com sinal)
+Columns = Tuple[List[str], List[str], List[int]]
+
+
+@lru_cache(maxsize=4096)
+def parse_dmy_date(date_str: str) -> Optional[str]:
+    """dd/mm/aaaa -> aaaa-mm-dd (None se inválida); extratos repetem muito as mesmas datas"""
+    try:
+        return datetime.strptime(date_str, '%d/%m/%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def parse_month_name_date(date_str: str) -> Optional[str]:
+    """'05 JAN 2025' (mês abreviado em português) -> 2025-01-05"""
+    try:
+        day, month, year = date_str.split()
+        return datetime(int(year), MONTHS_PT[month.upper()], int(day)).strftime('%Y-%m-%d')
+    except (KeyError, ValueError):
+        return None
+
+
+def parse_amount_cents(amount: str) -> int:
+    """'-1.234,56' -> -123456"""
+    negative = amount.startswith('-')
+    int_part, dec = amount.lstrip('- ').split(',')
+    cents = int(int_part.replace('.', '')) * 100 + int(dec)
+    return -cents if negative else cents
+
+
+class BankLayout:
+    """Perfil de layout de extrato de um banco.
+
+    ``fingerprint`` identifica o banco na primeira página. ``line_pattern`` é
+    aplicado com fullmatch em cada linha e deve ter os grupos ``description`` e
+    ``value``, e opcionalmente ``date`` (linhas sem data herdam a anterior).
+    Convenções de sinal:
+
+    - ``'minus'``: débitos vêm com "-" no valor;
+    - ``'section'``: o sinal vem da seção corrente (``section_patterns``), como
+      "Total de entradas" / "Total de saídas".
+
+    Linhas que casam com ``skip_pattern`` (saldos, cabeçalhos) são ignoradas.
+    """
+
+    def __init__(self, name: str, fingerprint: str, line_pattern: str,
+                 date_parser: Callable[[str], Optional[str]] = parse_dmy_date,
+                 sign_convention: str = 'minus',
+                 section_patterns: Sequence[Tuple[str, int]] = (),
+                 skip_pattern: Optional[str] = None):
+        self.name = name
+        self.fingerprint: Pattern = re.compile(fingerprint, re.IGNORECASE | re.MULTILINE)
+        self.line_pattern: Pattern = re.compile(line_pattern)
+        self.date_parser = date_parser
+        self.sign_convention = sign_convention
+        self.section_patterns = [(re.compile(p, re.IGNORECASE), sign) for p, sign in section_patterns]
+        self.skip_pattern: Optional[Pattern] = re.compile(skip_pattern, re.IGNORECASE) if skip_pattern else None
+
+    def parse_lines(self, lines: Iterable[str]) -> Columns:
+        """Extrator do layout: uma fullmatch por linha, direto para as colunas"""
+        fullmatch = self.line_pattern.fullmatch
+        skip = self.skip_pattern.search if self.skip_pattern else None
+        sections = self.section_patterns
+        use_section_sign = self.sign_convention == 'section'
+        dates: List[str] = []
+        descriptions: List[str] = []
+        cents: List[int] = []
+        current_date = None
+        section_sign = 1
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            match = fullmatch(line)
+            if match is None:
+                continue
+            date = match.group('date')
+            if date is not None:
+                current_date = self.date_parser(date)
+
+            if sections:
+                section = next((sign for pattern, sign in sections if pattern.search(line)), None)
+                if section is not None:
+                    section_sign = section
+                    continue
+            if skip is not None and skip(line):
+                continue
+            if current_date is None:
+                continue
+
+            value = parse_amount_cents(match.group('value'))
+            if use_section_sign:
+                value = section_sign * abs(value)
+            dates.append(current_date)
+            descriptions.append(match.group('description'))
+            cents.append(value)
+
+        return dates, descriptions, cents
+
+
+LAYOUTS: Dict[str, BankLayout] = {}
+
+
+def register_layout(layout: BankLayout) -> BankLayout:
+    """Adiciona (ou substitui) um perfil no registro"""
+    LAYOUTS[layout.name] = layout
+    return layout
+
+
+def detect_layout(first_page: str) -> Optional[BankLayout]:
+    """Perfil da primeira página (None se nenhum fingerprint aparece).
+
+    O nome de outro banco pode aparecer no texto (ex.: PIX para uma conta
+    Bradesco num extrato Itaú), então cada perfil cujo fingerprint casa extrai
+    as transações da primeira página e vence o que reconhece mais linhas
+    (empate: ordem de registro).
+    """
+    candidates = [layout for layout in LAYOUTS.values() if layout.fingerprint.search(first_page)]
+    if len(candidates) <= 1:
+        return candidates[0] if candidates else None
+    lines = first_page.split('\n')
+    return max(candidates, key=lambda layout: len(layout.parse_lines(lines)[0]))
+
+
+# "05/01/2025 PIX TRANSF FULANO 05/01 -1.234,56" (saldo opcional ao final)
+register_layout(BankLayout(
+    name='itau',
+    fingerprint=r'ita[uú]\s*unibanco|banco\s+ita[uú]|\bita[uú]\b.*extrato',
+    line_pattern=rf'(?P<date>\d{{2}}/\d{{2}}/\d{{4}})\s+(?P<description>.*?\S)\s+(?P<value>{AMOUNT})'
+                 rf'(?:\s+{AMOUNT})?',
+    skip_pattern=r'\bSALDO\b',
+))
+
+# "05/01/2025 TRANSFERENCIA PIX 1234567 -1.234,56 10.000,00" (data só na 1ª linha do dia)
+register_layout(BankLayout(
+    name='bradesco',
+    # Cabeçalho do extrato, não qualquer menção ao banco
+    fingerprint=r'banco\s+bradesco|bradesco\s+(?:s\.?\s?a\b|celular|net\s*empresa)|^\s*bradesco\b.*\bextrato\b',
+    line_pattern=rf'(?:(?P<date>\d{{2}}/\d{{2}}/\d{{4}})\s+)?(?P<description>.*?\S)\s+\d{{1,12}}\s+'
+                 rf'(?P<value>{AMOUNT})\s+{AMOUNT}',
+    skip_pattern=r'SALDO ANTERIOR',
+))
+
+# "05 JAN 2025 Total de saídas - 1.234,56" abre a seção; as linhas seguintes não têm sinal
+register_layout(BankLayout(
+    name='nubank',
+    fingerprint=r'nu\s*pagamentos|nubank',
+    line_pattern=r'(?:(?P<date>\d{2} [A-Za-z]{3} \d{4})\s+)?(?P<description>.*?\S)\s+[-+]?\s?'
+                 rf'(?P<value>{AMOUNT})',
+    date_parser=parse_month_name_date,
+    sign_convention='section',
+    section_patterns=[(r'Total de entradas', 1), (r'Total de sa[ií]das', -1)],
+    skip_pattern=r'Saldo (inicial|final|do dia)|Rendimento l[ií]quido',
+))
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from app.core.candidate_index import CandidateIndex
+from app.core.transaction_batch import TransactionBatch
+
+# Tamanho do bloco lido ao calcular o hash do conteúdo de um arquivo
+HASH_BLOCK_SIZE = 1 << 20
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'conciliacao-cache')
+
+logger = logging.getLogger(__name__)
+
+
+def hash_stream(source: BinaryIO) -> str:
+    """Hash (BLAKE2b) do conteúdo de um arquivo binário, voltando ao início ao final"""
+    digest = hashlib.blake2b(digest_size=20)
+    source.seek(0)
+    for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def hash_arrays(*arrays: np.ndarray) -> str:
+    """Hash do conteúdo binário de arrays NumPy (tipo, forma e dados)"""
+    digest = hashlib.blake2b(digest_size=20)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def hash_key(**parts: Any) -> str:
+    """Chave estável a partir de valores serializáveis em JSON"""
+    payload = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=20).hexdigest()
+
+
+class LRUCache:
+    """Cache em memória com descarte do item usado há mais tempo"""
+
+    def __init__(self, max_items: int = 32):
+        self.max_items = max_items
+        self._items: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class DiskCache:
+    """Cache em disco com limite de tamanho total.
+
+    Cada entrada é um arquivo gravado de forma atômica (temporário + rename), o
+    que permite compartilhar o diretório entre processos. Ao passar de
+    ``max_bytes``, os arquivos acessados há mais tempo são removidos.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def read(self, key: str, suffix: str, reader: Callable[[str], Any]) -> Any:
+        """Lê a entrada com ``reader(path)``; entradas ilegíveis contam como ausentes"""
+        path = self.path(key, suffix)
+        try:
+            value = reader(path)
+            os.utime(path)
+        except (OSError, ValueError, pa.ArrowException, zipfile.BadZipFile):
+            return None
+        return value
+
+    def write(self, key: str, suffix: str, writer: Callable[[str], None]) -> None:
+        """Grava a entrada com ``writer(path)`` e aplica o limite de tamanho"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, self.path(key, suffix))
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def write_batch(batch: TransactionBatch, path: str) -> None:
+    """Grava o lote em Arrow IPC; as descrições vão como coluna de dicionário"""
+    desc_ids = pa.array(batch.desc_ids, mask=batch.desc_ids < 0)
+    columns = {
+        'cents': pa.array(batch.cents),
+        'days': pa.array(batch.days),
+        'description': pa.DictionaryArray.from_arrays(desc_ids, pa.array(batch.descriptions, from_pandas=True)),
+        'row_index': pa.array(batch.row_index),
+    }
+    if batch.ids is not None:
+        columns['ids'] = pa.array(batch.ids, from_pandas=True)
+    table = pa.table(columns)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_batch(path: str) -> TransactionBatch:
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    description = table.column('description').combine_chunks()
+    return TransactionBatch(
+        table.column('cents').to_numpy(),
+        table.column('days').to_numpy(),
+        description.indices.fill_null(-1).to_numpy(),
+        description.dictionary.to_numpy(zero_copy_only=False),
+        table.column('row_index').to_numpy(),
+        table.column('ids').to_numpy() if 'ids' in table.column_names else None
+    )
+
+
+class ReconciliationCache:
+    """Cache em dois níveis para reexecuções da conciliação sobre os mesmos arquivos.
+
+    - entradas: lotes normalizados (TransactionBatch) por hash do conteúdo do
+      arquivo + colunas usadas;
+    - resultados: o ReconciliationResult colunar por (hash do banco, hash do
+      interno, colunas, parâmetros).
+
+    Cada nível tem uma camada LRU em memória e uma camada em disco (Arrow IPC
+    para os lotes, .npz com pares e posições para os resultados). Os índices
+    de candidatos ficam só em memória, por conteúdo de (valor, data), e por
+    isso são reaproveitados quando apenas as tolerâncias mudam.
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_CACHE_DIR, max_bytes: int = 1 << 30,
+                 memory_items: int = 16):
+        self.disk = DiskCache(directory, max_bytes) if directory else None
+        self.batches = LRUCache(memory_items)
+        self.results = LRUCache(memory_items)
+        self.indexes = LRUCache(memory_items)
+
+    def get_batch(self, key: str) -> Optional[TransactionBatch]:
+        batch = self.batches.get(key)
+        if batch is None and self.disk is not None:
+            batch = self.disk.read(key, '.arrow', read_batch)
+            if batch is not None:
+                self.batches.put(key, batch)
+        return batch
+
+    def put_batch(self, key: str, batch: TransactionBatch) -> None:
+        self.batches.put(key, batch)
+        if self.disk is not None:
+            try:
+                self.disk.write(key, '.arrow', lambda path: write_batch(batch, path))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                # Ex.: IDs com tipos misturados; o lote fica só na memória
+                logger.warning("⚠️ Lote não gravado no cache em disco: %s", e)
+
+    def get_result(self, key: str, reader: Callable[[str], Any]) -> Any:
+        """Resultado em memória ou lido do disco com ``reader(path)`` (o arquivo só
+        tem pares e posições; os lotes de entrada vêm do chamador)"""
+        result = self.results.get(key)
+        if result is None and self.disk is not None:
+            result = self.disk.read(key, '.npz', reader)
+            if result is not None:
+                self.results.put(key, result)
+        return result
+
+    def put_result(self, key: str, result: Any) -> None:
+        """Guarda o resultado; em disco ele se grava com ``result.save(path)``"""
+        self.results.put(key, result)
+        if self.disk is not None:
+            self.disk.write(key, '.npz', result.save)
+
+    def candidate_index(self, cents: np.ndarray, days: np.ndarray) -> CandidateIndex:
+        """Índice de candidatos reaproveitado para o mesmo conteúdo de (valor, data)"""
+        key = hash_arrays(cents, days)
+        index = self.indexes.get(key)
+        if index is None:
+            index = CandidateIndex(cents, days)
+            self.indexes.put(key, index)
+        return index
+
+
+_process_caches: Dict[str, ReconciliationCache] = {}
+
+
+def get_cache(directory: str = DEFAULT_CACHE_DIR) -> ReconciliationCache:
+    """Cache único por diretório dentro do processo (usado pelos workers de jobs)"""
+    if directory not in _process_caches:
+        _process_caches[directory] = ReconciliationCache(directory)
+    return _process_caches[directory]
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from typing import Iterator, Tuple
+
+from app.core.normalization import INVALID_CENTS, INVALID_DAY, to_cents, to_day_ordinals
+
+# Número máximo de pares expandidos por bloco de consulta (limita memória)
+MAX_PAIRS_PER_BLOCK = 2_000_000
+
+
+class CandidateIndex:
+    """Índice de candidatos do sistema interno ordenado por (valor, data).
+
+    Substitui a varredura completa do DataFrame interno para cada linha do banco:
+    o lado interno é ordenado uma única vez e os candidatos de cada linha do banco
+    são localizados por busca binária na faixa ``valor ± tolerância``, sendo
+    depois filtrados pela tolerância de datas. Valores em centavos (int64) e
+    datas em dias (int32) tornam as comparações exatas.
+    """
+
+    def __init__(self, cents: np.ndarray, days: np.ndarray):
+        cents = np.asarray(cents, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int32)
+
+        valid = (cents != INVALID_CENTS) & (days != INVALID_DAY)
+        order = np.lexsort((days, cents))
+        self.order = order[valid[order]]
+        self.cents = cents[self.order]
+        self.days = days[self.order]
+
+    @classmethod
+    def from_sorted(cls, order: np.ndarray, cents: np.ndarray, days: np.ndarray) -> 'CandidateIndex':
+        """Índice a partir de arrays já ordenados (ex.: gravados em disco), sem copiá-los"""
+        index = cls.__new__(cls)
+        index.order = order
+        index.cents = cents
+        index.days = days
+        return index
+
+    def restrict(self, positions: np.ndarray) -> 'CandidateIndex':
+        """Índice só das posições indicadas (crescentes), renumeradas para 0..len(positions)-1.
+
+        Filtra o índice já ordenado em tempo linear, sem ordenar de novo.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        local = np.searchsorted(positions, self.order)
+        keep = local < len(positions)
+        keep[keep] = positions[local[keep]] == self.order[keep]
+        return CandidateIndex.from_sorted(local[keep], self.cents[keep], self.days[keep])
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, date_col: str, value_col: str) -> 'CandidateIndex':
+        """Constrói o índice a partir das colunas de data e valor de um DataFrame"""
+        return cls(to_cents(df[value_col]), to_day_ordinals(df[date_col]))
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _blocks(self, counts: np.ndarray) -> Iterator[Tuple[int, int]]:
+        """Divide as consultas em blocos com no máximo MAX_PAIRS_PER_BLOCK pares"""
+        n = len(counts)
+        start = 0
+        cumulative = np.cumsum(counts)
+        while start < n:
+            base = cumulative[start - 1] if start > 0 else 0
+            end = int(np.searchsorted(cumulative, base + MAX_PAIRS_PER_BLOCK, side='right'))
+            end = max(end, start + 1)
+            yield start, end
+            start = end
+
+    def query(self, cents: np.ndarray, days: np.ndarray,
+              tolerance_cents: int, date_tolerance_days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna os pares (posição no banco, posição no interno) dentro das tolerâncias.
+
+        As posições são posicionais (0..n-1) e os pares vêm ordenados por posição
+        do banco e, dentro de cada linha, pela posição original no lado interno.
+        """
+        cents = np.asarray(cents, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int32)
+
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        if len(cents) == 0 or len(self) == 0:
+            return empty
+
+        valid = (cents != INVALID_CENTS) & (days != INVALID_DAY)
+        safe_cents = np.where(valid, cents, 0)
+        lo = np.searchsorted(self.cents, safe_cents - tolerance_cents, side='left')
+        hi = np.searchsorted(self.cents, safe_cents + tolerance_cents, side='right')
+        counts = np.where(valid, hi - lo, 0)
+
+        bank_parts = []
+        internal_parts = []
+        for start, end in self._blocks(counts):
+            block_counts = counts[start:end]
+            total = int(block_counts.sum())
+            if total == 0:
+                continue
+
+            bank_pos = np.repeat(np.arange(start, end, dtype=np.int64), block_counts)
+            offsets = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(block_counts) - block_counts, block_counts)
+            sorted_pos = np.repeat(lo[start:end], block_counts) + offsets
+
+            # A faixa de valores já é exata; resta filtrar |Δdias| <= tolerância
+            day_diff = self.days[sorted_pos].astype(np.int64) - days[bank_pos]
+            keep = np.abs(day_diff) <= date_tolerance_days
+
+            bank_parts.append(bank_pos[keep])
+            internal_parts.append(self.order[sorted_pos[keep]])
+
+        if not bank_parts:
+            return empty
+
+        bank_pos = np.concatenate(bank_parts)
+        internal_pos = np.concatenate(internal_parts)
+        order = np.lexsort((internal_pos, bank_pos))
+        return bank_pos[order], internal_pos[order]
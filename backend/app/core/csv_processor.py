@@ -1,53 +1,235 @@
+import codecs
+import csv
+import hashlib
+import io
+import logging
 import pandas as pd
 import chardet
-from typing import Dict, List, Optional
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
 from datetime import datetime
 
+from app.core.cache import LRUCache
+from app.core.normalization import detect_date_format, detect_decimal, parse_amounts, parse_dates
+from app.core.tracing import span
+from app.core.transaction_batch import TransactionBatch
+
+# Linhas por bloco na leitura em streaming
+DEFAULT_CHUNKSIZE = 100_000
+
+# Bytes do início do arquivo usados para detectar encoding, separador e formatos
+SNIFF_BYTES = 64 * 1024
+SNIFF_LINES = 200
+DELIMITERS = ',;\t|'
+# O chardet é lento: só olha o começo da amostra
+CHARDET_BYTES = 10_000
+
+# Separador detectado por (banco, assinatura do cabeçalho). Encoding, formato de data e
+# separador decimal não entram no cache: arquivos com o mesmo cabeçalho podem diferir neles
+_delimiters = LRUCache(256)
+
+logger = logging.getLogger(__name__)
+
+# Tratamento de erro de decodificação: bytes inválidos em UTF-8 viram caracteres latin-1.
+# Na leitura em blocos, um arquivo latin-1 com a amostra só em ASCII é detectado como
+# UTF-8 e só falharia depois de blocos já entregues
+LATIN1_FALLBACK = 'latin1_fallback'
+codecs.register_error(LATIN1_FALLBACK, lambda error: (error.object[error.start:error.end].decode('latin-1'), error.end))
+
+
+def _read_sample(source: Union[str, BinaryIO], size: int) -> bytes:
+    """Primeiros ``size`` bytes de um caminho ou arquivo binário (sem mover a posição)"""
+    if hasattr(source, 'read'):
+        position = source.tell()
+        sample = source.read(size)
+        source.seek(position)
+        return sample
+    with open(source, 'rb') as f:
+        return f.read(size)
+
+
+def _sample_encoding(sample: bytes) -> str:
+    """BOM e validade UTF-8 primeiro; o chardet só roda quando nada disso resolve"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # Decodificador incremental: um caractere cortado no fim da amostra não é erro
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return chardet.detect(sample[:CHARDET_BYTES])['encoding'] or 'latin-1'
+
+
+def _detect_delimiter(lines: List[str]) -> str:
+    """Separador das primeiras linhas (csv.Sniffer, com contagem no cabeçalho como reserva)"""
+    try:
+        return csv.Sniffer().sniff('\n'.join(lines[:20]), delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        header = lines[0] if lines else ''
+        return max(DELIMITERS, key=header.count) if header else ','
+
+def _is_encoding_error(error: ValueError) -> bool:
+    """Erro de decodificação do texto (UnicodeDecodeError ou UTF-8 inválido do pyarrow)"""
+    return isinstance(error, UnicodeDecodeError) or 'UTF8' in str(error) or 'UTF-8' in str(error)
+
+
+def _has_binary_columns(df: pd.DataFrame) -> bool:
+    """Alguma coluna de texto veio como bytes (o pyarrow tipa a coluna inteira como binária)"""
+    for col in df.columns:
+        if df[col].dtype == object:
+            first = df[col].first_valid_index()
+            if first is not None and isinstance(df[col].at[first], bytes):
+                return True
+    return False
+
+
 class CSVProcessor:
-    def __init__(self):
+    def __init__(self, date_format: Optional[str] = None, decimal: Optional[str] = None):
         self.supported_encodings = ['utf-8', 'iso-8859-1', 'latin-1']
+        # Formato de data (ex.: '%d/%m/%Y') e separador decimal; None = detectar por amostra
+        self.date_format = date_format
+        self.decimal = decimal
     
-    def detect_encoding(self, file_path: str) -> str:
-        """Detecta o encoding do arquivo"""
-        with open(file_path, 'rb') as f:
-            raw_data = f.read(10000)
-            result = chardet.detect(raw_data)
-            return result['encoding']
+    def detect_encoding(self, source: Union[str, BinaryIO]) -> str:
+        """Detecta o encoding do arquivo (caminho ou arquivo binário aberto)"""
+        return _sample_encoding(_read_sample(source, 10000))
     
-    def read_csv(self, file_path: str, encoding: Optional[str] = None) -> pd.DataFrame:
-        """Lê arquivo CSV com suporte a múltiplos encodings"""
-        if not encoding:
-            encoding = self.detect_encoding(file_path)
-            print(f"Encoding detectado: {encoding}")
+    def _date_columns(self, columns: List[str]) -> List[str]:
+        return [col for col in columns if 'data' in col.lower() or 'date' in col.lower()]
+    
+    def _value_columns(self, columns: List[str]) -> List[str]:
+        return [col for col in columns if 'valor' in col.lower() or 'value' in col.lower() or 'amount' in col.lower()]
+    
+    def sniff(self, source: Union[str, BinaryIO], bank: Optional[str] = None) -> Dict:
+        """Detecta encoding, separador, formato de data e separador decimal em uma amostra.
+        
+        Só o separador fica em cache por (banco, hash do cabeçalho); encoding,
+        formato de data e separador decimal são sempre detectados na amostra do
+        arquivo corrente.
+        """
+        with span('encoding_detection'):
+            return self._sniff(source, bank)
+    
+    def _sniff(self, source: Union[str, BinaryIO], bank: Optional[str]) -> Dict:
+        """Detecção propriamente dita (sniff mede a etapa)"""
+        sample = _read_sample(source, SNIFF_BYTES)
+        encoding = _sample_encoding(sample)
+        lines = sample.decode(encoding, errors='replace').splitlines()
+        if len(sample) == SNIFF_BYTES:
+            lines = lines[:-1]  # última linha possivelmente cortada
+        lines = lines[:SNIFF_LINES]
         
-        try:
-            df = pd.read_csv(file_path, encoding=encoding)
-            return df
-        except UnicodeDecodeError:
-            for enc in self.supported_encodings:
-                if enc != encoding:
-                    try:
-                        df = pd.read_csv(file_path, encoding=enc)
-                        print(f"Arquivo lido com encoding: {enc}")
-                        return df
-                    except UnicodeDecodeError:
-                        continue
-            raise ValueError("Não foi possível ler o arquivo com nenhum encoding suportado")
+        signature = hashlib.blake2b(sample.split(b'\n', 1)[0], digest_size=16).hexdigest()
+        key = f"{bank}:{signature}"
+        sep = _delimiters.get(key)
+        if sep is None:
+            sep = _detect_delimiter(lines)
+            _delimiters.put(key, sep)
+        
+        frame = pd.read_csv(io.StringIO('\n'.join(lines)), sep=sep, dtype=str)
+        columns = [str(col) for col in frame.columns]
+        date_formats = {col: self.date_format or detect_date_format(frame[col]) for col in self._date_columns(columns)}
+        decimals = {col: self.decimal or detect_decimal(frame[col]) for col in self._value_columns(columns)}
+        
+        return {'encoding': encoding, 'sep': sep, 'date_formats': date_formats, 'decimals': decimals}
     
-    def standardize_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Padroniza dados do DataFrame"""
-        df_clean = df.copy()
+    def read_csv(self, file_path: Union[str, BinaryIO], encoding: Optional[str] = None,
+                 bank: Optional[str] = None) -> pd.DataFrame:
+        """Lê o arquivo CSV uma única vez com o dialeto detectado e a engine pyarrow.
         
-        date_columns = [col for col in df.columns if 'data' in col.lower() or 'date' in col.lower()]
-        for col in date_columns:
-            # Converte para datetime e depois para string formatada (YYYY-MM-DD)
-            df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce').dt.strftime('%Y-%m-%d')
+        Datas e valores que o pyarrow não tipa sozinho (ex.: dd/mm/aaaa, 1.234,56)
+        são convertidos com o formato e o separador decimal detectados.
+        """
+        dialect = self.sniff(file_path, bank)
+        encoding = encoding or dialect['encoding']
+        logger.debug("Encoding detectado: %s, separador: %r", encoding, dialect['sep'])
         
-        numeric_columns = [col for col in df.columns if 'valor' in col.lower() or 'value' in col.lower() or 'amount' in col.lower()]
-        for col in numeric_columns:
-            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+        # Valores com vírgula decimal ficam como texto; números com ponto e datas ISO o pyarrow já tipa
+        text_columns = {col: str for col, decimal in dialect['decimals'].items() if decimal == ','}
+        start = file_path.tell() if hasattr(file_path, 'read') else None
+        with span('ingest') as stage:
+            try:
+                df = pd.read_csv(file_path, sep=dialect['sep'], encoding=encoding, dtype=text_columns, engine='pyarrow')
+                # O pyarrow não falha com UTF-8 inválido depois da amostra: a coluna vem como binária
+                if encoding != 'latin-1' and _has_binary_columns(df):
+                    raise UnicodeDecodeError(encoding, b'', 0, 1, 'coluna com bytes inválidos')
+            except ValueError as e:
+                # Só erros de encoding: os demais erros de leitura (aspas, linhas irregulares) sobem como estão
+                if not _is_encoding_error(e):
+                    raise
+                # Bytes inválidos depois da amostra: uma única nova leitura em latin-1 (aceita qualquer byte)
+                if encoding == 'latin-1':
+                    raise ValueError(f"Não foi possível ler o arquivo: {e}")
+                logger.warning("Falha ao ler com encoding %s, relendo em latin-1", encoding)
+                if start is not None:
+                    file_path.seek(start)
+                df = pd.read_csv(file_path, sep=dialect['sep'], encoding='latin-1', dtype=text_columns, engine='pyarrow')
+            stage.rows_out = len(df)
         
-        return df_clean
+        return self._convert_types(df, dialect)
+    
+    def _convert_types(self, df: pd.DataFrame, dialect: Optional[Dict]) -> pd.DataFrame:
+        """Converte datas e valores com os formatos do dialeto (ou do processador)"""
+        date_formats = dialect['date_formats'] if dialect else {}
+        decimals = dialect['decimals'] if dialect else {}
+        with span('standardize', rows_in=len(df)) as stage:
+            for col in self._date_columns(list(df.columns)):
+                df[col] = parse_dates(df[col], date_formats.get(col, self.date_format))
+            for col in self._value_columns(list(df.columns)):
+                df[col] = parse_amounts(df[col], decimals.get(col, self.decimal))
+            stage.rows_out = len(df)
+        return df
+    
+    def iter_chunks(self, source: Union[str, BinaryIO], chunksize: int = DEFAULT_CHUNKSIZE,
+                    encoding: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """Lê o CSV em blocos de ``chunksize`` linhas, padronizando cada bloco conforme chega.
+        
+        Aceita um caminho ou um arquivo binário (ex.: ``UploadFile.file``), de modo que
+        o arquivo inteiro nunca precisa estar em memória. Usa a engine C do pandas:
+        a engine pyarrow não lê em blocos (``chunksize``).
+        """
+        dialect = self.sniff(source)
+        encoding = encoding or dialect['encoding']
+        logger.debug("Encoding detectado: %s, separador: %r", encoding, dialect['sep'])
+        
+        start = source.tell() if hasattr(source, 'read') else None
+        candidates = [encoding] + [enc for enc in self.supported_encodings if enc != encoding]
+        
+        for enc in candidates:
+            yielded = False
+            # UTF-8 nunca falha no meio: bytes inválidos depois da amostra são lidos como latin-1
+            errors = LATIN1_FALLBACK if codecs.lookup(enc).name.startswith('utf-8') else 'strict'
+            try:
+                for chunk in pd.read_csv(source, sep=dialect['sep'], encoding=enc, encoding_errors=errors,
+                                         chunksize=chunksize):
+                    yielded = True
+                    yield self.standardize_data(chunk, dialect)
+                return
+            except UnicodeDecodeError:
+                # Só é possível trocar de encoding se nenhum bloco foi entregue ainda
+                if yielded:
+                    raise ValueError(f"Arquivo com bytes inválidos para o encoding {enc}")
+                if start is not None:
+                    source.seek(start)
+                logger.warning("Falha ao ler com encoding %s, tentando próximo", enc)
+        
+        raise ValueError("Não foi possível ler o arquivo com nenhum encoding suportado")
+    
+    def standardize_data(self, df: pd.DataFrame, dialect: Optional[Dict] = None) -> pd.DataFrame:
+        """Padroniza dados do DataFrame em uma única passada tipada.
+        
+        Datas viram datetime64 (formato do dialeto, explícito ou detectado uma vez
+        por coluna) e valores viram float64 (vírgula decimal aceita). Colunas já
+        tipadas (ex.: vindas de read_csv) passam direto. A formatação para texto
+        só acontece na saída JSON (prepare_for_json).
+        """
+        return self._convert_types(df.copy(), dialect)
+
+    def to_batch(self, df: pd.DataFrame, date_col: str = 'Data', value_col: str = 'Valor',
+                 desc_col: str = 'Descricao', id_col: Optional[str] = None) -> TransactionBatch:
+        """Converte o DataFrame padronizado no lote colunar usado na conciliação"""
+        return TransactionBatch.from_dataframe(df, date_col, value_col, desc_col, id_col)
 
     def prepare_for_json(self, df: pd.DataFrame) -> list:
         """Prepara o DataFrame para serialização JSON"""
@@ -61,6 +243,8 @@ class CSVProcessor:
             elif hasattr(df_json[col], 'dt'):
                 df_json[col] = df_json[col].dt.strftime('%Y-%m-%d')
         
+        # NaN/NaT não são JSON válido
+        df_json = df_json.astype(object).where(df_json.notna(), None)
         return df_json.to_dict(orient='records')
 
 if __name__ == "__main__":
@@ -0,0 +1,295 @@
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import (
+    BigInteger, DateTime, Float, ForeignKey, Index, Integer, String, create_engine, func, insert, or_, select,
+    update
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from app.core.match_set import MatchSet
+from app.core.normalization import INVALID_DAY, normalize_ids
+from app.core.reconciliation_processor import ReconciliationProcessor
+from app.core.transaction_batch import TransactionBatch
+
+SIDES = ('bank', 'internal')
+ITEM_STATUSES = ('open', 'matched', 'exception')
+
+# Quantidade de linhas por INSERT/UPDATE em lote
+WRITE_BATCH_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class LedgerItem(Base):
+    """Transação já vista de um dos lados de uma conta, com seu estado de conciliação"""
+
+    __tablename__ = 'ledger_items'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account: Mapped[str] = mapped_column(String(100))
+    side: Mapped[str] = mapped_column(String(10))
+    # Hash do conteúdo da linha + ordem de ocorrência (linhas idênticas são distintas)
+    fingerprint: Mapped[int] = mapped_column(BigInteger)
+    cents: Mapped[int] = mapped_column(BigInteger)
+    day: Mapped[int] = mapped_column(Integer)
+    description: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    ext_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    status: Mapped[str] = mapped_column(String(10), default='open')
+
+    __table_args__ = (
+        Index('ix_ledger_items_fingerprint', 'account', 'side', 'fingerprint', unique=True),
+        # Fingerprints por data: a checagem de linhas já vistas só lê o intervalo de datas do arquivo
+        Index('ix_ledger_items_day', 'account', 'side', 'day', 'fingerprint'),
+        # Janela de itens em aberto por data: é o índice de candidatos persistido
+        Index('ix_ledger_items_open_window', 'account', 'side', 'status', 'day', 'cents'),
+    )
+
+
+class LedgerMatch(Base):
+    """Par conciliado (ou exceção) gravado por uma execução incremental"""
+
+    __tablename__ = 'ledger_matches'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account: Mapped[str] = mapped_column(String(100), index=True)
+    bank_item_id: Mapped[int] = mapped_column(ForeignKey('ledger_items.id'))
+    internal_item_id: Mapped[int] = mapped_column(ForeignKey('ledger_items.id'))
+    score: Mapped[float] = mapped_column(Float)
+    match_type: Mapped[str] = mapped_column(String(20))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
+def row_fingerprints(batch: TransactionBatch) -> np.ndarray:
+    """Hash int64 de (valor, data, descrição, ID, ocorrência) de cada linha do lote"""
+    frame = pd.DataFrame({
+        'cents': batch.cents,
+        'days': batch.days,
+        'description': batch.description_values(),
+        'ext_id': _ext_ids(batch),
+    })
+    frame['occurrence'] = frame.groupby(list(frame.columns), sort=False, dropna=False).cumcount()
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy().view(np.int64)
+
+
+def _ext_ids(batch: TransactionBatch) -> np.ndarray:
+    """IDs externos normalizados (None para ausentes): o mesmo ID lido como texto ou
+    como float gera o mesmo fingerprint"""
+    if batch.ids is None:
+        return np.full(len(batch), None, dtype=object)
+    return normalize_ids(batch.ids)
+
+
+def _day_to_iso(day: Optional[int]) -> Optional[str]:
+    """Dia ordinal (desde 1970-01-01) como data ISO"""
+    if day is None:
+        return None
+    return str(np.datetime64(int(day), 'D'))
+
+
+class IncrementalReconciler:
+    """Conciliação incremental com estado persistido em SQLite.
+
+    Cada execução recebe o arquivo completo do período (ex.: o mês até hoje),
+    grava apenas as linhas ainda não vistas e concilia essas linhas contra os
+    itens em aberto dentro da janela de ``date_tolerance_days``. Pares já
+    conciliados em execuções anteriores não são refeitos, então o custo do
+    pareamento cresce com o delta do dia e não com o total do mês.
+    """
+
+    def __init__(self, database_url: str, processor: Optional[ReconciliationProcessor] = None):
+        self.engine = create_engine(database_url)
+        Base.metadata.create_all(self.engine)
+        # create_all não adiciona índices novos a tabelas que já existem
+        for index in LedgerItem.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        self.processor = processor or ReconciliationProcessor()
+
+    def _insert_new(self, session: Session, account: str, side: str, batch: TransactionBatch) -> int:
+        """Grava como abertas as linhas cujo fingerprint ainda não existe e retorna quantas"""
+        if len(batch) == 0:
+            return 0
+        fingerprints = row_fingerprints(batch)
+        # A data faz parte do fingerprint: só os itens no intervalo de datas do arquivo podem repetir linhas
+        valid_days = batch.days[batch.days != INVALID_DAY]
+        day_filters = [LedgerItem.day == INVALID_DAY] if len(valid_days) < len(batch) else []
+        if len(valid_days):
+            day_filters.append(LedgerItem.day.between(int(valid_days.min()), int(valid_days.max())))
+        known = set(session.scalars(
+            select(LedgerItem.fingerprint).where(
+                LedgerItem.account == account, LedgerItem.side == side, or_(*day_filters)
+            )
+        ))
+        new_pos = np.flatnonzero([fp not in known for fp in fingerprints.tolist()])
+        if len(new_pos) == 0:
+            return 0
+
+        descriptions = batch.description_values()
+        ext_ids = _ext_ids(batch)
+        rows = [
+            {'account': account, 'side': side, 'fingerprint': fp, 'cents': cents, 'day': day,
+             'description': desc, 'ext_id': ext_id, 'status': 'open'}
+            for fp, cents, day, desc, ext_id in zip(
+                fingerprints[new_pos].tolist(), batch.cents[new_pos].tolist(), batch.days[new_pos].tolist(),
+                descriptions[new_pos].tolist(), ext_ids[new_pos].tolist()
+            )
+        ]
+        for start in range(0, len(rows), WRITE_BATCH_SIZE):
+            session.execute(insert(LedgerItem), rows[start:start + WRITE_BATCH_SIZE])
+        return len(new_pos)
+
+    def _load_open(self, session: Session, account: str, side: str,
+                   min_day: Optional[int] = None) -> Tuple[np.ndarray, TransactionBatch]:
+        """Itens em aberto (a partir de ``min_day``) como (ids no banco de dados, lote)"""
+        query = select(
+            LedgerItem.id, LedgerItem.cents, LedgerItem.day, LedgerItem.description, LedgerItem.ext_id
+        ).where(LedgerItem.account == account, LedgerItem.side == side, LedgerItem.status == 'open')
+        if min_day is not None:
+            query = query.where(LedgerItem.day >= min_day)
+        rows = session.execute(query.order_by(LedgerItem.id)).all()
+
+        if not rows:
+            return np.empty(0, dtype=np.int64), TransactionBatch.empty()
+        item_ids, cents, days, descriptions, ext_ids = zip(*rows)
+        desc_ids, uniques = pd.factorize(pd.Series(descriptions, dtype=object))
+        batch = TransactionBatch(
+            np.array(cents), np.array(days), desc_ids, np.asarray(uniques, dtype=object),
+            ids=np.array(ext_ids, dtype=object)
+        )
+        return np.array(item_ids, dtype=np.int64), batch
+
+    def _min_new_day(self, session: Session, account: str, first_new_id: Optional[int]) -> Optional[int]:
+        """Menor data válida entre os itens gravados nesta execução"""
+        if first_new_id is None:
+            return None
+        return session.scalar(
+            select(func.min(LedgerItem.day)).where(
+                LedgerItem.account == account, LedgerItem.id >= first_new_id, LedgerItem.day != INVALID_DAY
+            )
+        )
+
+    def _matched_total(self, session: Session, account: str) -> int:
+        """Conciliações já gravadas na conta, contadas como MatchSet.transaction_count:
+        cada pagamento dividido conta uma vez (o item que se repete nos pares 'split')"""
+        pairs = session.scalar(
+            select(func.count(LedgerMatch.id)).where(
+                LedgerMatch.account == account, LedgerMatch.match_type.not_in(('id_conflict', 'split'))
+            )
+        )
+        groups = 0
+        for column in (LedgerMatch.bank_item_id, LedgerMatch.internal_item_id):
+            repeated = select(column).where(
+                LedgerMatch.account == account, LedgerMatch.match_type == 'split'
+            ).group_by(column).having(func.count() > 1).subquery()
+            groups += session.scalar(select(func.count()).select_from(repeated))
+        return pairs + groups
+
+    def _save_matches(self, session: Session, account: str, bank_ids: np.ndarray,
+                      internal_ids: np.ndarray, matches: MatchSet) -> None:
+        """Grava os pares e marca os itens como conciliados (ou exceção)"""
+        exception = matches.is_exception()
+        statuses = np.where(exception, 'exception', 'matched').tolist()
+        bank_item_ids = bank_ids[matches.bank_idx].tolist()
+        internal_item_ids = internal_ids[matches.internal_idx].tolist()
+
+        pairs = [
+            {'account': account, 'bank_item_id': b, 'internal_item_id': i, 'score': score, 'match_type': match_type}
+            for b, i, score, match_type in zip(
+                bank_item_ids, internal_item_ids, matches.score.tolist(), matches.match_type_names()
+            )
+        ]
+        items = [{'id': item_id, 'status': status}
+                 for item_ids in (bank_item_ids, internal_item_ids)
+                 for item_id, status in zip(item_ids, statuses)]
+        for start in range(0, len(pairs), WRITE_BATCH_SIZE):
+            session.execute(insert(LedgerMatch), pairs[start:start + WRITE_BATCH_SIZE])
+        for start in range(0, len(items), WRITE_BATCH_SIZE):
+            session.execute(update(LedgerItem), items[start:start + WRITE_BATCH_SIZE])
+
+    def reconcile(self, account: str, bank_df: Union[pd.DataFrame, TransactionBatch],
+                  internal_df: Union[pd.DataFrame, TransactionBatch], config: Dict,
+                  processor: Optional[ReconciliationProcessor] = None) -> Dict:
+        """Concilia apenas as linhas novas dos arquivos contra os itens em aberto da conta.
+
+        Retorna os pares feitos nesta execução e os itens que seguem em aberto na
+        janela desta execução (a partir da menor data nova menos a tolerância); as
+        contagens de itens em aberto no resumo cobrem a conta inteira.
+        ``processor`` substitui o processador padrão (tolerâncias da requisição).
+        """
+        processor = processor or self.processor
+        bank = processor._to_batch(bank_df, config, 'do banco')
+        internal = processor._to_batch(internal_df, config, 'interno')
+
+        with Session(self.engine) as session, session.begin():
+            first_new_id = (session.scalar(select(func.max(LedgerItem.id))) or 0) + 1
+            new_bank = self._insert_new(session, account, 'bank', bank)
+            new_internal = self._insert_new(session, account, 'internal', internal)
+            logger.debug("🆕 Linhas novas: banco=%d, sistema=%d", new_bank, new_internal)
+
+            matches, tier_stats = MatchSet.empty(), []
+            bank_ids = internal_ids = np.empty(0, dtype=np.int64)
+            bank_open = internal_open = bank_remaining = internal_remaining = TransactionBatch.empty()
+            window_start = None
+            min_day = self._min_new_day(session, account, first_new_id) if new_bank or new_internal else None
+            if min_day is not None:
+                # Só itens em aberto dentro da janela podem parear com as linhas novas
+                window_start = min_day - processor.date_tolerance_days
+                bank_ids, bank_open = self._load_open(session, account, 'bank', window_start)
+                internal_ids, internal_open = self._load_open(session, account, 'internal', window_start)
+                logger.debug("🪟 Janela desde o dia %d: banco=%d, sistema=%d",
+                             window_start, len(bank_open), len(internal_open))
+                if len(bank_open) and len(internal_open):
+                    matches, tier_stats = processor._match_tiers(
+                        bank_open, internal_open, use_id=bool(config.get('id_col'))
+                    )
+                    self._save_matches(session, account, bank_ids, internal_ids, matches)
+
+                # Resultado: o que segue em aberto dentro da janela
+                _, bank_remaining = self._load_open(session, account, 'bank', window_start)
+                _, internal_remaining = self._load_open(session, account, 'internal', window_start)
+
+            open_counts = dict(session.execute(
+                select(LedgerItem.side, func.count(LedgerItem.id)).where(
+                    LedgerItem.account == account, LedgerItem.status == 'open'
+                ).group_by(LedgerItem.side)
+            ).all())
+            matched_total = self._matched_total(session, account)
+
+        exception = matches.is_exception()
+        run_matches = matches.take(~exception)
+        run_exceptions = matches.take(exception)
+
+        return {
+            'matched': self._serialize(processor, bank_open, internal_open, run_matches, config),
+            'exceptions': self._serialize(processor, bank_open, internal_open, run_exceptions, config),
+            'bank_only': processor._rows(bank_remaining, bank_remaining, np.arange(len(bank_remaining)), config),
+            'internal_only': processor._rows(internal_remaining, internal_remaining,
+                                             np.arange(len(internal_remaining)), config),
+            'summary': {
+                'account': account,
+                'new_bank_transactions': new_bank,
+                'new_internal_transactions': new_internal,
+                'matched_count': run_matches.transaction_count(),
+                'exception_count': len(run_exceptions),
+                'total_matched_count': matched_total,
+                'bank_only_count': open_counts.get('bank', 0),
+                'internal_only_count': open_counts.get('internal', 0),
+                'window_start': _day_to_iso(window_start),
+                'tiers': tier_stats,
+            }
+        }
+
+    def _serialize(self, processor: ReconciliationProcessor, bank: TransactionBatch,
+                   internal: TransactionBatch, matches: MatchSet, config: Dict) -> List[Dict]:
+        return processor._serialize_matches(
+            processor._rows(bank, bank, matches.bank_idx, config),
+            processor._rows(internal, internal, matches.internal_idx, config),
+            matches
+        )
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+
+class QueueFullError(Exception):
+    """Fila de jobs cheia: o cliente deve tentar novamente mais tarde"""
+
+
+class Job:
+    """Estado de um job de conciliação submetido ao pool"""
+
+    __slots__ = ('job_id', 'status', 'created_at', 'finished_at', 'result', 'error', 'future', 'cleanup')
+
+    def __init__(self, job_id: str, cleanup: Optional[Callable[[], None]] = None):
+        self.job_id = job_id
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.cleanup = cleanup
+
+    def to_dict(self, include_result: bool = True) -> Dict:
+        """Representação JSON do job"""
+        data = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.status == 'done':
+            data['result'] = self.result
+        return data
+
+
+class JobManager:
+    """Executa jobs de CPU em um pool de processos limitado, com fila máxima.
+
+    ``max_pending`` limita os jobs em fila + em execução; acima disso ``submit``
+    levanta QueueFullError (HTTP 429 na API). Jobs finalizados ficam disponíveis
+    por ``result_ttl`` segundos.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 8, result_ttl: float = 3600.0):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _active_count(self) -> int:
+        # Jobs cancelados em execução ainda ocupam um worker até terminarem
+        return sum(1 for job in self._jobs.values() if job.future is not None and not job.future.done())
+
+    def _evict_expired(self) -> None:
+        """Remove jobs finalizados há mais de result_ttl segundos"""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, fn: Callable, *args, cleanup: Optional[Callable[[], None]] = None) -> Job:
+        """Submete ``fn(*args)`` ao pool e retorna o job criado"""
+        with self._lock:
+            self._evict_expired()
+            if self._active_count() >= self.max_pending:
+                raise QueueFullError(f"Fila de conciliação cheia ({self.max_pending} jobs ativos)")
+
+            job = Job(uuid.uuid4().hex, cleanup)
+            self._jobs[job.job_id] = job
+            job.future = self._get_executor().submit(fn, *args)
+
+        job.future.add_done_callback(lambda future: self._on_done(job, future))
+        return job
+
+    def _on_done(self, job: Job, future: Future) -> None:
+        with self._lock:
+            if job.status != 'cancelled':
+                if future.cancelled():
+                    job.status = 'cancelled'
+                elif future.exception() is not None:
+                    job.status = 'failed'
+                    job.error = str(future.exception())
+                else:
+                    job.status = 'done'
+                    job.result = future.result()
+            job.finished_at = time.time()
+
+        if job.cleanup:
+            job.cleanup()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Retorna o job, atualizando o estado de execução"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job.status == 'queued' and job.future is not None and job.future.running():
+                job.status = 'running'
+            return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela o job. Jobs já em execução terminam no worker, mas o resultado é descartado"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.status in ('queued', 'running'):
+                job.status = 'cancelled'
+                job.result = None
+        if job.future is not None:
+            job.future.cancel()
+        return job
+
+    def shutdown(self) -> None:
+        """Encerra o pool de processos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from app.core.candidate_index import CandidateIndex
+from app.core.normalization import normalize_ids
+from app.core.transaction_batch import TransactionBatch
+
+DEFAULT_LEDGER_DIR = os.path.join(tempfile.gettempdir(), 'conciliacao-ledgers')
+
+# Colunas numéricas gravadas em .npy e abertas com mmap: as do lote (ordem das
+# linhas da origem) e as do índice de candidatos (ordenadas por valor e data)
+BATCH_COLUMNS = ('cents', 'days', 'desc_ids', 'row_index')
+INDEX_COLUMNS = ('order', 'cents', 'days')
+
+logger = logging.getLogger(__name__)
+
+
+def _write_strings(path: str, columns: Dict[str, np.ndarray]) -> None:
+    """Grava colunas de texto (descrições distintas, IDs) em Arrow IPC"""
+    table = pa.table({name: pa.array(values, from_pandas=True) for name, values in columns.items()})
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_strings(path: str) -> Dict[str, np.ndarray]:
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+
+
+class LedgerIndex:
+    """Razão interno registrado, aberto direto dos arquivos .npy com ``mmap_mode='r'``.
+
+    As colunas numéricas do lote e do índice de candidatos (valores e datas já
+    ordenados) não são copiadas para a memória do processo: vários workers do
+    uvicorn que abrem o mesmo razão compartilham as páginas pelo cache de
+    páginas do sistema operacional. Só as descrições distintas e os IDs viram
+    objetos Python, uma vez por processo.
+    """
+
+    def __init__(self, ledger_id: str, meta: Dict, batch: TransactionBatch, index: CandidateIndex):
+        self.ledger_id = ledger_id
+        self.meta = meta
+        self.batch = batch
+        self.index = index
+
+    @staticmethod
+    def write(path: str, batch: TransactionBatch, meta: Dict) -> None:
+        """Grava o lote e o índice de candidatos (ordenado uma única vez) no diretório ``path``"""
+        os.makedirs(path)
+        index = CandidateIndex(batch.cents, batch.days)
+        for name in BATCH_COLUMNS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(batch, name))
+        for name in INDEX_COLUMNS:
+            np.save(os.path.join(path, f'index_{name}.npy'), getattr(index, name))
+
+        strings = {'descriptions': batch.descriptions}
+        _write_strings(os.path.join(path, 'descriptions.arrow'), strings)
+        if batch.ids is not None:
+            # IDs como texto normalizado: tipos misturados gravam e 101 não volta como 101.0
+            _write_strings(os.path.join(path, 'ids.arrow'), {'ids': normalize_ids(batch.ids)})
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def open(cls, path: str) -> 'LedgerIndex':
+        """Abre um razão gravado com ``write``"""
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in BATCH_COLUMNS}
+        index_columns = {
+            name: np.load(os.path.join(path, f'index_{name}.npy'), mmap_mode='r') for name in INDEX_COLUMNS
+        }
+        ids_path = os.path.join(path, 'ids.arrow')
+        batch = TransactionBatch(
+            columns['cents'], columns['days'], columns['desc_ids'],
+            _read_strings(os.path.join(path, 'descriptions.arrow'))['descriptions'],
+            columns['row_index'],
+            _read_strings(ids_path)['ids'] if os.path.exists(ids_path) else None
+        )
+        index = CandidateIndex.from_sorted(index_columns['order'], index_columns['cents'], index_columns['days'])
+        return cls(meta['ledger_id'], meta, batch, index)
+
+    def __len__(self) -> int:
+        return len(self.batch)
+
+
+class LedgerStore:
+    """Razões internos registrados em disco, por id.
+
+    Cada razão fica em um subdiretório gravado de forma atômica (temporário +
+    rename), então o diretório pode ser compartilhado entre processos; cada
+    processo abre um razão uma única vez e o mantém aberto.
+    """
+
+    def __init__(self, directory: str = DEFAULT_LEDGER_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._open: Dict[str, LedgerIndex] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ledger_id: str) -> str:
+        if not ledger_id or os.sep in ledger_id or ledger_id.startswith('.'):
+            raise ValueError(f"Id de razão inválido: '{ledger_id}'")
+        return os.path.join(self.directory, ledger_id)
+
+    def register(self, batch: TransactionBatch, config: Dict, name: Optional[str] = None) -> LedgerIndex:
+        """Grava o lote normalizado de um razão e retorna o índice aberto"""
+        ledger_id = uuid.uuid4().hex
+        meta = {
+            'ledger_id': ledger_id,
+            'name': name,
+            'rows': len(batch),
+            'config': config,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        tmp_path = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        try:
+            LedgerIndex.write(os.path.join(tmp_path, 'ledger'), batch, meta)
+            os.replace(os.path.join(tmp_path, 'ledger'), self._path(ledger_id))
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        logger.info("📒 Razão %s registrado: %d transações", ledger_id, len(batch))
+        return self.get(ledger_id)
+
+    def get(self, ledger_id: str) -> Optional[LedgerIndex]:
+        """Razão aberto (mmap) ou None se não existir"""
+        path = self._path(ledger_id)
+        with self._lock:
+            if not os.path.isdir(path):
+                # Removido (talvez por outro processo)
+                self._open.pop(ledger_id, None)
+                return None
+            ledger = self._open.get(ledger_id)
+            if ledger is None:
+                ledger = self._open[ledger_id] = LedgerIndex.open(path)
+        return ledger
+
+    def list(self) -> List[Dict]:
+        """Metadados dos razões registrados"""
+        ledgers = []
+        for entry in sorted(os.scandir(self.directory), key=lambda entry: entry.name):
+            meta_path = os.path.join(entry.path, 'meta.json')
+            if entry.is_dir() and not entry.name.startswith('.') and os.path.exists(meta_path):
+                with open(meta_path, encoding='utf-8') as f:
+                    ledgers.append(json.load(f))
+        return ledgers
+
+    def delete(self, ledger_id: str) -> bool:
+        """Remove o razão do disco (requisições em andamento seguem com os mapeamentos já abertos)"""
+        path = self._path(ledger_id)
+        with self._lock:
+            self._open.pop(ledger_id, None)
+        if not os.path.isdir(path):
+            return False
+        shutil.rmtree(path)
+        return True
@@ -0,0 +1,98 @@
+import numpy as np
+from typing import List, Sequence
+
+MATCH_TYPES = ('exact_id', 'fuzzy', 'exact_key', 'exact_amount', 'id_conflict', 'split', 'description')
+
+# Pares que não contam como match e vão para a lista de exceções
+EXCEPTION_TYPES = ('id_conflict',)
+
+
+class MatchSet:
+    """Conjunto de matches em formato colunar.
+
+    Guarda apenas as posições (0..n-1) das linhas do banco e do sistema interno,
+    a nota de similaridade e o código do tipo de match (índice em MATCH_TYPES).
+    As linhas só viram dicionários na serialização final.
+    """
+
+    __slots__ = ('bank_idx', 'internal_idx', 'score', 'match_type')
+
+    def __init__(self, bank_idx: np.ndarray, internal_idx: np.ndarray,
+                 score: np.ndarray, match_type: np.ndarray):
+        self.bank_idx = np.asarray(bank_idx, dtype=np.int64)
+        self.internal_idx = np.asarray(internal_idx, dtype=np.int64)
+        self.score = np.asarray(score, dtype=np.float64)
+        self.match_type = np.asarray(match_type, dtype=np.int8)
+
+    @classmethod
+    def empty(cls) -> 'MatchSet':
+        """Conjunto vazio"""
+        return cls(np.empty(0), np.empty(0), np.empty(0), np.empty(0))
+
+    @classmethod
+    def from_pairs(cls, bank_idx: np.ndarray, internal_idx: np.ndarray,
+                   score, match_type: str) -> 'MatchSet':
+        """Cria um conjunto em que todos os pares têm o mesmo tipo de match"""
+        n = len(bank_idx)
+        return cls(
+            bank_idx,
+            internal_idx,
+            np.broadcast_to(np.asarray(score, dtype=np.float64), (n,)),
+            np.full(n, MATCH_TYPES.index(match_type), dtype=np.int8)
+        )
+
+    @classmethod
+    def concat(cls, sets: Sequence['MatchSet']) -> 'MatchSet':
+        """Concatena vários conjuntos mantendo a ordem"""
+        if not sets:
+            return cls.empty()
+        return cls(
+            np.concatenate([s.bank_idx for s in sets]),
+            np.concatenate([s.internal_idx for s in sets]),
+            np.concatenate([s.score for s in sets]),
+            np.concatenate([s.match_type for s in sets])
+        )
+
+    def remap(self, bank_positions: np.ndarray, internal_positions: np.ndarray) -> 'MatchSet':
+        """Traduz posições locais (de um subconjunto) para posições globais"""
+        return MatchSet(
+            bank_positions[self.bank_idx],
+            internal_positions[self.internal_idx],
+            self.score,
+            self.match_type
+        )
+
+    def take(self, mask: np.ndarray) -> 'MatchSet':
+        """Seleciona os matches indicados pela máscara ou índices"""
+        return MatchSet(self.bank_idx[mask], self.internal_idx[mask], self.score[mask], self.match_type[mask])
+
+    def is_exception(self) -> np.ndarray:
+        """Máscara dos pares que são exceções (ex.: mesmo ID com valor ou data divergentes)"""
+        codes = [MATCH_TYPES.index(name) for name in EXCEPTION_TYPES]
+        return np.isin(self.match_type, codes)
+
+    def split_group_count(self) -> int:
+        """Pagamentos divididos: cada grupo é a linha que se repete nos pares 'split'
+        (o lançamento consolidado), com 2 ou mais partes do outro lado"""
+        split = self.match_type == MATCH_TYPES.index('split')
+        if not split.any():
+            return 0
+        groups = 0
+        for positions in (self.bank_idx[split], self.internal_idx[split]):
+            _, counts = np.unique(positions, return_counts=True)
+            groups += int((counts > 1).sum())
+        return groups
+
+    def transaction_count(self) -> int:
+        """Quantidade de conciliações: cada par conta uma vez, exceto os pagamentos
+        divididos, que contam uma vez por grupo e não uma vez por parte"""
+        split = int((self.match_type == MATCH_TYPES.index('split')).sum())
+        return len(self) - split + self.split_group_count()
+
+    def match_type_names(self) -> List[str]:
+        """Nomes dos tipos de match de cada par"""
+        names = np.array(MATCH_TYPES, dtype=object)
+        return names[self.match_type].tolist()
+
+    def __len__(self) -> int:
+        return len(self.bank_idx)
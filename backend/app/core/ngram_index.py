@@ -0,0 +1,151 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from typing import Sequence, Tuple
+
+from app.core.normalization import INVALID_DAY
+
+# Espaço de hash dos n-gramas (colunas da matriz esparsa)
+HASH_BITS = 20
+
+# Caracteres considerados de cada descrição (o início costuma identificar a transação)
+MAX_TEXT_CHARS = 64
+
+# N-gramas presentes em mais que essa fração das descrições não discriminam nada
+MAX_DOCUMENT_FREQUENCY = 0.05
+
+# Consultas multiplicadas pela matriz do índice por vez (limita a memória do produto)
+QUERY_BLOCK_SIZE = 4096
+
+# Similaridade mínima de n-gramas para uma descrição do índice virar candidata
+DEFAULT_MIN_SIMILARITY = 0.3
+
+
+def _ngram_matrix(texts: Sequence[str], n: int) -> csr_matrix:
+    """Matriz binária (texto × hash do n-grama) calculada sem laço por caractere.
+
+    Os textos viram uma matriz de code points (U32) e os n-gramas de todas as
+    posições são combinados por hash polinomial de uma vez; posições que
+    passam do fim do texto são descartadas.
+    """
+    texts = [f" {text[:MAX_TEXT_CHARS]} " for text in texts]
+    width = max((len(text) for text in texts), default=0)
+    if not texts or width < n:
+        return csr_matrix((len(texts), 1 << HASH_BITS), dtype=np.float64)
+
+    chars = np.array(texts, dtype=f'U{width}').view(np.uint32).reshape(len(texts), width).astype(np.uint64)
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    positions = width - n + 1
+    hashes = np.zeros((len(texts), positions), dtype=np.uint64)
+    for offset in range(n):
+        hashes = hashes * np.uint64(1_000_003) + chars[:, offset:offset + positions]
+    hashes = (hashes % np.uint64(1 << HASH_BITS)).astype(np.int64)
+
+    valid = np.arange(positions)[None, :] <= (lengths - n)[:, None]
+    rows = np.broadcast_to(np.arange(len(texts))[:, None], hashes.shape)[valid]
+    matrix = csr_matrix((np.ones(len(rows)), (rows, hashes[valid])), shape=(len(texts), 1 << HASH_BITS))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1.0
+    return matrix
+
+
+class NGramIndex:
+    """Índice invertido de n-gramas de caracteres sobre descrições distintas.
+
+    Cada descrição vira um vetor esparso de n-gramas com peso IDF, normalizado;
+    n-gramas frequentes demais (ex.: "pix", "ted") são descartados por não
+    discriminarem. A consulta é um produto esparso consulta × índice, que só
+    percorre as listas dos n-gramas presentes na consulta, sem comparar todas as
+    strings entre si. Serve para gerar candidatos por descrição quando os
+    valores não batem (ex.: tarifas descontadas).
+    """
+
+    def __init__(self, texts: Sequence[str], n: int = 3):
+        self.n = n
+        matrix = _ngram_matrix(texts, n)
+        document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        count = max(len(texts), 1)
+        self.idf = np.log((1 + count) / (1 + document_frequency)) + 1.0
+        if count >= 20:
+            self.idf[document_frequency > MAX_DOCUMENT_FREQUENCY * count] = 0.0
+        self.matrix = self._weight(matrix).T.tocsr()
+
+    def _weight(self, matrix: csr_matrix) -> csr_matrix:
+        """Aplica o IDF e normaliza cada linha (similaridade do cosseno no produto)"""
+        matrix = matrix.multiply(self.idf[None, :]).tocsr()
+        matrix.eliminate_zeros()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return csr_matrix(matrix.multiply(1.0 / norms[:, None]))
+
+    def query(self, texts: Sequence[str], top_k: int = 5,
+              min_similarity: float = DEFAULT_MIN_SIMILARITY) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Até ``top_k`` descrições do índice mais parecidas com cada consulta.
+
+        Retorna (posição da consulta, posição no índice, similaridade 0..1), com
+        os candidatos de cada consulta em ordem decrescente de similaridade.
+        """
+        query_pos, index_pos, similarity = [], [], []
+        for start in range(0, len(texts), QUERY_BLOCK_SIZE):
+            block = self._weight(_ngram_matrix(texts[start:start + QUERY_BLOCK_SIZE], self.n))
+            product = (block @ self.matrix).tocoo()
+            keep = product.data >= min_similarity
+            rows, cols, data = product.row[keep], product.col[keep], product.data[keep]
+
+            # Top-k por consulta: ordena por (consulta, -similaridade) e fica com os k primeiros de cada
+            order = np.lexsort((cols, -data, rows))
+            rows, cols, data = rows[order], cols[order], data[order]
+            starts = np.searchsorted(rows, rows, side='left')
+            top = np.arange(len(rows)) - starts < top_k
+            query_pos.append(rows[top].astype(np.int64) + start)
+            index_pos.append(cols[top].astype(np.int64))
+            similarity.append(data[top])
+
+        if not query_pos:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(query_pos), np.concatenate(index_pos), np.concatenate(similarity)
+
+
+def _expand_ranges(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Expande as faixas [start, start + count) em (dono da faixa, posição)"""
+    owners = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+    offsets = np.arange(int(counts.sum()), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, np.repeat(starts, counts) + offsets
+
+
+def candidate_pairs(bank_codes: np.ndarray, bank_days: np.ndarray,
+                    internal_codes: np.ndarray, internal_days: np.ndarray,
+                    query_pos: np.ndarray, index_pos: np.ndarray,
+                    date_tolerance_days: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pares de linhas (banco, interno) a partir dos candidatos por descrição distinta.
+
+    ``query_pos``/``index_pos`` vêm de ``NGramIndex.query`` (códigos de descrição
+    do banco e do interno, ordenados pelo código do banco). As linhas internas
+    ficam ordenadas por (código, data), então as de cada descrição candidata
+    dentro da janela de datas saem por busca binária, sem varrer o lado interno.
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    internal_valid = np.flatnonzero((internal_codes >= 0) & (internal_days != INVALID_DAY))
+    bank_valid = np.flatnonzero((bank_codes >= 0) & (bank_days != INVALID_DAY))
+    if len(query_pos) == 0 or len(internal_valid) == 0 or len(bank_valid) == 0:
+        return empty
+
+    order = internal_valid[np.lexsort((internal_days[internal_valid], internal_codes[internal_valid]))]
+    # Chave (código, data) em um int64: dias deslocados para 0..2^32
+    keys = (internal_codes[order] << 32) + (internal_days[order].astype(np.int64) + (1 << 31))
+
+    # Linha do banco -> descrições internas candidatas da sua descrição
+    codes = bank_codes[bank_valid]
+    first = np.searchsorted(query_pos, codes, side='left')
+    last = np.searchsorted(query_pos, codes, side='right')
+    owners, candidates = _expand_ranges(first, last - first)
+    bank_rows = bank_valid[owners]
+
+    # Descrição candidata -> linhas internas dentro da janela de datas
+    day = bank_days[bank_rows].astype(np.int64) + (1 << 31)
+    prefix = index_pos[candidates] << 32
+    lo = np.searchsorted(keys, prefix + day - date_tolerance_days, side='left')
+    hi = np.searchsorted(keys, prefix + day + date_tolerance_days, side='right')
+    owners, positions = _expand_ranges(lo, hi - lo)
+    if len(owners) == 0:
+        return empty
+    return bank_rows[owners], order[positions]
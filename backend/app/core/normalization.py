@@ -0,0 +1,150 @@
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from typing import Optional
+
+# Formatos de data aceitos, em ordem de preferência (ISO e padrão brasileiro)
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y', '%Y/%m/%d', '%d.%m.%Y']
+
+# Marcadores de valor ausente nas representações inteiras
+INVALID_CENTS = np.iinfo(np.int64).min
+INVALID_DAY = np.iinfo(np.int32).min
+
+# Valores que terminam em separador + 1 ou 2 dígitos (inteiros como "100" não decidem nada)
+_COMMA_DECIMAL = re.compile(r'\d,\d{1,2}\s*-?$')
+_DOT_DECIMAL = re.compile(r'\d\.\d{1,2}\s*-?$')
+_SAMPLE_SIZE = 200
+
+# Tipos de transação que abrem as descrições dos extratos (também usados na leitura de PDFs)
+TRANSACTION_TYPES_PATTERN = r'(PIX|TED|DOC|TEF|BOLETO|DEPÓSITO|TRANSF|PAGAMENTO)'
+
+# Descrições canônicas guardadas entre execuções (o razão interno se repete muito)
+CANONICAL_CACHE_SIZE = 200_000
+
+
+def _sample(series: pd.Series) -> pd.Series:
+    """Amostra de valores não nulos usada na detecção de formato"""
+    return series.dropna().astype(str).str.strip().head(_SAMPLE_SIZE)
+
+
+def detect_date_format(series: pd.Series) -> Optional[str]:
+    """Detecta, a partir de uma amostra, o primeiro formato de DATE_FORMATS que interpreta todos os valores"""
+    sample = _sample(series)
+    if sample.empty:
+        return None
+    for fmt in DATE_FORMATS:
+        if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return None
+
+
+def parse_dates(series: pd.Series, date_format: Optional[str] = None) -> pd.Series:
+    """Converte uma coluna de datas uma única vez, com formato explícito, para datetime64 (meia-noite)"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.normalize() if series.dt.tz is None else series.dt.tz_localize(None).dt.normalize()
+
+    fmt = date_format or detect_date_format(series)
+    if fmt:
+        return pd.to_datetime(series, format=fmt, errors='coerce')
+    return pd.to_datetime(series, errors='coerce').dt.normalize()
+
+
+def detect_decimal(series: pd.Series) -> str:
+    """Detecta o separador decimal de uma coluna textual de valores ('.' ou ',').
+
+    Só contam os valores com casas decimais; vence o separador mais frequente
+    entre eles (empate ou nenhum: '.').
+    """
+    sample = _sample(series)
+    commas = int(sample.str.contains(_COMMA_DECIMAL).sum())
+    dots = int(sample.str.contains(_DOT_DECIMAL).sum())
+    return ',' if commas > dots else '.'
+
+
+def parse_amounts(series: pd.Series, decimal: Optional[str] = None) -> pd.Series:
+    """Converte uma coluna de valores para float64, aceitando vírgula decimal (1.234,56)"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(np.float64)
+
+    text = series.astype('string').str.replace('R$', '', regex=False).str.strip()
+    if (decimal or detect_decimal(series)) == ',':
+        text = text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(text, errors='coerce').astype(np.float64)
+
+
+def to_cents(values) -> np.ndarray:
+    """Converte valores monetários para int64 em centavos (ausentes = INVALID_CENTS)"""
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    cents = np.full(len(values), INVALID_CENTS, dtype=np.int64)
+    valid = ~np.isnan(values)
+    cents[valid] = np.rint(values[valid] * 100).astype(np.int64)
+    return cents
+
+
+def to_day_ordinals(dates) -> np.ndarray:
+    """Converte datas para int32 em dias desde 1970-01-01 (ausentes = INVALID_DAY)"""
+    days = pd.to_datetime(pd.Series(dates), errors='coerce').to_numpy(dtype='datetime64[D]')
+    ordinals = np.full(len(days), INVALID_DAY, dtype=np.int32)
+    valid = ~np.isnat(days)
+    ordinals[valid] = days[valid].astype(np.int64).astype(np.int32)
+    return ordinals
+
+
+def tolerance_to_cents(value_tolerance: float) -> int:
+    """Tolerância de valor em centavos inteiros (|Δ| <= tolerância)"""
+    return int(np.floor(value_tolerance * 100 + 1e-6))
+
+
+def normalize_id(value) -> Optional[str]:
+    """ID externo como texto canônico: IDs lidos como float voltam a inteiro
+    ("123.0" -> "123"), espaços nas pontas saem e vazio/ausente vira None"""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def normalize_ids(values) -> np.ndarray:
+    """Coluna de IDs normalizados com ``normalize_id`` (None para ausentes), uma
+    chamada por valor distinto; tipos misturados (inteiros e texto) são aceitos"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    normalized = np.array([normalize_id(value) for value in uniques] + [None], dtype=object)
+    return normalized[codes]
+
+
+def strip_accents(text: str) -> str:
+    """Remove acentos e cedilha (decomposição NFKD sem as marcas combinantes)"""
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+# Palavras que, no início da descrição, só dizem o tipo/sentido da transação
+_TRANSACTION_TYPES = strip_accents(TRANSACTION_TYPES_PATTERN)[1:-1] + '|TRANSFERENCIA'
+_TRANSACTION_PREFIX = re.compile(
+    rf'^(?:{_TRANSACTION_TYPES})\s+'
+    rf'(?:(?:{_TRANSACTION_TYPES}|RECEBIDO|RECEBIDA|ENVIADO|ENVIADA|EMITIDO|EMITIDA|DE|DA|DO|EM|PARA)\s+)*'
+)
+_NON_ALPHANUMERIC = re.compile(r'[^A-Z0-9]+')
+# Qualquer palavra com dígitos: números de documento, CPF/CNPJ, datas, agência/conta
+_WITH_DIGITS = re.compile(r'\S*\d\S*')
+_SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def canonical_description(text: str) -> str:
+    """Forma canônica de uma descrição para comparação.
+
+    Sem acentos e pontuação, sem palavras com dígitos (documentos e datas) e sem
+    o prefixo de tipo de transação: "PIX RECEBIDO 12345 JOÃO SILVA" e
+    "Pix - Joao Silva" viram "joao silva". Se nada sobrar, fica o texto limpo
+    com o prefixo (ou, se só havia números, o texto original sem acentos).
+    Memorizada: cada descrição distinta é processada uma vez.
+    """
+    text = strip_accents(text).upper()
+    cleaned = _NON_ALPHANUMERIC.sub(' ', text)
+    cleaned = _SPACES.sub(' ', _WITH_DIGITS.sub(' ', cleaned)).strip()
+    canonical = _TRANSACTION_PREFIX.sub('', cleaned + ' ').strip()
+    return (canonical or cleaned or _SPACES.sub(' ', text).strip()).lower()
@@ -0,0 +1,141 @@
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.core.candidate_index import CandidateIndex
+from app.core.normalization import INVALID_DAY
+from app.core.similarity import DescriptionScorer
+
+Pairs = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+logger = logging.getLogger(__name__)
+
+
+def score_candidates(bank_cents: np.ndarray, bank_days: np.ndarray, bank_codes: np.ndarray,
+                     internal_cents: np.ndarray, internal_days: np.ndarray, internal_codes: np.ndarray,
+                     bank_uniques: List[str], internal_uniques: List[str],
+                     params: Dict, index: Optional[CandidateIndex] = None) -> Pairs:
+    """Gera os pares candidatos via índice ordenado e mantém os de similaridade suficiente.
+
+    Retorna (posição no banco, posição no interno, nota), ordenados por posição
+    do banco e depois do interno. ``index`` permite reaproveitar um índice já
+    construído sobre o mesmo lado interno.
+    """
+    if index is None:
+        index = CandidateIndex(internal_cents, internal_days)
+    bank_pos, internal_pos = index.query(
+        bank_cents, bank_days, params['tolerance_cents'], params['date_tolerance_days']
+    )
+
+    scorer = DescriptionScorer(params['scorer'], workers=params.get('scorer_workers', -1))
+    scores = scorer.score_pairs(
+        bank_codes[bank_pos], internal_codes[internal_pos],
+        bank_uniques, internal_uniques, params['similarity_threshold']
+    )
+
+    keep = scores >= params['similarity_threshold']
+    return bank_pos[keep], internal_pos[keep], scores[keep]
+
+
+def _score_bucket(bucket: Dict) -> Pairs:
+    """Executa score_candidates em um bucket e traduz as posições para o frame completo"""
+    bank_pos, internal_pos, scores = score_candidates(
+        bucket['bank_cents'], bucket['bank_days'], bucket['bank_codes'],
+        bucket['internal_cents'], bucket['internal_days'], bucket['internal_codes'],
+        bucket['bank_uniques'].tolist(), bucket['internal_uniques'].tolist(),
+        bucket['params']
+    )
+    return bucket['bank_rows'][bank_pos], bucket['internal_rows'][internal_pos], scores
+
+
+def _compact_codes(codes: np.ndarray, uniques: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Renumera os códigos de descrição do bucket e recorta só os textos usados"""
+    used, local = np.unique(codes, return_inverse=True)
+    local = local.astype(np.int64)
+    if len(used) and used[0] < 0:
+        # O código -1 (descrição nula) continua -1
+        local -= 1
+        used = used[1:]
+    texts = np.array([uniques[c] for c in used], dtype=str) if len(used) else np.empty(0, dtype=str)
+    return local, texts
+
+
+def partition_by_date(bank_days: np.ndarray, internal_days: np.ndarray,
+                      bucket_days: int, date_tolerance_days: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Divide as linhas em buckets de datas.
+
+    Cada linha válida do banco pertence a exatamente um bucket; o lado interno
+    de cada bucket é acolchoado com ``date_tolerance_days`` em cada borda, de
+    modo que todo par dentro da tolerância é visto.
+    """
+    bank_valid = np.flatnonzero(bank_days != INVALID_DAY)
+    internal_valid = np.flatnonzero(internal_days != INVALID_DAY)
+    if len(bank_valid) == 0 or len(internal_valid) == 0:
+        return []
+
+    bank_bucket = bank_days[bank_valid].astype(np.int64) // bucket_days
+    internal_order = internal_valid[np.argsort(internal_days[internal_valid], kind='stable')]
+    internal_sorted_days = internal_days[internal_order].astype(np.int64)
+
+    bank_order = np.argsort(bank_bucket, kind='stable')
+    bucket_ids, starts = np.unique(bank_bucket[bank_order], return_index=True)
+
+    buckets = []
+    for bucket_id, bank_rows in zip(bucket_ids.tolist(), np.split(bank_valid[bank_order], starts[1:])):
+        first_day = bucket_id * bucket_days - date_tolerance_days
+        last_day = (bucket_id + 1) * bucket_days - 1 + date_tolerance_days
+        lo = np.searchsorted(internal_sorted_days, first_day, side='left')
+        hi = np.searchsorted(internal_sorted_days, last_day, side='right')
+        internal_rows = np.sort(internal_order[lo:hi])
+        if len(internal_rows):
+            buckets.append((bank_rows, internal_rows))
+    return buckets
+
+
+def parallel_score_candidates(bank_cents: np.ndarray, bank_days: np.ndarray, bank_codes: np.ndarray,
+                              internal_cents: np.ndarray, internal_days: np.ndarray, internal_codes: np.ndarray,
+                              bank_uniques: List[str], internal_uniques: List[str],
+                              params: Dict, workers: int, bucket_days: int) -> Pairs:
+    """Versão paralela de score_candidates, particionada por buckets de data.
+
+    Os buckets recebem apenas arrays NumPy (centavos, dias, códigos e os
+    textos usados), nunca DataFrames. O resultado é idêntico ao caminho serial.
+    """
+    worker_params = dict(params, scorer_workers=1)
+    buckets = []
+    for bank_rows, internal_rows in partition_by_date(bank_days, internal_days, bucket_days,
+                                                      params['date_tolerance_days']):
+        bank_local, bank_texts = _compact_codes(bank_codes[bank_rows], bank_uniques)
+        internal_local, internal_texts = _compact_codes(internal_codes[internal_rows], internal_uniques)
+        buckets.append({
+            'bank_rows': bank_rows,
+            'internal_rows': internal_rows,
+            'bank_cents': bank_cents[bank_rows],
+            'bank_days': bank_days[bank_rows],
+            'bank_codes': bank_local,
+            'bank_uniques': bank_texts,
+            'internal_cents': internal_cents[internal_rows],
+            'internal_days': internal_days[internal_rows],
+            'internal_codes': internal_local,
+            'internal_uniques': internal_texts,
+            'params': worker_params,
+        })
+
+    logger.debug("⚙️ Conciliação paralela: %d buckets de %d dias em %d processos", len(buckets), bucket_days, workers)
+
+    if not buckets:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(_score_bucket, buckets))
+
+    bank_pos = np.concatenate([p[0] for p in parts])
+    internal_pos = np.concatenate([p[1] for p in parts])
+    scores = np.concatenate([p[2] for p in parts])
+
+    # Remove pares repetidos entre buckets vizinhos e restaura a ordem serial
+    keys = np.stack([bank_pos, internal_pos], axis=1)
+    _, first = np.unique(keys, axis=0, return_index=True)
+    return bank_pos[first], internal_pos[first], scores[first]
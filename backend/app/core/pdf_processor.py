@@ -1,42 +1,116 @@
+import logging
 import PyPDF2
+import numpy as np
 import pandas as pd
 import re
-from typing import List, Dict, Optional
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.core.bank_layouts import LAYOUTS, BankLayout, Columns, detect_layout, parse_dmy_date
+from app.core.cache import LRUCache, hash_stream
+from app.core.normalization import TRANSACTION_TYPES_PATTERN
+from app.core.tracing import span
+from app.core.transaction_batch import TransactionBatch
+
+logger = logging.getLogger(__name__)
+
+# Valor com sinal opcional colado ao valor: "-R$ 1,00", "R$ -1,00", "R$ 1,00-" ou sufixo
+# D/C seguido de espaço ou fim de linha ("R$ 1,00 D"). Um traço separado ("PIX - R$ 1,00")
+# é só separador, e "C/C 123" não é sufixo
+SIGNED_VALUE_PATTERN = (
+    r'(?P<lead_sign>-)?R\$\s?(?P<inner_sign>-)?(?P<int>\d{1,3}(?:\.\d{3})*),(?P<dec>\d{2})'
+    r'(?:(?P<trail_sign>-)|\s?(?P<dc>[DC])(?=\s|$))?'
+)
+
+# Páginas extraídas por tarefa no pool (amortiza a reabertura do PDF em cada processo)
+PAGES_PER_TASK = 8
+
+# Caminho do PDF ou arquivo binário já aberto (ex.: upload em memória ou mmap)
+PDFSource = Union[str, BinaryIO]
+
+
+def _extract_pages(source: PDFSource, start: int, stop: int) -> List[str]:
+    """Extrai o texto das páginas [start, stop) (executa nos processos do pool quando é um caminho)"""
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            return _extract_pages(file, start, stop)
+    reader = PyPDF2.PdfReader(source)
+    return [reader.pages[page_num].extract_text() for page_num in range(start, stop)]
+
+
+def _page_count(source: PDFSource) -> int:
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            return _page_count(file)
+    return len(PyPDF2.PdfReader(source).pages)
+
+
+# Caracteres do início do texto usados para detectar o layout quando não há páginas
+FIRST_PAGE_CHARS = 4000
+
+# Layout detectado por hash do documento (None = layout genérico)
+_document_layouts = LRUCache(256)
+
 
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, workers: int = 1):
+        # workers > 1 extrai as páginas em paralelo em um pool de processos
+        self.workers = workers
         self.common_patterns = {
             'date': r'\d{2}/\d{2}/\d{4}',
             'value': r'R\$\s?\d{1,3}(?:\.\d{3})*,\d{2}',
-            'transaction': r'(PIX|TED|DOC|TEF|BOLETO|DEPÓSITO|TRANSF|PAGAMENTO)'
+            'transaction': TRANSACTION_TYPES_PATTERN
         }
+        # Uma única regex por linha: cada ocorrência é uma data ou um valor. O lookahead
+        # inicial deixa o motor pular rápido as posições que não podem iniciar nenhum dos dois
+        self._line_pattern = re.compile(
+            f"(?=[-R\\d])(?:(?P<date>{self.common_patterns['date']})|{SIGNED_VALUE_PATTERN})"
+        )
     
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extrai texto de PDFs de extratos bancários"""
-        text = ""
+    def _page_bounds(self, source: PDFSource, page_range: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+        """Intervalo [início, fim) de páginas a extrair, limitado ao tamanho do documento"""
+        page_count = _page_count(source)
+        logger.debug("PDF possui %d páginas", page_count)
+        
+        start, stop = page_range if page_range else (0, page_count)
+        return max(0, start), min(page_count, stop)
+    
+    def iter_pages(self, source: PDFSource, page_range: Optional[Tuple[int, int]] = None) -> Iterator[str]:
+        """Gera o texto de cada página, em ordem, à medida que fica pronto.
+        
+        ``page_range`` é um intervalo [início, fim) com páginas a partir de 0
+        (ex.: (0, 2) para uma prévia das duas primeiras páginas). O pool de
+        processos só é usado com caminhos; arquivos abertos são lidos aqui mesmo.
+        """
         try:
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                print(f"PDF possui {len(reader.pages)} páginas")
-                
-                for page_num, page in enumerate(reader.pages):
-                    page_text = page.extract_text()
-                    text += page_text + "\n"
-                    print(f"Página {page_num + 1} extraída: {len(page_text)} caracteres")
-                    
+            start, stop = self._page_bounds(source, page_range)
+            if self.workers <= 1 or stop - start <= PAGES_PER_TASK or not isinstance(source, str):
+                for page_text in _extract_pages(source, start, stop):
+                    yield page_text
+                return
+            
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    executor.submit(_extract_pages, source, first, min(first + PAGES_PER_TASK, stop))
+                    for first in range(start, stop, PAGES_PER_TASK)
+                ]
+                # As tarefas rodam em paralelo; cada bloco é repassado assim que ele e os anteriores terminam
+                for future in futures:
+                    yield from future.result()
         except Exception as e:
             raise ValueError(f"Erro ao ler PDF: {str(e)}")
-        
-        return text
+    
+    def extract_text_from_pdf(self, source: PDFSource, page_range: Optional[Tuple[int, int]] = None) -> str:
+        """Extrai texto de PDFs de extratos bancários"""
+        with span('pdf_extract') as stage:
+            pages = [page_text + "\n" for page_text in self.iter_pages(source, page_range)]
+            stage.rows_out = len(pages)
+        return "".join(pages)
 
     def _parse_date(self, date_str: str) -> Optional[str]:
         """Converte datas para formato YYYY-MM-DD"""
-        try:
-            date_obj = datetime.strptime(date_str, '%d/%m/%Y')
-            return date_obj.strftime('%Y-%m-%d')
-        except ValueError:
-            return None
+        return parse_dmy_date(date_str)
 
     def _parse_value(self, value_str: str) -> Optional[float]:
         """Converte valores monetários para float"""
@@ -46,44 +120,158 @@ class PDFProcessor:
         except ValueError:
             return None
 
-    def parse_bank_statement(self, text: str) -> pd.DataFrame:
-        """Converte texto extraído em DataFrame estruturado"""
-        lines = text.split('\n')
-        transactions = []
+    def detect_layout(self, source: PDFSource) -> Optional[BankLayout]:
+        """Layout do banco pela primeira página, com cache por hash do documento"""
+        if isinstance(source, str):
+            with open(source, 'rb') as file:
+                document_hash = hash_stream(file)
+        else:
+            document_hash = hash_stream(source)
+        cached = _document_layouts.get(document_hash)
+        if cached is not None:
+            return LAYOUTS.get(cached)
+        
+        first_page = next(self.iter_pages(source, (0, 1)), '')
+        layout = detect_layout(first_page)
+        _document_layouts.put(document_hash, layout.name if layout else '')
+        return layout
+    
+    def parse_bank_statement(self, text: str, layout: Optional[str] = None) -> pd.DataFrame:
+        """Converte texto extraído em DataFrame estruturado.
+        
+        ``layout`` força um perfil do registro; sem ele, o perfil é detectado
+        pelo início do texto e, se nenhum casar, usa-se o parser genérico.
+        """
+        profile = LAYOUTS[layout] if layout else detect_layout(text[:FIRST_PAGE_CHARS])
+        with span('pdf_parse') as stage:
+            df = self._parse_with_layout(text.split('\n'), profile)
+            stage.rows_out = len(df)
+        return df
+    
+    def parse_pdf(self, source: PDFSource, page_range: Optional[Tuple[int, int]] = None,
+                  layout: Optional[str] = None) -> pd.DataFrame:
+        """Extrai e interpreta o PDF, passando cada página ao parser assim que é extraída"""
+        with span('ingest') as stage:
+            df = self._parse_pdf(source, page_range, layout)
+            stage.rows_out = len(df)
+        return df
+    
+    def _parse_pdf(self, source: PDFSource, page_range: Optional[Tuple[int, int]],
+                   layout: Optional[str]) -> pd.DataFrame:
+        profile = LAYOUTS[layout] if layout else self.detect_layout(source)
+        pages = self.iter_pages(source, page_range)
+        if profile is None:
+            return self._parse_with_layout(
+                chain.from_iterable(page_text.split('\n') for page_text in pages), None
+            )
+        
+        # Guarda as páginas para o fallback genérico caso o perfil não reconheça nada
+        seen: List[str] = []
+        
+        def remember(page_texts: Iterable[str]) -> Iterator[str]:
+            for page_text in page_texts:
+                seen.append(page_text)
+                yield page_text
+        
+        lines = chain.from_iterable(page_text.split('\n') for page_text in remember(pages))
+        df = self._parse_with_layout(lines, profile, fallback=False)
+        if df.empty and seen:
+            logger.info("Layout %s não reconheceu transações; usando o parser genérico", profile.name)
+            df = self._parse_with_layout(chain.from_iterable(page_text.split('\n') for page_text in seen), None)
+        return df
+    
+    def _parse_with_layout(self, lines: Iterable[str], profile: Optional[BankLayout],
+                           fallback: bool = True) -> pd.DataFrame:
+        """Despacha para o extrator do perfil ou para o parser genérico.
+        
+        Com ``fallback``, um perfil que não reconhece nenhuma linha cai no
+        parser genérico (as linhas são materializadas para a segunda passada).
+        """
+        if profile is None:
+            return self._to_frame(self._parse_lines(lines), 'generic')
+        
+        if fallback:
+            lines = list(lines)
+        columns = profile.parse_lines(lines)
+        if fallback and not columns[0]:
+            logger.info("Layout %s não reconheceu transações; usando o parser genérico", profile.name)
+            return self._to_frame(self._parse_lines(lines), 'generic')
+        return self._to_frame(columns, profile.name)
+    
+    def _parse_lines(self, lines: Iterable[str]) -> Columns:
+        """Parser genérico: converte as linhas do extrato em colunas (data, descrição, centavos).
+        
+        Cada linha passa uma única vez pela regex combinada: a primeira data
+        atualiza a data corrente, o primeiro valor vira centavos com sinal e o
+        que sobra fora das datas e valores é a descrição. O sufixo D/C do valor
+        dá o sinal e não entra na descrição; linhas sem descrição só viram
+        transação quando têm esse sufixo. As colunas são preenchidas
+        diretamente, sem um dicionário por transação.
+        """
+        finditer = self._line_pattern.finditer
+        dates: List[str] = []
+        descriptions: List[str] = []
+        cents: List[int] = []
         current_date = None
         
         for line in lines:
-            line = line.strip()
+            # Sem "/" não há data e sem "R$" não há valor
+            has_value = 'R$' in line
+            if not has_value and '/' not in line:
+                continue
             
-            date_match = re.search(self.common_patterns['date'], line)
-            if date_match:
-                current_date = self._parse_date(date_match.group())
+            value = None
+            typed = False
+            date_seen = False
+            pieces = []
+            last = 0
+            for match in finditer(line):
+                pieces.append(line[last:match.start()])
+                last = match.end()
+                date, lead_sign, inner_sign, int_part, dec, trail_sign, dc = match.groups()
+                if date is not None:
+                    if not date_seen:
+                        date_seen = True
+                        current_date = parse_dmy_date(date)
+                elif value is None:
+                    value = int(int_part.replace('.', '')) * 100 + int(dec)
+                    if lead_sign or inner_sign or trail_sign or dc == 'D':
+                        value = -value
+                    typed = dc is not None
             
-            value_match = re.search(self.common_patterns['value'], line)
-            if value_match and current_date:
-                value = self._parse_value(value_match.group())
-                
-                description = re.sub(self.common_patterns['date'], '', line)
-                description = re.sub(self.common_patterns['value'], '', description)
-                description = description.strip()
-                
-                if value is not None and description:
-                    transactions.append({
-                        'Data': current_date,
-                        'Descrição': description,
-                        'Valor': value,
-                        'Tipo': 'Crédito' if value >= 0 else 'Débito'
-                    })
-        
-        df = pd.DataFrame(transactions)
+            if value is None or current_date is None:
+                continue
+            pieces.append(line[last:])
+            description = ''.join(pieces).strip()
+            # Só data e valor costuma ser saldo; com sufixo D/C é lançamento, mesmo sem descrição
+            if description or typed:
+                dates.append(current_date)
+                descriptions.append(description)
+                cents.append(value)
         
-        if not df.empty:
-            print(f"Encontradas {len(df)} transações no PDF")
-        else:
-            print("Nenhuma transação encontrada no PDF")
+        return dates, descriptions, cents
+    
+    def _to_frame(self, columns: Columns, layout_name: str) -> pd.DataFrame:
+        """Monta o DataFrame de transações a partir das colunas; o layout usado fica em ``df.attrs``"""
+        dates, descriptions, cents = columns
+        values = np.array(cents, dtype=np.int64) / 100.0
+        df = pd.DataFrame({
+            'Data': dates,
+            'Descrição': descriptions,
+            'Valor': values,
+            'Tipo': np.where(values >= 0, 'Crédito', 'Débito')
+        })
+        df.attrs['layout'] = layout_name
         
+        logger.debug("Encontradas %d transações no PDF (layout %s)", len(df), layout_name)
         return df
 
+    def to_batch(self, df: pd.DataFrame) -> TransactionBatch:
+        """Converte as transações extraídas no lote colunar usado na conciliação"""
+        if df.empty:
+            return TransactionBatch.empty()
+        return TransactionBatch.from_dataframe(df, 'Data', 'Valor', 'Descrição')
+
 if __name__ == "__main__":
     processor = PDFProcessor()
     print("PDFProcessor criado com sucesso!")
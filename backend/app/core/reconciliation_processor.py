@@ -1,102 +1,470 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from fuzzywuzzy import fuzz
-import Levenshtein
-import json
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import logging
+
+from app.core.assignment import ASSIGNMENT_MODES, assign, pair_costs
+from app.core.cache import ReconciliationCache, get_cache, hash_key, hash_stream
+from app.core.candidate_index import CandidateIndex
+from app.core.csv_processor import CSVProcessor
+from app.core.ledger_index import LedgerIndex
+from app.core.match_set import MatchSet
+from app.core.ngram_index import NGramIndex, candidate_pairs
+from app.core.normalization import INVALID_CENTS, INVALID_DAY, normalize_ids, tolerance_to_cents
+from app.core.parallel import parallel_score_candidates, score_candidates
+from app.core.result_store import ReconciliationResult, batch_records, frame_records, match_records
+from app.core.similarity import DescriptionScorer
+from app.core.split_matching import (
+    DEFAULT_MAX_CANDIDATES, DEFAULT_MAX_PARTS, DEFAULT_TIME_BUDGET, match_splits
+)
+from app.core.streaming import TransactionAccumulator
+from app.core.tracing import debug_enabled, span
+from app.core.transaction_batch import TransactionBatch
+
+logger = logging.getLogger(__name__)
+
+# Camadas de pareamento, da mais barata para a mais cara; o ID (se houver) roda antes de todas
+MATCH_TIERS = ('exact_key', 'exact_amount', 'fuzzy')
+
+# Camadas que só rodam quando pedidas: 'description' pareia pela descrição quando o valor
+# não bate (ex.: tarifa descontada) e 'split' procura pagamentos divididos nas sobras
+OPTIONAL_TIERS = ('description', 'split')
 
 class ReconciliationProcessor:
-    def __init__(self, date_tolerance_days: int = 1, value_tolerance: float = 0.01, similarity_threshold: float = 0.8):
+    def __init__(self, date_tolerance_days: int = 1, value_tolerance: float = 0.01, similarity_threshold: float = 0.8,
+                 scorer: str = 'ratio', assignment_mode: str = 'optimal',
+                 workers: int = 1, bucket_days: int = 7, match_tiers: Sequence[str] = MATCH_TIERS,
+                 cache: Optional[ReconciliationCache] = None, split_max_parts: int = DEFAULT_MAX_PARTS,
+                 split_max_candidates: int = DEFAULT_MAX_CANDIDATES, split_time_budget: float = DEFAULT_TIME_BUDGET,
+                 description_top_k: int = 5, ngram_size: int = 3, amount_penalty: float = 1.0,
+                 canonical_descriptions: bool = False):
+        if assignment_mode not in ASSIGNMENT_MODES:
+            raise ValueError(f"Modo de pareamento '{assignment_mode}' não suportado. Opções: {list(ASSIGNMENT_MODES)}")
+        unknown = [tier for tier in match_tiers if tier not in MATCH_TIERS + OPTIONAL_TIERS]
+        if unknown:
+            raise ValueError(
+                f"Camadas de pareamento não suportadas: {unknown}. Opções: {list(MATCH_TIERS + OPTIONAL_TIERS)}"
+            )
         self.date_tolerance_days = date_tolerance_days
         self.value_tolerance = value_tolerance
+        self.tolerance_cents = tolerance_to_cents(value_tolerance)
         self.similarity_threshold = similarity_threshold
+        # canonical_descriptions compara descrições sem acentos, prefixo de tipo, documentos e datas
+        self.scorer = DescriptionScorer(scorer, canonical=canonical_descriptions)
+        # Índice persistente do lado interno (razão registrado) e as posições livres na
+        # camada corrente (None: todas)
+        self._internal_index: Optional[Tuple[CandidateIndex, Optional[np.ndarray]]] = None
+        self.assignment_mode = assignment_mode
+        # workers > 1 ativa o modo paralelo particionado por buckets de data
+        self.workers = workers
+        self.bucket_days = bucket_days
+        self.match_tiers = tuple(match_tiers)
+        self.cache = cache
+        # Limites da camada 'split': partes por combinação, candidatos por linha e segundos no total
+        self.split_max_parts = split_max_parts
+        self.split_max_candidates = split_max_candidates
+        self.split_time_budget = split_time_budget
+        # Camada 'description': candidatos por descrição, tamanho do n-grama e
+        # penalidade pela diferença relativa de valor (1.0: 10% de diferença custa 0.1 na nota)
+        self.description_top_k = description_top_k
+        self.ngram_size = ngram_size
+        self.amount_penalty = amount_penalty
     
-    def _convert_timestamps(self, obj: Any) -> Any:
-        """Converte objetos Timestamp para string para serialização JSON"""
-        if isinstance(obj, pd.Timestamp):
-            return obj.strftime('%Y-%m-%d')
-        elif isinstance(obj, pd.Series):
-            return obj.astype(str).tolist()
-        elif isinstance(obj, dict):
-            return {k: self._convert_timestamps(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_timestamps(item) for item in obj]
-        return obj
-    
-    def _normalize_dataframes(self, df1: pd.DataFrame, df2: pd.DataFrame, 
-                            date_col: str, value_col: str, desc_col: str, id_col: str = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        """Normaliza os DataFrames para comparação"""
-        print(f"🔄 [DEBUG] Normalizando DataFrames...")
-        
-        df1_clean = df1.copy()
-        df2_clean = df2.copy()
-        
-        # Garantir que colunas de data estão no formato correto
-        for i, df in enumerate([df1_clean, df2_clean], 1):
-            print(f"📅 [DEBUG] Processando DataFrame {i}")
-            print(f"   Colunas: {list(df.columns)}")
-            
-            if date_col in df.columns:
-                print(f"   Convertendo coluna de data: {date_col}")
-                df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-                print(f"   Datas convertidas. Valores únicos: {df[date_col].nunique()}")
-            
-            if value_col in df.columns:
-                print(f"   Convertendo coluna de valor: {value_col}")
-                df[value_col] = pd.to_numeric(df[value_col], errors='coerce')
-                print(f"   Valores convertidos. Range: {df[value_col].min()} to {df[value_col].max()}")
+    def result_params(self) -> Dict:
+        """Parâmetros que alteram o resultado (compõem a chave do cache de resultados)"""
+        return {
+            'date_tolerance_days': self.date_tolerance_days,
+            'value_tolerance': self.value_tolerance,
+            'similarity_threshold': self.similarity_threshold,
+            'scorer': self.scorer.scorer_name,
+            'assignment_mode': self.assignment_mode,
+            'match_tiers': list(self.match_tiers),
+            'split_max_parts': self.split_max_parts,
+            'split_max_candidates': self.split_max_candidates,
+            'split_time_budget': self.split_time_budget,
+            'description_top_k': self.description_top_k,
+            'ngram_size': self.ngram_size,
+            'amount_penalty': self.amount_penalty,
+            'canonical_descriptions': self.scorer.canonical,
+        }
+    
+    def _candidate_index(self, batch: TransactionBatch) -> CandidateIndex:
+        """Índice de candidatos do lote interno da camada corrente.
         
-        return df1_clean, df2_clean
+        Com um razão registrado, o índice persistente é só filtrado para as
+        linhas livres; senão, é reaproveitado do cache quando houver.
+        """
+        if self._internal_index is not None:
+            index, positions = self._internal_index
+            return index if positions is None else index.restrict(positions)
+        if self.cache is not None:
+            return self.cache.candidate_index(batch.cents, batch.days)
+        return CandidateIndex(batch.cents, batch.days)
+    
+    def _to_records(self, df: pd.DataFrame, positions: np.ndarray) -> List[Dict]:
+        """Converte as linhas indicadas em dicionários serializáveis em JSON"""
+        return frame_records(df, positions)
+    
+    def _rows(self, source: Union[pd.DataFrame, TransactionBatch], batch: TransactionBatch,
+              positions: np.ndarray, config: Dict) -> List[Dict]:
+        """Converte posições do lote em registros, a partir da origem (DataFrame ou lote)"""
+        if isinstance(source, pd.DataFrame):
+            return self._to_records(source, batch.row_index[positions])
+        return batch_records(batch, positions, config)
+    
+    def _serialize_matches(self, bank_records: List[Dict], internal_records: List[Dict],
+                           matches: MatchSet) -> List[Dict]:
+        """Monta os dicionários de match apenas na fronteira de serialização"""
+        return match_records(bank_records, internal_records, matches)
+    
+    def _to_batch(self, data: Union[pd.DataFrame, TransactionBatch], config: Dict,
+                  source_name: str) -> TransactionBatch:
+        """Valida as colunas e converte a entrada para o lote colunar tipado"""
+        if isinstance(data, TransactionBatch):
+            return data
+        
+        date_col = config.get('date_col', 'Data')
+        value_col = config.get('value_col', 'Valor')
+        desc_col = config.get('desc_col', 'Descricao')
+        for col in [date_col, value_col, desc_col]:
+            if col not in data.columns:
+                error_msg = f"Coluna '{col}' não encontrada no arquivo {source_name}. Colunas disponíveis: {list(data.columns)}"
+                logger.error("❌ %s", error_msg)
+                raise ValueError(error_msg)
+        
+        with span('normalize', rows_in=len(data)) as stage:
+            batch = TransactionBatch.from_dataframe(data, date_col, value_col, desc_col, config.get('id_col'))
+            stage.rows_out = len(batch)
+        return batch
     
     def _calculate_similarity(self, text1: str, text2: str) -> float:
         """Calcula similaridade entre duas strings"""
-        if pd.isna(text1) or pd.isna(text2):
-            return 0.0
-        return fuzz.ratio(str(text1).lower(), str(text2).lower()) / 100.0
-    
-    def _match_by_id(self, df1: pd.DataFrame, df2: pd.DataFrame, id_col: str) -> pd.DataFrame:
-        """Pareamento por ID único"""
-        if id_col not in df1.columns or id_col not in df2.columns:
-            return pd.DataFrame()
-        
-        merged = pd.merge(df1, df2, on=id_col, suffixes=('_bank', '_internal'))
-        return merged
-    
-    def _match_by_fuzzy_logic(self, df_bank: pd.DataFrame, df_internal: pd.DataFrame, 
-                             date_col: str, value_col: str, desc_col: str) -> pd.DataFrame:
-        """Pareamento por lógica fuzzy: data ± tolerância, valor ± tolerância, descrição similar"""
-        matches = []
-        
-        for _, bank_row in df_bank.iterrows():
-            bank_date = bank_row[date_col]
-            bank_value = bank_row[value_col]
-            bank_desc = bank_row[desc_col]
-            
-            # Encontrar correspondências no sistema interno
-            potential_matches = df_internal[
-                (abs((df_internal[date_col] - bank_date).dt.days) <= self.date_tolerance_days) &
-                (abs(df_internal[value_col] - bank_value) <= self.value_tolerance)
-            ]
+        return self.scorer.score(text1, text2)
+    
+    def _match_by_id(self, bank: TransactionBatch, internal: TransactionBatch) -> MatchSet:
+        """Pareamento por ID, um-para-um mesmo com IDs repetidos.
+        
+        IDs repetidos (pagamentos divididos, estornos) são ranqueados pela ordem de
+        ocorrência e o join é feito em (ID, rank), mantendo a memória linear. Pares
+        cujo valor ou data divergem além das tolerâncias viram 'id_conflict'.
+        """
+        if bank.ids is None or internal.ids is None:
+            return MatchSet.empty()
+        
+        # "101", 101 e 101.0 são o mesmo ID (ex.: coluna lida como número de um dos lados)
+        bank_ids, internal_ids = normalize_ids(bank.ids), normalize_ids(internal.ids)
+        bank_pos, internal_pos = self._hash_join(
+            {'id': bank_ids}, {'id': internal_ids}, pd.notna(bank_ids), pd.notna(internal_ids)
+        )
+        
+        value_ok = np.abs(internal.cents[internal_pos] - bank.cents[bank_pos]) <= self.tolerance_cents
+        date_ok = np.abs(internal.days[internal_pos].astype(np.int64) - bank.days[bank_pos]) <= self.date_tolerance_days
+        conflict = ~(value_ok & date_ok)
+        if debug_enabled() and conflict.any():
+            logger.debug("⚠️ %d IDs com valor ou data divergentes", int(conflict.sum()))
+        
+        order = np.argsort(bank_pos, kind='stable')
+        bank_pos, internal_pos, conflict = bank_pos[order], internal_pos[order], conflict[order]
+        return MatchSet.concat([
+            MatchSet.from_pairs(bank_pos[~conflict], internal_pos[~conflict], 1.0, 'exact_id'),
+            MatchSet.from_pairs(bank_pos[conflict], internal_pos[conflict], 0.0, 'id_conflict'),
+        ])
+    
+    def _row_codes(self, batch: TransactionBatch, unique_codes: np.ndarray) -> np.ndarray:
+        """Expande códigos por descrição distinta para códigos por linha (-1 para nulas)"""
+        codes = np.full(len(batch), -1, dtype=np.int64)
+        valid = batch.desc_ids >= 0
+        codes[valid] = unique_codes[batch.desc_ids[valid]]
+        return codes
+    
+    def _description_codes(self, batch: TransactionBatch) -> Tuple[np.ndarray, List[str]]:
+        """Códigos de descrição normalizada por linha, normalizando cada descrição distinta uma vez"""
+        unique_codes, uniques = self.scorer.prepare(batch.descriptions)
+        return self._row_codes(batch, unique_codes), uniques
+    
+    def _joint_description_codes(self, bank: TransactionBatch, internal: TransactionBatch) -> Tuple[np.ndarray, np.ndarray]:
+        """Códigos de descrição normalizada compartilhados entre os dois lados (-1 para nulas)"""
+        unique_codes, _ = self.scorer.prepare(np.concatenate([bank.descriptions, internal.descriptions]))
+        split = len(bank.descriptions)
+        return self._row_codes(bank, unique_codes[:split]), self._row_codes(internal, unique_codes[split:])
+    
+    def _hash_join(self, bank_keys: Dict[str, np.ndarray], internal_keys: Dict[str, np.ndarray],
+                   bank_valid: np.ndarray, internal_valid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Hash join um-para-um em chaves compostas exatas.
+        
+        Duplicatas dentro da mesma chave são pareadas pela ordem de ocorrência
+        (cumcount): a 1ª do banco com a 1ª do interno, a 2ª com a 2ª, etc.
+        """
+        names = list(bank_keys)
+        left = pd.DataFrame({name: values[bank_valid] for name, values in bank_keys.items()})
+        left['_bank_idx'] = np.flatnonzero(bank_valid)
+        right = pd.DataFrame({name: values[internal_valid] for name, values in internal_keys.items()})
+        right['_internal_idx'] = np.flatnonzero(internal_valid)
+        
+        left['_rank'] = left.groupby(names, sort=False).cumcount()
+        right['_rank'] = right.groupby(names, sort=False).cumcount()
+        merged = left.merge(right, on=names + ['_rank'], how='inner', sort=False)
+        return merged['_bank_idx'].to_numpy(dtype=np.int64), merged['_internal_idx'].to_numpy(dtype=np.int64)
+    
+    def _match_by_exact_key(self, bank: TransactionBatch, internal: TransactionBatch) -> MatchSet:
+        """Camada 1: chaves exatas (data, valor, descrição normalizada) e depois (data, valor)"""
+        bank_codes, internal_codes = self._joint_description_codes(bank, internal)
+        bank_valid = (bank.cents != INVALID_CENTS) & (bank.days != INVALID_DAY)
+        internal_valid = (internal.cents != INVALID_CENTS) & (internal.days != INVALID_DAY)
+        
+        # (data, valor, descrição)
+        bank_pos, internal_pos = self._hash_join(
+            {'days': bank.days, 'cents': bank.cents, 'desc': bank_codes},
+            {'days': internal.days, 'cents': internal.cents, 'desc': internal_codes},
+            bank_valid & (bank_codes >= 0), internal_valid & (internal_codes >= 0)
+        )
+        
+        # (data, valor) para o que sobrou
+        bank_valid[bank_pos] = False
+        internal_valid[internal_pos] = False
+        bank_pos2, internal_pos2 = self._hash_join(
+            {'days': bank.days, 'cents': bank.cents},
+            {'days': internal.days, 'cents': internal.cents},
+            bank_valid, internal_valid
+        )
+        
+        bank_pos = np.concatenate([bank_pos, bank_pos2])
+        internal_pos = np.concatenate([internal_pos, internal_pos2])
+        order = np.argsort(bank_pos, kind='stable')
+        return MatchSet.from_pairs(bank_pos[order], internal_pos[order], 1.0, 'exact_key')
+    
+    def _match_by_exact_amount(self, bank: TransactionBatch, internal: TransactionBatch) -> MatchSet:
+        """Camada 2: valor exato com data dentro da tolerância.
+        
+        O pareamento prioriza a menor distância de data; a similaridade da
+        descrição só desempata.
+        """
+        index = self._candidate_index(internal)
+        bank_pos, internal_pos = index.query(bank.cents, bank.days, 0, self.date_tolerance_days)
+        if len(bank_pos) == 0:
+            return MatchSet.empty()
+        
+        bank_codes, bank_uniques = self._description_codes(bank)
+        internal_codes, internal_uniques = self._description_codes(internal)
+        scores = self.scorer.score_pairs(
+            bank_codes[bank_pos], internal_codes[internal_pos], bank_uniques, internal_uniques
+        )
+        
+        day_diff = np.abs(internal.days[internal_pos].astype(np.int64) - bank.days[bank_pos])
+        cost = day_diff + (1.0 - scores) * 0.5
+        chosen = assign(bank_pos, internal_pos, cost, self.assignment_mode)
+        return MatchSet.from_pairs(bank_pos[chosen], internal_pos[chosen], scores[chosen], 'exact_amount')
+    
+    def _match_tiers(self, bank: TransactionBatch, internal: TransactionBatch, use_id: bool,
+                     internal_index: Optional[CandidateIndex] = None) -> Tuple[MatchSet, List[Dict]]:
+        """Executa as camadas de pareamento em sequência, cada uma sobre as sobras da anterior.
+        
+        ``internal_index`` é o índice de candidatos já construído para todo o lado
+        interno (razão registrado). Retorna todos os matches e, por camada,
+        quantos pares fez e quanto tempo levou.
+        """
+        tiers = [('exact_id', self._match_by_id)] if use_id else []
+        tier_methods = {
+            'exact_key': self._match_by_exact_key,
+            'exact_amount': self._match_by_exact_amount,
+            'fuzzy': self._match_by_fuzzy_logic,
+            'description': self._match_by_description,
+            'split': self._match_by_split,
+        }
+        tiers += [(name, tier_methods[name]) for name in self.match_tiers]
+        
+        bank_free = np.ones(len(bank), dtype=bool)
+        internal_free = np.ones(len(internal), dtype=bool)
+        all_matches = []
+        stats = []
+        
+        for name, method in tiers:
+            with span(f'match_{name}') as stage:
+                bank_remaining_pos = np.flatnonzero(bank_free)
+                internal_remaining_pos = np.flatnonzero(internal_free)
+                stage.rows_in = len(bank_remaining_pos)
+                if len(bank_remaining_pos) and len(internal_remaining_pos):
+                    if internal_index is not None:
+                        all_free = len(internal_remaining_pos) == len(internal)
+                        self._internal_index = (internal_index, None if all_free else internal_remaining_pos)
+                    try:
+                        # Lado inteiro livre: sem cópia (o razão registrado fica no mmap)
+                        matches = method(
+                            bank if len(bank_remaining_pos) == len(bank) else bank.take(bank_remaining_pos),
+                            internal if len(internal_remaining_pos) == len(internal)
+                            else internal.take(internal_remaining_pos)
+                        ).remap(bank_remaining_pos, internal_remaining_pos)
+                    finally:
+                        self._internal_index = None
+                else:
+                    matches = MatchSet.empty()
+                
+                bank_free[matches.bank_idx] = False
+                internal_free[matches.internal_idx] = False
+                all_matches.append(matches)
+                stage.rows_out = len(matches)
             
-            for _, internal_row in potential_matches.iterrows():
-                similarity = self._calculate_similarity(bank_desc, internal_row[desc_col])
-                if similarity >= self.similarity_threshold:
-                    match = {
-                        'bank_transaction': self._convert_timestamps(bank_row.to_dict()),
-                        'internal_transaction': self._convert_timestamps(internal_row.to_dict()),
-                        'similarity_score': similarity,
-                        'match_type': 'fuzzy'
-                    }
-                    matches.append(match)
-        
-        return pd.DataFrame(matches)
-    
-    def reconcile(self, bank_df: pd.DataFrame, internal_df: pd.DataFrame, 
-                 config: Dict) -> Dict:
-        """Executa a conciliação entre extrato bancário e sistema interno"""
-        print(f"🔍 [DEBUG] Iniciando reconciliação...")
-        print(f"📊 [DEBUG] Bank DF shape: {bank_df.shape}")
-        print(f"📊 [DEBUG] Internal DF shape: {internal_df.shape}")
+            exceptions = int(matches.is_exception().sum())
+            stats.append({
+                'tier': name,
+                'matched': matches.transaction_count() - exceptions,
+                'exceptions': exceptions,
+                'seconds': round(stage.seconds, 6)
+            })
+        
+        return MatchSet.concat(all_matches), stats
+    
+    def _match_by_fuzzy_logic(self, bank: TransactionBatch, internal: TransactionBatch) -> MatchSet:
+        """Pareamento por lógica fuzzy: data ± tolerância, valor ± tolerância, descrição similar.
+        
+        Retorna posições relativas aos lotes recebidos.
+        """
+        # Índice ordenado do lado interno: candidatos por busca binária em vez de varredura O(n·m);
+        # descrições normalizadas uma vez por valor distinto e pontuadas em lote
+        bank_cents, bank_days = bank.cents, bank.days
+        internal_cents, internal_days = internal.cents, internal.days
+        bank_codes, bank_uniques = self._description_codes(bank)
+        internal_codes, internal_uniques = self._description_codes(internal)
+        
+        params = {
+            'tolerance_cents': self.tolerance_cents,
+            'date_tolerance_days': self.date_tolerance_days,
+            'similarity_threshold': self.similarity_threshold,
+            'scorer': self.scorer.scorer_name,
+        }
+        if self.workers > 1:
+            bank_pos, internal_pos, scores = parallel_score_candidates(
+                bank_cents, bank_days, bank_codes,
+                internal_cents, internal_days, internal_codes,
+                bank_uniques, internal_uniques, params,
+                self.workers, self.bucket_days
+            )
+        else:
+            bank_pos, internal_pos, scores = score_candidates(
+                bank_cents, bank_days, bank_codes,
+                internal_cents, internal_days, internal_codes,
+                bank_uniques, internal_uniques, params,
+                index=self._candidate_index(internal)
+            )
+        logger.debug("🔎 Pares candidatos acima do limiar: %d", len(bank_pos))
+        
+        # Pareamento um-para-um: cada transação entra em no máximo um match
+        if self.assignment_mode != 'none':
+            cost = pair_costs(
+                internal_days[internal_pos].astype(np.int64) - bank_days[bank_pos],
+                internal_cents[internal_pos] - bank_cents[bank_pos],
+                scores,
+                self.date_tolerance_days,
+                self.tolerance_cents
+            )
+            chosen = assign(bank_pos, internal_pos, cost, self.assignment_mode)
+            if debug_enabled():
+                logger.debug("🧩 Pareamento %s: %d de %d pares mantidos",
+                             self.assignment_mode, int(chosen.sum()), len(chosen))
+            bank_pos, internal_pos, scores = bank_pos[chosen], internal_pos[chosen], scores[chosen]
+        
+        return MatchSet.from_pairs(bank_pos, internal_pos, scores, 'fuzzy')
+    
+    def _match_by_description(self, bank: TransactionBatch, internal: TransactionBatch) -> MatchSet:
+        """Pareamento pela descrição quando o valor não bate (ex.: tarifa descontada pelo banco).
+        
+        Um índice de n-gramas das descrições internas distintas dá os
+        ``description_top_k`` candidatos de cada descrição do banco sem comparar
+        todas com todas; só esses pares, dentro da tolerância de datas e com o
+        mesmo sinal de valor, são pontuados. A nota é a similaridade menos
+        ``amount_penalty`` × diferença relativa de valor e precisa alcançar o
+        ``similarity_threshold``.
+        """
+        bank_codes, bank_uniques = self._description_codes(bank)
+        internal_codes, internal_uniques = self._description_codes(internal)
+        # Só as descrições das linhas que sobraram (o lote guarda todas as distintas da origem)
+        bank_used = np.unique(bank_codes[bank_codes >= 0])
+        internal_used = np.unique(internal_codes[internal_codes >= 0])
+        if len(bank_used) == 0 or len(internal_used) == 0:
+            return MatchSet.empty()
+        
+        index = NGramIndex([internal_uniques[c] for c in internal_used], self.ngram_size)
+        query_pos, index_pos, _ = index.query([bank_uniques[c] for c in bank_used], self.description_top_k)
+        query_pos, index_pos = bank_used[query_pos], internal_used[index_pos]
+        bank_pos, internal_pos = candidate_pairs(
+            bank_codes, bank.days, internal_codes, internal.days, query_pos, index_pos, self.date_tolerance_days
+        )
+        bank_cents, internal_cents = bank.cents[bank_pos], internal.cents[internal_pos]
+        keep = (bank_cents != INVALID_CENTS) & (internal_cents != INVALID_CENTS) & (
+            np.sign(bank_cents) == np.sign(internal_cents)
+        )
+        bank_pos, internal_pos = bank_pos[keep], internal_pos[keep]
+        bank_cents, internal_cents = bank_cents[keep], internal_cents[keep]
+        logger.debug("🔤 Pares candidatos por descrição: %d", len(bank_pos))
+        if len(bank_pos) == 0:
+            return MatchSet.empty()
+        
+        scores = self.scorer.score_pairs(
+            bank_codes[bank_pos], internal_codes[internal_pos], bank_uniques, internal_uniques
+        )
+        delta = np.abs(bank_cents - internal_cents) / np.maximum(np.maximum(np.abs(bank_cents), np.abs(internal_cents)), 1)
+        scores = scores - self.amount_penalty * delta
+        keep = scores >= self.similarity_threshold
+        bank_pos, internal_pos, scores = bank_pos[keep], internal_pos[keep], scores[keep]
+        
+        # A nota decide; a distância de data só desempata
+        day_diff = np.abs(internal.days[internal_pos].astype(np.int64) - bank.days[bank_pos])
+        cost = (1.0 - scores) + day_diff / (self.date_tolerance_days + 1) * 0.01
+        chosen = assign(bank_pos, internal_pos, cost, self.assignment_mode)
+        return MatchSet.from_pairs(bank_pos[chosen], internal_pos[chosen], scores[chosen], 'description')
+    
+    def _match_by_split(self, bank: TransactionBatch, internal: TransactionBatch) -> MatchSet:
+        """Pagamentos divididos: um lançamento de um lado igual à soma de vários do outro.
+        
+        Primeiro cada linha do banco procura partes no sistema interno (depósito
+        consolidado); depois, nas sobras, cada linha interna procura partes no
+        banco. Cada sentido tem metade do orçamento de tempo. A nota cai com a
+        diferença entre a soma e o valor, dentro da tolerância: ela mede só a
+        proximidade dos valores e não é comparável à nota das camadas fuzzy e
+        de descrição (similaridade de texto).
+        """
+        limits = {
+            'tolerance_cents': self.tolerance_cents,
+            'date_tolerance_days': self.date_tolerance_days,
+            'max_parts': self.split_max_parts,
+            'max_candidates': self.split_max_candidates,
+            'time_budget': self.split_time_budget / 2,
+        }
+        bank_pos, internal_pos, diff = match_splits(bank.cents, bank.days, internal.cents, internal.days, **limits)
+        consolidated_bank = MatchSet.from_pairs(
+            bank_pos, internal_pos, 1.0 - diff / (self.tolerance_cents + 1), 'split'
+        )
+        
+        bank_left = np.setdiff1d(np.arange(len(bank)), bank_pos)
+        internal_left = np.setdiff1d(np.arange(len(internal)), internal_pos)
+        internal_pos, bank_pos, diff = match_splits(
+            internal.cents[internal_left], internal.days[internal_left],
+            bank.cents[bank_left], bank.days[bank_left], **limits
+        )
+        consolidated_internal = MatchSet.from_pairs(
+            bank_left[bank_pos], internal_left[internal_pos], 1.0 - diff / (self.tolerance_cents + 1), 'split'
+        )
+        return MatchSet.concat([consolidated_bank, consolidated_internal])
+    
+    def reconcile(self, bank_df: Union[pd.DataFrame, TransactionBatch],
+                  internal_df: Union[pd.DataFrame, TransactionBatch], config: Dict) -> Dict:
+        """Executa a conciliação entre extrato bancário e sistema interno.
+        
+        Aceita DataFrames (padronizados ou não) ou TransactionBatch; o núcleo do
+        pareamento trabalha sempre sobre os lotes colunares. Retorna o resultado
+        completo como dicionário; para paginar, use ``reconcile_result``.
+        """
+        return self.reconcile_result(bank_df, internal_df, config).to_dict()
+    
+    def reconcile_result(self, bank_df: Union[pd.DataFrame, TransactionBatch],
+                         internal_df: Union[pd.DataFrame, TransactionBatch], config: Dict,
+                         internal_index: Optional[CandidateIndex] = None) -> ReconciliationResult:
+        """Executa a conciliação e retorna o resultado colunar (sem montar dicionários por linha).
+        
+        ``internal_index`` é um índice de candidatos já pronto para o lado interno
+        inteiro (ver ``reconcile_ledger``).
+        """
+        logger.debug("🔍 Iniciando reconciliação...")
         
         # Extrair configurações
         date_col = config.get('date_col', 'Data')
@@ -104,108 +472,158 @@ class ReconciliationProcessor:
         desc_col = config.get('desc_col', 'Descricao')
         id_col = config.get('id_col', None)
         
-        print(f"📝 [DEBUG] Colunas identificadas: date={date_col}, value={value_col}, desc={desc_col}, id={id_col}")
+        logger.debug("📝 Colunas identificadas: date=%s, value=%s, desc=%s, id=%s", date_col, value_col, desc_col, id_col)
         
-        # Verificar se as colunas existem nos DataFrames
-        required_cols = [date_col, value_col, desc_col]
-        for col in required_cols:
-            if col not in bank_df.columns:
-                error_msg = f"Coluna '{col}' não encontrada no arquivo do banco. Colunas disponíveis: {list(bank_df.columns)}"
-                print(f"❌ [ERROR] {error_msg}")
-                raise ValueError(error_msg)
-            
-            if col not in internal_df.columns:
-                error_msg = f"Coluna '{col}' não encontrada no arquivo interno. Colunas disponíveis: {list(internal_df.columns)}"
-                print(f"❌ [ERROR] {error_msg}")
-                raise ValueError(error_msg)
+        # Tipagem única: datas em dias, valores em centavos, descrições internadas
+        bank = self._to_batch(bank_df, config, 'do banco')
+        internal = self._to_batch(internal_df, config, 'interno')
+        logger.debug("📊 Banco: %d transações (%d bytes)", len(bank), bank.nbytes)
+        logger.debug("📊 Sistema: %d transações (%d bytes)", len(internal), internal.nbytes)
         
-        print(f"✅ [DEBUG] Todas as colunas necessárias encontradas!")
+        # Pareamento em camadas: ID, chaves exatas, valor exato e, por fim, fuzzy
+        all_matches, tier_stats = self._match_tiers(bank, internal, use_id=bool(id_col), internal_index=internal_index)
         
-        # Normalizar dados
-        bank_df_norm, internal_df_norm = self._normalize_dataframes(
-            bank_df, internal_df, date_col, value_col, desc_col, id_col
-        )
+        # Pares com o mesmo ID mas valor/data divergentes saem como exceções
+        is_exception = all_matches.is_exception()
+        exceptions = all_matches.take(is_exception)
+        all_matches = all_matches.take(~is_exception)
+        
+        # Identificar transações não pareadas por diferença de conjuntos de posições
+        bank_only_pos = np.setdiff1d(np.arange(len(bank)), np.concatenate([all_matches.bank_idx, exceptions.bank_idx]))
+        internal_only_pos = np.setdiff1d(np.arange(len(internal)), np.concatenate([all_matches.internal_idx, exceptions.internal_idx]))
         
-        results = {
-            'matched': [],
-            'bank_only': [],
-            'internal_only': [],
-            'summary': {
-                'total_bank_transactions': len(bank_df_norm),
-                'total_internal_transactions': len(internal_df_norm),
-                'matched_count': 0,
-                'bank_only_count': 0,
-                'internal_only_count': 0,
-                'match_rate': 0
-            }
+        matched_count = all_matches.transaction_count()
+        summary = {
+            'total_bank_transactions': len(bank),
+            'total_internal_transactions': len(internal),
+            # Pagamentos divididos contam uma vez por grupo, não uma vez por parte
+            'matched_count': matched_count,
+            'split_group_count': all_matches.split_group_count(),
+            'exception_count': len(exceptions),
+            'bank_only_count': len(bank_only_pos),
+            'internal_only_count': len(internal_only_pos),
+            'match_rate': matched_count / max(len(bank), len(internal), 1),
+            'tiers': tier_stats
         }
         
-        # Etapa 1: Pareamento por ID (se disponível)
-        id_matches = pd.DataFrame()
-        if id_col and id_col in bank_df_norm.columns and id_col in internal_df_norm.columns:
-            id_matches = self._match_by_id(bank_df_norm, internal_df_norm, id_col)
+        logger.debug("📈 Reconciliação concluída: %s", summary)
         
-        # Etapa 2: Pareamento fuzzy para transações restantes
-        # Remover transações já pareadas por ID
-        bank_remaining = bank_df_norm
-        internal_remaining = internal_df_norm
+        # Os DataFrames de origem (se houver) permitem devolver todas as colunas originais
+        return ReconciliationResult(
+            bank, internal, all_matches, exceptions, bank_only_pos, internal_only_pos, summary, config,
+            bank_frame=bank_df if isinstance(bank_df, pd.DataFrame) else None,
+            internal_frame=internal_df if isinstance(internal_df, pd.DataFrame) else None
+        )
+    
+    def reconcile_stream(self, bank_chunks: Iterable[pd.DataFrame], internal_chunks: Iterable[pd.DataFrame],
+                         config: Dict) -> ReconciliationResult:
+        """Conciliação a partir de blocos (ex.: CSVProcessor.iter_chunks).
         
-        if not id_matches.empty:
-            matched_ids = id_matches[id_col].unique()
-            bank_remaining = bank_df_norm[~bank_df_norm[id_col].isin(matched_ids)]
-            internal_remaining = internal_df_norm[~internal_df_norm[id_col].isin(matched_ids)]
+        Cada bloco vira um TransactionBatch assim que chega, então o pico de
+        memória depende do tamanho do bloco e não do arquivo.
+        """
+        date_col = config.get('date_col', 'Data')
+        value_col = config.get('value_col', 'Valor')
+        desc_col = config.get('desc_col', 'Descricao')
+        id_col = config.get('id_col', None)
         
-        fuzzy_matches = self._match_by_fuzzy_logic(bank_remaining, internal_remaining, 
-                                                  date_col, value_col, desc_col)
+        bank_acc = TransactionAccumulator(date_col, value_col, desc_col, id_col, source_name='banco')
+        internal_acc = TransactionAccumulator(date_col, value_col, desc_col, id_col, source_name='sistema interno')
         
-        # Combinar resultados
-        all_matches = []
-        if not id_matches.empty:
-            for _, row in id_matches.iterrows():
-                match = {
-                    'bank_transaction': self._convert_timestamps(
-                        {k: v for k, v in row.items() if k.endswith('_bank') or k == id_col}
-                    ),
-                    'internal_transaction': self._convert_timestamps(
-                        {k: v for k, v in row.items() if k.endswith('_internal') or k == id_col}
-                    ),
-                    'similarity_score': 1.0,
-                    'match_type': 'exact_id'
-                }
-                all_matches.append(match)
-        
-        all_matches.extend(fuzzy_matches.to_dict('records'))
-        
-        # Identificar transações não pareadas
-        matched_bank_ids = set()
-        matched_internal_ids = set()
-        
-        for match in all_matches:
-            bank_trans = match['bank_transaction']
-            internal_trans = match['internal_transaction']
-            
-            if 'index' in bank_trans:
-                matched_bank_ids.add(bank_trans['index'])
-            if 'index' in internal_trans:
-                matched_internal_ids.add(internal_trans['index'])
-        
-        # Transações apenas no banco
-        bank_only = bank_df_norm[~bank_df_norm.index.isin(matched_bank_ids)]
-        # Transações apenas no sistema interno
-        internal_only = internal_df_norm[~internal_df_norm.index.isin(matched_internal_ids)]
-        
-        # Preparar resultados (convertendo timestamps)
-        results['matched'] = all_matches
-        results['bank_only'] = self._convert_timestamps(bank_only.to_dict('records'))
-        results['internal_only'] = self._convert_timestamps(internal_only.to_dict('records'))
-        
-        # Atualizar summary
-        results['summary']['matched_count'] = len(all_matches)
-        results['summary']['bank_only_count'] = len(bank_only)
-        results['summary']['internal_only_count'] = len(internal_only)
-        results['summary']['match_rate'] = len(all_matches) / max(len(bank_df_norm), len(internal_df_norm), 1)
-        
-        print(f"✅ [DEBUG] Reconciliação concluída!")
-        print(f"📈 [DEBUG] Resultados: {results['summary']}")
-        
-        return results
\ No newline at end of file
+        for accumulator, chunks in ((bank_acc, bank_chunks), (internal_acc, internal_chunks)):
+            with span('ingest') as stage:
+                for chunk in chunks:
+                    accumulator.add(chunk)
+                stage.rows_out = accumulator.row_count
+            logger.debug("📥 %s acumulado: %d transações", accumulator.source_name, accumulator.row_count)
+        
+        if bank_acc.row_count == 0:
+            raise ValueError("DataFrame do banco está vazio após processamento")
+        if internal_acc.row_count == 0:
+            raise ValueError("DataFrame do sistema interno está vazio após processamento")
+        
+        return self.reconcile_result(bank_acc.to_batch(), internal_acc.to_batch(), config)
+    
+    def _load_batch(self, source: BinaryIO, config: Dict, source_name: str) -> Tuple[str, TransactionBatch]:
+        """Lê um CSV em blocos como TransactionBatch, usando o cache de entradas por hash do conteúdo"""
+        content_hash = hash_stream(source)
+        columns = {name: config.get(name) for name in ('date_col', 'value_col', 'desc_col', 'id_col')}
+        key = hash_key(content=content_hash, **columns)
+        
+        batch = self.cache.get_batch(key) if self.cache is not None else None
+        if batch is not None:
+            logger.debug("♻️ Entrada do %s reaproveitada do cache", source_name)
+            return content_hash, batch
+        
+        accumulator = TransactionAccumulator(
+            config.get('date_col', 'Data'), config.get('value_col', 'Valor'),
+            config.get('desc_col', 'Descricao'), config.get('id_col', None), source_name=source_name
+        )
+        with span('ingest') as stage:
+            for chunk in CSVProcessor().iter_chunks(source):
+                accumulator.add(chunk)
+            stage.rows_out = accumulator.row_count
+        if accumulator.row_count == 0:
+            raise ValueError(f"DataFrame do {source_name} está vazio após processamento")
+        
+        batch = accumulator.to_batch()
+        if self.cache is not None:
+            self.cache.put_batch(key, batch)
+        return content_hash, batch
+    
+    def reconcile_sources(self, bank_source: BinaryIO, internal_source: BinaryIO,
+                          config: Dict) -> ReconciliationResult:
+        """Conciliação a partir de CSVs binários (uploads ou arquivos abertos).
+        
+        Com cache configurado, reexecuções sobre os mesmos arquivos reaproveitam o
+        resultado (mesmos parâmetros) ou as entradas já normalizadas (parâmetros
+        diferentes).
+        """
+        if self.cache is None:
+            return self.reconcile_stream(
+                CSVProcessor().iter_chunks(bank_source), CSVProcessor().iter_chunks(internal_source), config
+            )
+        
+        bank_hash, bank = self._load_batch(bank_source, config, 'banco')
+        internal_hash, internal = self._load_batch(internal_source, config, 'sistema interno')
+        
+        key = hash_key(bank=bank_hash, internal=internal_hash, config=config, params=self.result_params())
+        result = self.cache.get_result(key, lambda path: ReconciliationResult.load(path, bank, internal))
+        if result is not None:
+            logger.debug("♻️ Resultado reaproveitado do cache")
+            return result
+        
+        result = self.reconcile_result(bank, internal, config)
+        self.cache.put_result(key, result)
+        return result
+    
+    def reconcile_ledger(self, bank_source: BinaryIO, ledger: LedgerIndex, config: Dict) -> ReconciliationResult:
+        """Conciliação de um CSV do banco contra um razão interno registrado.
+        
+        O lado interno não é lido nem indexado de novo: lote e índice de
+        candidatos vêm do razão aberto com mmap.
+        """
+        bank_hash, bank = self._load_batch(bank_source, config, 'banco')
+        if self.cache is None:
+            return self.reconcile_result(bank, ledger.batch, config, internal_index=ledger.index)
+        
+        key = hash_key(bank=bank_hash, ledger=ledger.ledger_id, config=config, params=self.result_params())
+        result = self.cache.get_result(key, lambda path: ReconciliationResult.load(path, bank, ledger.batch))
+        if result is not None:
+            logger.debug("♻️ Resultado reaproveitado do cache")
+            return result
+        
+        result = self.reconcile_result(bank, ledger.batch, config, internal_index=ledger.index)
+        self.cache.put_result(key, result)
+        return result
+
+
+def reconcile_files(bank_path: str, internal_path: str, config: Dict, params: Dict,
+                    cache_dir: Optional[str] = None) -> ReconciliationResult:
+    """Lê dois CSVs em blocos e executa a conciliação (ponto de entrada dos jobs em processo separado).
+    
+    Com ``cache_dir``, os workers compartilham o cache em disco entre si e com a API.
+    """
+    processor = ReconciliationProcessor(**params, cache=get_cache(cache_dir) if cache_dir else None)
+    with open(bank_path, 'rb') as bank_file, open(internal_path, 'rb') as internal_file:
+        return processor.reconcile_sources(bank_file, internal_file, config)
@@ -0,0 +1,317 @@
+import json
+import logging
+import os
+import tempfile
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+
+from app.core.cache import DiskCache, LRUCache, read_batch, write_batch
+from app.core.match_set import MATCH_TYPES, MatchSet
+from app.core.normalization import INVALID_CENTS, INVALID_DAY
+from app.core.tracing import span
+from app.core.transaction_batch import TransactionBatch
+
+CATEGORIES = ('matched', 'exceptions', 'bank_only', 'internal_only')
+
+# Categorias de pares (aceitam filtros de score e tipo de match)
+MATCH_CATEGORIES = ('matched', 'exceptions')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+
+# Registros montados por vez no streaming NDJSON
+STREAM_CHUNK_SIZE = 1000
+
+# Diretório dos resultados paginados, compartilhado entre os workers do uvicorn
+DEFAULT_RESULT_DIR = os.path.join(tempfile.gettempdir(), 'conciliacao-results')
+
+logger = logging.getLogger(__name__)
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(value) -> bytes:
+    """Serializa em JSON (UTF-8) com orjson; tipos desconhecidos viram texto"""
+    return orjson.dumps(value, default=str, option=_ORJSON_OPTIONS)
+
+
+def frame_records(df: pd.DataFrame, positions: np.ndarray) -> List[Dict]:
+    """Linhas indicadas de um DataFrame de origem como dicionários serializáveis (todas as colunas)"""
+    subset = df.iloc[positions].copy()
+    for col in subset.columns:
+        if pd.api.types.is_datetime64_any_dtype(subset[col]):
+            subset[col] = subset[col].dt.strftime('%Y-%m-%d')
+    subset = subset.astype(object).where(subset.notna(), None)
+    return subset.to_dict('records')
+
+
+def batch_records(batch: TransactionBatch, positions: np.ndarray, config: Dict) -> List[Dict]:
+    """Linhas indicadas do lote como dicionários, direto das colunas.
+
+    As datas viram ISO em uma única chamada vetorizada sobre os dias (sem
+    ``strftime`` por célula) e os valores saem dos centavos; inválidos viram None.
+    """
+    days = batch.days[positions]
+    dates = np.datetime_as_string(days.astype('datetime64[D]'), unit='D').astype(object)
+    dates[days == INVALID_DAY] = None
+
+    cents = batch.cents[positions]
+    values = (cents / 100.0).astype(object)
+    values[cents == INVALID_CENTS] = None
+
+    desc_ids = batch.desc_ids[positions]
+    descriptions = np.full(len(positions), None, dtype=object)
+    valid = desc_ids >= 0
+    descriptions[valid] = batch.descriptions[desc_ids[valid]]
+
+    columns = {
+        config.get('date_col', 'Data'): dates.tolist(),
+        config.get('desc_col', 'Descricao'): descriptions.tolist(),
+        config.get('value_col', 'Valor'): values.tolist(),
+    }
+    id_col = config.get('id_col')
+    if id_col and batch.ids is not None:
+        ids = batch.ids[positions]
+        columns[id_col] = np.where(pd.notna(ids), ids, None).tolist()
+
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def match_records(bank_records: List[Dict], internal_records: List[Dict], matches: MatchSet) -> List[Dict]:
+    """Monta os dicionários de match apenas na fronteira de serialização"""
+    return [
+        {
+            'bank_transaction': bank_record,
+            'internal_transaction': internal_record,
+            'similarity_score': score,
+            'match_type': match_type
+        }
+        for bank_record, internal_record, score, match_type in zip(
+            bank_records, internal_records, matches.score.tolist(), matches.match_type_names()
+        )
+    ]
+
+
+class ReconciliationResult:
+    """Resultado da conciliação em formato colunar.
+
+    Guarda os lotes de entrada, os pares (matches e exceções) como MatchSet e
+    as posições não pareadas de cada lado. Nada vira dicionário até uma página
+    (ou um bloco do streaming) ser pedida. ``bank_frame``/``internal_frame``
+    são os DataFrames de origem, quando houver, para devolver todas as colunas.
+    """
+
+    __slots__ = ('bank', 'internal', 'matches', 'exceptions', 'bank_only', 'internal_only',
+                 'summary', 'config', 'bank_frame', 'internal_frame')
+
+    def __init__(self, bank: TransactionBatch, internal: TransactionBatch, matches: MatchSet,
+                 exceptions: MatchSet, bank_only: np.ndarray, internal_only: np.ndarray,
+                 summary: Dict, config: Dict, bank_frame: Optional[pd.DataFrame] = None,
+                 internal_frame: Optional[pd.DataFrame] = None):
+        self.bank = bank
+        self.internal = internal
+        self.matches = matches
+        self.exceptions = exceptions
+        self.bank_only = np.asarray(bank_only, dtype=np.int64)
+        self.internal_only = np.asarray(internal_only, dtype=np.int64)
+        self.summary = summary
+        self.config = config
+        self.bank_frame = bank_frame
+        self.internal_frame = internal_frame
+
+    def _side_records(self, side: str, positions: np.ndarray) -> List[Dict]:
+        batch, frame = (self.bank, self.bank_frame) if side == 'bank' else (self.internal, self.internal_frame)
+        if frame is not None:
+            return frame_records(frame, batch.row_index[positions])
+        return batch_records(batch, positions, self.config)
+
+    def _match_set(self, category: str) -> MatchSet:
+        return self.matches if category == 'matched' else self.exceptions
+
+    def selection(self, category: str, min_score: Optional[float] = None, max_score: Optional[float] = None,
+                  match_type: Optional[str] = None) -> np.ndarray:
+        """Posições (na categoria) que passam pelos filtros"""
+        if category not in CATEGORIES:
+            raise ValueError(f"Categoria '{category}' não suportada. Opções: {list(CATEGORIES)}")
+        has_filters = min_score is not None or max_score is not None or match_type is not None
+        if category not in MATCH_CATEGORIES:
+            if has_filters:
+                raise ValueError(f"Filtros de score e match_type só se aplicam a {list(MATCH_CATEGORIES)}")
+            return np.arange(len(self.bank_only if category == 'bank_only' else self.internal_only))
+
+        pairs = self._match_set(category)
+        mask = np.ones(len(pairs), dtype=bool)
+        if min_score is not None:
+            mask &= pairs.score >= min_score
+        if max_score is not None:
+            mask &= pairs.score <= max_score
+        if match_type is not None:
+            if match_type not in MATCH_TYPES:
+                raise ValueError(f"Tipo de match '{match_type}' não suportado. Opções: {list(MATCH_TYPES)}")
+            mask &= pairs.match_type == MATCH_TYPES.index(match_type)
+        return np.flatnonzero(mask)
+
+    def records(self, category: str, selected: np.ndarray) -> List[Dict]:
+        """Registros das posições selecionadas da categoria"""
+        with span('serialization', rows_in=len(selected)) as stage:
+            if category in MATCH_CATEGORIES:
+                pairs = self._match_set(category).take(selected)
+                records = match_records(
+                    self._side_records('bank', pairs.bank_idx),
+                    self._side_records('internal', pairs.internal_idx),
+                    pairs
+                )
+            elif category == 'bank_only':
+                records = self._side_records('bank', self.bank_only[selected])
+            else:
+                records = self._side_records('internal', self.internal_only[selected])
+            stage.rows_out = len(records)
+        return records
+
+    def page(self, category: str, cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+             min_score: Optional[float] = None, max_score: Optional[float] = None,
+             match_type: Optional[str] = None) -> Dict:
+        """Uma página da categoria; ``cursor`` é a posição inicial na seleção filtrada.
+
+        ``next_cursor`` é None na última página.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        cursor = max(0, cursor)
+        selected = self.selection(category, min_score, max_score, match_type)
+        stop = cursor + limit
+        return {
+            'items': self.records(category, selected[cursor:stop]),
+            'next_cursor': stop if stop < len(selected) else None,
+            'total': len(selected),
+        }
+
+    def iter_ndjson(self, category: str, selected: np.ndarray) -> Iterator[bytes]:
+        """Posições selecionadas (ver ``selection``) em NDJSON, montadas e serializadas em blocos"""
+        for start in range(0, len(selected), STREAM_CHUNK_SIZE):
+            records = self.records(category, selected[start:start + STREAM_CHUNK_SIZE])
+            yield b''.join([dumps(record) + b'\n' for record in records])
+
+    def first_page(self, result_id: str, limit: int = DEFAULT_PAGE_SIZE) -> Dict:
+        """Resposta resumida: summary e a primeira página de cada categoria.
+
+        ``totals`` tem a quantidade de linhas de cada categoria (os pagamentos
+        divididos têm uma linha por parte, e ``summary`` conta um por grupo).
+        """
+        response = {
+            'result_id': result_id, 'summary': self.summary, 'page_size': limit, 'next_cursors': {}, 'totals': {}
+        }
+        for category in CATEGORIES:
+            page = self.page(category, 0, limit)
+            response[category] = page['items']
+            response['next_cursors'][category] = page['next_cursor']
+            response['totals'][category] = page['total']
+        return response
+
+    def to_dict(self) -> Dict:
+        """Resultado completo no formato de dicionário (todas as categorias materializadas)"""
+        results = {
+            category: self.records(category, self.selection(category))
+            for category in CATEGORIES
+        }
+        results['summary'] = self.summary
+        return results
+
+    def save(self, path: str) -> None:
+        """Grava pares, posições e summary em .npz (os lotes ficam no cache de entradas)"""
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                summary=np.array(json.dumps(self.summary, ensure_ascii=False)),
+                config=np.array(json.dumps(self.config, ensure_ascii=False)),
+                bank_only=self.bank_only,
+                internal_only=self.internal_only,
+                **{f"{name}_{field}": getattr(pairs, field)
+                   for name, pairs in (('matches', self.matches), ('exceptions', self.exceptions))
+                   for field in MatchSet.__slots__}
+            )
+
+    @classmethod
+    def load(cls, path: str, bank: TransactionBatch, internal: TransactionBatch) -> 'ReconciliationResult':
+        """Lê um resultado gravado com ``save`` sobre os lotes de entrada correspondentes"""
+        with np.load(path, allow_pickle=False) as data:
+            pairs = {
+                name: MatchSet(*(data[f"{name}_{field}"] for field in MatchSet.__slots__))
+                for name in ('matches', 'exceptions')
+            }
+            return cls(
+                bank, internal, pairs['matches'], pairs['exceptions'],
+                data['bank_only'], data['internal_only'],
+                json.loads(str(data['summary'])), json.loads(str(data['config']))
+            )
+
+
+class ResultStore:
+    """Resultados recentes por id, para paginação e streaming após a conciliação.
+
+    Com ``directory``, cada resultado também é gravado em disco (lotes em Arrow
+    IPC, DataFrames de origem em Feather e pares/posições em .npz): qualquer
+    worker do uvicorn, inclusive depois de um reinício, lê as páginas de um
+    result_id. A memória guarda só os ``max_items`` mais recentes; o disco é
+    limitado por ``max_bytes`` e os resultados mais antigos saem primeiro.
+    """
+
+    def __init__(self, max_items: int = 32, directory: Optional[str] = None, max_bytes: int = 1 << 30):
+        self._results = LRUCache(max_items)
+        self.disk = DiskCache(directory, max_bytes) if directory else None
+
+    def put(self, result: ReconciliationResult, result_id: Optional[str] = None) -> str:
+        result_id = result_id or uuid.uuid4().hex
+        self._results.put(result_id, result)
+        if self.disk is not None:
+            self._write(result_id, result)
+        return result_id
+
+    def get(self, result_id: str) -> Optional[ReconciliationResult]:
+        result = self._results.get(result_id)
+        if result is None and self.disk is not None:
+            result = self._read(result_id)
+            if result is not None:
+                self._results.put(result_id, result)
+        return result
+
+    def _write(self, result_id: str, result: ReconciliationResult) -> None:
+        """Grava lotes e DataFrames antes do .npz: o resultado só existe em disco completo"""
+        for side in ('bank', 'internal'):
+            batch = getattr(result, side)
+            frame = getattr(result, f'{side}_frame')
+            try:
+                self.disk.write(result_id, f'.{side}.arrow', lambda path: write_batch(batch, path))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                # Ex.: IDs com tipos misturados; o resultado fica só na memória deste processo
+                logger.warning("⚠️ Resultado %s não gravado em disco: %s", result_id, e)
+                return
+            if frame is not None:
+                try:
+                    self.disk.write(result_id, f'.{side}.feather',
+                                    lambda path: frame.reset_index(drop=True).to_feather(path))
+                except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError) as e:
+                    # Sem o DataFrame as páginas saem só com as colunas do lote
+                    logger.warning("⚠️ Colunas de origem do resultado %s não gravadas: %s", result_id, e)
+        self.disk.write(result_id, '.npz', result.save)
+
+    def _read(self, result_id: str) -> Optional[ReconciliationResult]:
+        bank = self.disk.read(result_id, '.bank.arrow', read_batch)
+        internal = self.disk.read(result_id, '.internal.arrow', read_batch)
+        if bank is None or internal is None:
+            return None
+        result = self.disk.read(result_id, '.npz', lambda path: ReconciliationResult.load(path, bank, internal))
+        if result is not None:
+            for side in ('bank', 'internal'):
+                path = self.disk.path(result_id, f'.{side}.feather')
+                if os.path.exists(path):
+                    setattr(result, f'{side}_frame', self.disk.read(result_id, f'.{side}.feather', pd.read_feather))
+        return result
+
+    def __len__(self) -> int:
+        return len(self._results)
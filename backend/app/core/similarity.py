@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+
+from app.core.normalization import canonical_description
+
+SCORERS = {
+    'ratio': fuzz.ratio,
+    'token_set_ratio': fuzz.token_set_ratio,
+    'partial_ratio': fuzz.partial_ratio,
+}
+
+# Número de pares pontuados por chamada ao cdist
+PAIRS_PER_BLOCK = 2048
+
+# Acima de (células da matriz do bloco) / (pares) = fator, os pares são pontuados um a um (cpdist)
+SPARSE_BLOCK_FACTOR = 8
+
+
+class DescriptionScorer:
+    """Pontuação em lote de similaridade entre descrições usando RapidFuzz.
+
+    As descrições são normalizadas (``str().lower()``, ou a forma canônica de
+    ``canonical_description`` com ``canonical=True``) uma única vez por valor
+    distinto e cada par distinto de descrições é pontuado uma única vez, em
+    blocos com ``rapidfuzz.process.cdist``/``cpdist``. Com o scorer ``ratio`` e
+    sem forma canônica as notas são idênticas às do ``fuzzywuzzy.fuzz.ratio``
+    (inteiro arredondado, dividido por 100).
+    """
+
+    def __init__(self, scorer: str = 'ratio', workers: int = -1, canonical: bool = False):
+        if scorer not in SCORERS:
+            raise ValueError(f"Scorer '{scorer}' não suportado. Opções: {list(SCORERS)}")
+        self.scorer_name = scorer
+        self.scorer = SCORERS[scorer]
+        # ratio compara o texto apenas em minúsculas, como o fuzzywuzzy;
+        # os demais usam o pré-processamento padrão (remove pontuação)
+        self.processor = None if scorer == 'ratio' else default_process
+        self.workers = workers
+        self.canonical = canonical
+
+    def normalize(self, text) -> str:
+        """Texto usado na comparação (minúsculas ou forma canônica)"""
+        return canonical_description(str(text)) if self.canonical else str(text).lower()
+
+    def prepare(self, descriptions) -> Tuple[np.ndarray, List[str]]:
+        """Normaliza as descrições uma vez por valor distinto.
+
+        As descrições brutas são fatoradas primeiro e só as distintas são
+        normalizadas; os textos normalizados são internados em códigos inteiros
+        (descrições que viram o mesmo texto ficam com o mesmo código).
+
+        Retorna os códigos de cada linha (-1 para nulos) e a lista de textos
+        normalizados indexada pelos códigos.
+        """
+        series = pd.Series(descriptions, dtype=object)
+        missing = series.isna().to_numpy()
+        raw_codes, raw_uniques = pd.factorize(series[~missing])
+        codes, uniques = pd.factorize(pd.Series([self.normalize(text) for text in raw_uniques], dtype=object))
+
+        all_codes = np.full(len(series), -1, dtype=np.int64)
+        all_codes[~missing] = codes[raw_codes]
+        return all_codes, list(uniques)
+
+    def _finalize(self, raw: np.ndarray) -> np.ndarray:
+        """Arredonda as notas como o fuzzywuzzy (inteiro, meio para o par) e escala para 0..1"""
+        return np.rint(raw) / 100.0
+
+    def score_matrix(self, queries: List[str], choices: List[str],
+                     threshold: float = 0.0) -> np.ndarray:
+        """Pontua todas as combinações queries × choices, retornando uma matriz 0..1.
+
+        Notas abaixo de ``threshold`` são zeradas.
+        """
+        if not queries or not choices:
+            return np.zeros((len(queries), len(choices)), dtype=np.float64)
+
+        # O corte é aplicado antes do arredondamento, então fica meio ponto abaixo
+        cutoff = max(threshold * 100.0 - 0.5, 0.0)
+        raw = process.cdist(
+            queries, choices,
+            scorer=self.scorer,
+            processor=self.processor,
+            score_cutoff=cutoff,
+            dtype=np.float64,
+            workers=self.workers
+        )
+        scores = self._finalize(raw)
+        scores[scores < threshold] = 0.0
+        return scores
+
+    def score_aligned(self, left: List[str], right: List[str], threshold: float = 0.0) -> np.ndarray:
+        """Pontua os pares (left[k], right[k]) um a um via cpdist, com as mesmas notas do score_matrix"""
+        if not left:
+            return np.zeros(0, dtype=np.float64)
+        cutoff = max(threshold * 100.0 - 0.5, 0.0)
+        raw = process.cpdist(
+            left, right,
+            scorer=self.scorer,
+            processor=self.processor,
+            score_cutoff=cutoff,
+            dtype=np.float64,
+            workers=self.workers
+        )
+        scores = self._finalize(raw)
+        scores[scores < threshold] = 0.0
+        return scores
+
+    def score_pairs(self, left_codes: np.ndarray, right_codes: np.ndarray,
+                    left_uniques: List[str], right_uniques: List[str],
+                    threshold: float = 0.0) -> np.ndarray:
+        """Pontua pares (left_codes[k], right_codes[k]) em blocos via cdist/cpdist.
+
+        Cada par distinto de códigos é pontuado uma única vez. Pares com
+        descrição nula recebem 0.
+        """
+        left_codes = np.asarray(left_codes, dtype=np.int64)
+        right_codes = np.asarray(right_codes, dtype=np.int64)
+        scores = np.zeros(len(left_codes), dtype=np.float64)
+        valid = (left_codes >= 0) & (right_codes >= 0)
+        if not valid.any():
+            return scores
+
+        # Pares distintos (ordenados pelo código da esquerda, o que agrupa os blocos)
+        width = max(len(right_uniques), 1)
+        pair_keys, pair_inv = np.unique(left_codes[valid] * width + right_codes[valid], return_inverse=True)
+        pair_left, pair_right = pair_keys // width, pair_keys % width
+        pair_scores = np.zeros(len(pair_keys), dtype=np.float64)
+
+        for start in range(0, len(pair_keys), PAIRS_PER_BLOCK):
+            end = min(start + PAIRS_PER_BLOCK, len(pair_keys))
+            left, right = pair_left[start:end], pair_right[start:end]
+            left_block, left_inv = np.unique(left, return_inverse=True)
+            right_block, right_inv = np.unique(right, return_inverse=True)
+            if len(left_block) * len(right_block) > SPARSE_BLOCK_FACTOR * (end - start):
+                # Matriz do bloco quase toda desperdiçada: pontua os pares um a um
+                pair_scores[start:end] = self.score_aligned(
+                    [left_uniques[c] for c in left],
+                    [right_uniques[c] for c in right],
+                    threshold
+                )
+            else:
+                matrix = self.score_matrix(
+                    [left_uniques[c] for c in left_block],
+                    [right_uniques[c] for c in right_block],
+                    threshold
+                )
+                pair_scores[start:end] = matrix[left_inv, right_inv]
+
+        scores[valid] = pair_scores[pair_inv]
+        return scores
+
+    def score(self, text1, text2) -> float:
+        """Pontua um único par de descrições"""
+        if pd.isna(text1) or pd.isna(text2):
+            return 0.0
+        raw = self.scorer(self.normalize(text1), self.normalize(text2), processor=self.processor)
+        return float(self._finalize(np.float64(raw)))
+
@@ -0,0 +1,144 @@
+import itertools
+import logging
+import time
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.core.normalization import INVALID_CENTS, INVALID_DAY
+
+logger = logging.getLogger(__name__)
+
+# Limites padrão: partes por combinação, candidatos por linha e tempo total da busca
+DEFAULT_MAX_PARTS = 4
+DEFAULT_MAX_CANDIDATES = 16
+DEFAULT_TIME_BUDGET = 2.0
+
+# Máscaras de bits em int64: no máximo 62 candidatos por linha
+MAX_CANDIDATES_LIMIT = 62
+
+
+@lru_cache(maxsize=64)
+def _combinations(n: int, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Todas as combinações de ``size`` entre ``n`` candidatos: (índices, máscara de bits)"""
+    combos = np.array(list(itertools.combinations(range(n), size)), dtype=np.int64).reshape(-1, size)
+    masks = np.bitwise_or.reduce(np.left_shift(1, combos), axis=1)
+    return combos, masks
+
+
+def find_subset(target: int, amounts: np.ndarray, tolerance_cents: int,
+                max_parts: int) -> Optional[np.ndarray]:
+    """Menor combinação (2..max_parts itens) cuja soma fica a até ``tolerance_cents`` do alvo.
+
+    Meet-in-the-middle: para k partes, as somas das combinações de k - k//2
+    itens ficam ordenadas e cada combinação de k//2 itens procura por busca
+    binária o complemento ``alvo - soma``; só pares disjuntos (máscaras de
+    bits) valem. Entre as soluções de mesmo tamanho, fica a de menor diferença.
+    Retorna os índices em ``amounts`` ou None.
+    """
+    n = len(amounts)
+    for parts in range(2, min(max_parts, n) + 1):
+        left_size = parts // 2
+        left, left_masks = _combinations(n, left_size)
+        right, right_masks = _combinations(n, parts - left_size)
+        left_sums = amounts[left].sum(axis=1)
+        right_sums = amounts[right].sum(axis=1)
+        order = np.argsort(right_sums, kind='stable')
+        right_sums, right, right_masks = right_sums[order], right[order], right_masks[order]
+
+        lo = np.searchsorted(right_sums, target - left_sums - tolerance_cents, side='left')
+        hi = np.searchsorted(right_sums, target - left_sums + tolerance_cents, side='right')
+        counts = hi - lo
+        if not counts.any():
+            continue
+
+        # Expande os intervalos encontrados em pares (esquerda, direita) e descarta os que se sobrepõem
+        left_idx = np.repeat(np.arange(len(left)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        right_idx = np.repeat(lo, counts) + offsets
+        disjoint = (left_masks[left_idx] & right_masks[right_idx]) == 0
+        if not disjoint.any():
+            continue
+        left_idx, right_idx = left_idx[disjoint], right_idx[disjoint]
+        diff = np.abs(left_sums[left_idx] + right_sums[right_idx] - target)
+        best = int(np.argmin(diff))
+        return np.concatenate([left[left_idx[best]], right[right_idx[best]]])
+    return None
+
+
+def match_splits(target_cents: np.ndarray, target_days: np.ndarray,
+                 part_cents: np.ndarray, part_days: np.ndarray,
+                 tolerance_cents: int, date_tolerance_days: int,
+                 max_parts: int = DEFAULT_MAX_PARTS, max_candidates: int = DEFAULT_MAX_CANDIDATES,
+                 time_budget: float = DEFAULT_TIME_BUDGET) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pareamento um-para-muitos: cada alvo recebe até ``max_parts`` partes que somam o seu valor.
+
+    As partes de um alvo têm o mesmo sinal do alvo e data dentro da tolerância;
+    se houver mais de ``max_candidates``, ficam as mais próximas na data. Cada
+    parte é usada uma única vez (os alvos são processados em ordem de data).
+    A busca para ao estourar ``time_budget`` segundos, mantendo o que já achou.
+
+    Retorna (posição do alvo, posição da parte, diferença em centavos), um
+    item por parte.
+    """
+    max_candidates = min(max_candidates, MAX_CANDIDATES_LIMIT)
+    target_cents = np.asarray(target_cents, dtype=np.int64)
+    target_days = np.asarray(target_days, dtype=np.int64)
+    part_cents = np.asarray(part_cents, dtype=np.int64)
+    part_days = np.asarray(part_days, dtype=np.int64)
+
+    valid_parts = np.flatnonzero((part_cents != INVALID_CENTS) & (part_days != INVALID_DAY) & (part_cents != 0))
+    order = valid_parts[np.argsort(part_days[valid_parts], kind='stable')]
+    days_sorted = part_days[order]
+    cents_sorted = part_cents[order]
+
+    # Somas acumuladas por sinal: descartam, sem laço, alvos que nem a janela inteira alcança
+    positive = np.concatenate([[0], np.cumsum(np.where(cents_sorted > 0, cents_sorted, 0))])
+    negative = np.concatenate([[0], np.cumsum(np.where(cents_sorted < 0, cents_sorted, 0))])
+
+    valid_targets = (target_cents != INVALID_CENTS) & (target_days != INVALID_DAY) & (target_cents != 0)
+    lo = np.searchsorted(days_sorted, target_days - date_tolerance_days, side='left')
+    hi = np.searchsorted(days_sorted, target_days + date_tolerance_days, side='right')
+    reachable = np.where(
+        target_cents > 0,
+        positive[hi] - positive[lo] >= target_cents - tolerance_cents,
+        negative[hi] - negative[lo] <= target_cents + tolerance_cents
+    )
+    candidates = np.flatnonzero(valid_targets & (hi - lo >= 2) & reachable)
+    candidates = candidates[np.argsort(target_days[candidates], kind='stable')]
+
+    used = np.zeros(len(order), dtype=bool)
+    target_out, part_out, diff_out = [], [], []
+    deadline = time.perf_counter() + time_budget
+    for searched, t in enumerate(candidates.tolist()):
+        if time.perf_counter() > deadline:
+            logger.info("⏳ Busca de pagamentos divididos interrompida pelo orçamento de tempo: %d de %d linhas",
+                        searched, len(candidates))
+            break
+        target = int(target_cents[t])
+        window = np.arange(lo[t], hi[t])
+        window_cents = cents_sorted[window]
+        keep = ~used[window] & (np.sign(window_cents) == np.sign(target)) & (
+            np.abs(window_cents) <= abs(target) + tolerance_cents
+        )
+        window = window[keep]
+        if len(window) < 2:
+            continue
+        if len(window) > max_candidates:
+            nearest = np.argsort(np.abs(days_sorted[window] - target_days[t]), kind='stable')[:max_candidates]
+            window = np.sort(window[nearest])
+
+        chosen = find_subset(target, cents_sorted[window], tolerance_cents, max_parts)
+        if chosen is None:
+            continue
+        parts = window[chosen]
+        used[parts] = True
+        target_out.append(np.full(len(parts), t, dtype=np.int64))
+        part_out.append(order[parts])
+        diff_out.append(np.full(len(parts), abs(int(cents_sorted[parts].sum()) - target), dtype=np.int64))
+
+    if not target_out:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(target_out), np.concatenate(part_out), np.concatenate(diff_out)
@@ -0,0 +1,57 @@
+import pandas as pd
+from typing import List, Optional
+
+from app.core.tracing import span
+from app.core.transaction_batch import TransactionBatch
+
+# A cada quantos blocos os lotes acumulados são reinternados em um só
+CONSOLIDATE_EVERY = 16
+
+
+class TransactionAccumulator:
+    """Acumula blocos padronizados de um arquivo guardando só o necessário para conciliar.
+
+    Cada bloco é convertido em um TransactionBatch (centavos, dias, descrições
+    internadas e ID) e o bloco original é descartado. O pico de memória fica
+    limitado ao tamanho do bloco mais o acumulado compacto, e não ao tamanho
+    do arquivo.
+    """
+
+    def __init__(self, date_col: str, value_col: str, desc_col: str,
+                 id_col: Optional[str] = None, source_name: str = 'banco'):
+        self.date_col = date_col
+        self.value_col = value_col
+        self.desc_col = desc_col
+        self.id_col = id_col
+        self.source_name = source_name
+        self.row_count = 0
+        self._batches: List[TransactionBatch] = []
+
+    def _check_columns(self, chunk: pd.DataFrame) -> None:
+        """Valida as colunas obrigatórias no primeiro bloco"""
+        for col in [self.date_col, self.value_col, self.desc_col]:
+            if col not in chunk.columns:
+                raise ValueError(
+                    f"Coluna '{col}' não encontrada no arquivo do {self.source_name}. "
+                    f"Colunas disponíveis: {list(chunk.columns)}"
+                )
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Adiciona um bloco padronizado"""
+        if self.row_count == 0:
+            self._check_columns(chunk)
+
+        with span('normalize', rows_in=len(chunk)) as stage:
+            self._batches.append(TransactionBatch.from_dataframe(
+                chunk, self.date_col, self.value_col, self.desc_col, self.id_col, row_offset=self.row_count
+            ))
+            stage.rows_out = len(self._batches[-1])
+        self.row_count += len(chunk)
+
+        # Descrições repetidas entre blocos não devem se acumular
+        if len(self._batches) >= CONSOLIDATE_EVERY:
+            self._batches = [TransactionBatch.concat(self._batches)]
+
+    def to_batch(self) -> TransactionBatch:
+        """Lote único com todas as linhas acumuladas"""
+        return TransactionBatch.concat(self._batches)
@@ -0,0 +1,126 @@
+import contextlib
+import contextvars
+import logging
+import os
+import resource
+import time
+from typing import Dict, Iterator, List, Optional
+
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'reconcile_stage_seconds', 'Duração de cada etapa da conciliação', ('stage',)
+)
+STAGE_ROWS_IN = REGISTRY.counter(
+    'reconcile_stage_rows_in_total', 'Linhas recebidas por etapa', ('stage',)
+)
+STAGE_ROWS_OUT = REGISTRY.counter(
+    'reconcile_stage_rows_out_total', 'Linhas produzidas por etapa', ('stage',)
+)
+STAGE_MEMORY = REGISTRY.gauge(
+    'reconcile_stage_memory_delta_bytes', 'Variação de memória residente na última execução da etapa', ('stage',)
+)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _rss_bytes() -> int:
+    """Memória residente atual (Linux: /proc, leitura barata); fora dele, o pico do processo"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def debug_enabled() -> bool:
+    """Estatísticas caras (nunique, min/max, amostras) só devem ser calculadas quando True"""
+    return logging.getLogger('app').isEnabledFor(logging.DEBUG)
+
+
+def configure_logging(debug: Optional[bool] = None) -> None:
+    """Nível dos logs da aplicação; sem argumento, usa a variável RECONCILE_DEBUG"""
+    if debug is None:
+        debug = os.environ.get('RECONCILE_DEBUG', '').lower() in ('1', 'true', 'yes')
+    app_logger = logging.getLogger('app')
+    app_logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    if not app_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        app_logger.addHandler(handler)
+
+
+class Span:
+    """Medição de uma etapa: tempo de parede, linhas de entrada/saída e variação de memória"""
+
+    __slots__ = ('stage', 'rows_in', 'rows_out', 'seconds', 'memory_delta')
+
+    def __init__(self, stage: str, rows_in: Optional[int] = None):
+        self.stage = stage
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.seconds = 0.0
+        self.memory_delta = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'stage': self.stage,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'seconds': round(self.seconds, 6),
+            'memory_delta': self.memory_delta,
+        }
+
+
+class Trace:
+    """Spans de uma execução (ex.: uma requisição), na ordem em que terminaram"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def to_list(self) -> List[Dict]:
+        return [span.to_dict() for span in self.spans]
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('reconcile_trace', default=None)
+
+
+@contextlib.contextmanager
+def trace() -> Iterator[Trace]:
+    """Coleta os spans executados dentro do bloco (no mesmo contexto)"""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+@contextlib.contextmanager
+def span(stage: str, rows_in: Optional[int] = None) -> Iterator[Span]:
+    """Mede a etapa do bloco; quem chama preenche ``rows_out`` (e ``rows_in``, se só souber depois).
+
+    O span vai para as métricas agregadas do processo e para o trace corrente, se houver.
+    """
+    current = Span(stage, rows_in)
+    rss = _rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        current.memory_delta = _rss_bytes() - rss
+        STAGE_SECONDS.observe(current.seconds, stage=stage)
+        if current.rows_in is not None:
+            STAGE_ROWS_IN.inc(current.rows_in, stage=stage)
+        if current.rows_out is not None:
+            STAGE_ROWS_OUT.inc(current.rows_out, stage=stage)
+        STAGE_MEMORY.set(current.memory_delta, stage=stage)
+
+        run_trace = _current_trace.get()
+        if run_trace is not None:
+            run_trace.spans.append(current)
+        logger.debug("⏱️ %s: %.3fs, linhas %s -> %s, memória %+d bytes",
+                     stage, current.seconds, current.rows_in, current.rows_out, current.memory_delta)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence
+
+from app.core.normalization import (
+    INVALID_CENTS, INVALID_DAY, parse_amounts, parse_dates, to_cents, to_day_ordinals
+)
+
+
+class TransactionBatch:
+    """Lote colunar e compacto de transações usado no núcleo da conciliação.
+
+    Cada transação ocupa ~24 bytes em arrays NumPy: valor em centavos (int64),
+    data em dias desde 1970 (int32), id da descrição internada (int32) e a
+    posição da linha na origem (int64). As descrições distintas ficam uma única
+    vez em ``descriptions``. O ID externo (opcional) é mantido para o pareamento
+    por ID.
+    """
+
+    __slots__ = ('cents', 'days', 'desc_ids', 'descriptions', 'row_index', 'ids')
+
+    def __init__(self, cents: np.ndarray, days: np.ndarray, desc_ids: np.ndarray,
+                 descriptions: np.ndarray, row_index: Optional[np.ndarray] = None,
+                 ids: Optional[np.ndarray] = None):
+        self.cents = np.asarray(cents, dtype=np.int64)
+        self.days = np.asarray(days, dtype=np.int32)
+        self.desc_ids = np.asarray(desc_ids, dtype=np.int32)
+        self.descriptions = np.asarray(descriptions, dtype=object)
+        self.row_index = (np.arange(len(self.cents), dtype=np.int64) if row_index is None
+                          else np.asarray(row_index, dtype=np.int64))
+        self.ids = None if ids is None else np.asarray(ids, dtype=object)
+
+    @classmethod
+    def empty(cls) -> 'TransactionBatch':
+        """Lote vazio"""
+        return cls(np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=object))
+
+    @classmethod
+    def from_columns(cls, dates, values, descriptions, ids=None,
+                     row_offset: int = 0) -> 'TransactionBatch':
+        """Cria o lote a partir de colunas (datas, valores, descrições e IDs opcionais)"""
+        desc_ids, uniques = pd.factorize(pd.Series(descriptions, dtype=object))
+        cents = to_cents(parse_amounts(pd.Series(values)))
+        days = to_day_ordinals(parse_dates(pd.Series(dates)))
+        row_index = np.arange(row_offset, row_offset + len(cents), dtype=np.int64)
+        return cls(cents, days, desc_ids, np.asarray(uniques, dtype=object), row_index,
+                   None if ids is None else pd.Series(ids).to_numpy(dtype=object))
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, date_col: str, value_col: str, desc_col: str,
+                       id_col: Optional[str] = None, row_offset: int = 0) -> 'TransactionBatch':
+        """Cria o lote a partir das colunas de um DataFrame"""
+        ids = df[id_col] if id_col and id_col in df.columns else None
+        return cls.from_columns(df[date_col], df[value_col], df[desc_col], ids, row_offset)
+
+    @classmethod
+    def concat(cls, batches: Sequence['TransactionBatch']) -> 'TransactionBatch':
+        """Concatena lotes reinternando as descrições"""
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        all_descriptions = np.concatenate([b.descriptions for b in batches])
+        remap, uniques = pd.factorize(pd.Series(all_descriptions, dtype=object))
+        desc_parts = []
+        offset = 0
+        for b in batches:
+            local = remap[offset:offset + len(b.descriptions)]
+            desc_parts.append(np.where(b.desc_ids >= 0, local[np.maximum(b.desc_ids, 0)], -1))
+            offset += len(b.descriptions)
+
+        has_ids = all(b.ids is not None for b in batches)
+        return cls(
+            np.concatenate([b.cents for b in batches]),
+            np.concatenate([b.days for b in batches]),
+            np.concatenate(desc_parts),
+            np.asarray(uniques, dtype=object),
+            np.concatenate([b.row_index for b in batches]),
+            np.concatenate([b.ids for b in batches]) if has_ids else None
+        )
+
+    def take(self, positions: np.ndarray) -> 'TransactionBatch':
+        """Subconjunto das posições indicadas (descrições compartilhadas)"""
+        return TransactionBatch(
+            self.cents[positions],
+            self.days[positions],
+            self.desc_ids[positions],
+            self.descriptions,
+            self.row_index[positions],
+            None if self.ids is None else self.ids[positions]
+        )
+
+    def description_values(self) -> np.ndarray:
+        """Descrição de cada linha (None para nulas)"""
+        values = np.empty(len(self), dtype=object)
+        valid = self.desc_ids >= 0
+        values[valid] = self.descriptions[self.desc_ids[valid]]
+        return values
+
+    def to_frame(self, date_col: str = 'Data', value_col: str = 'Valor', desc_col: str = 'Descricao',
+                 id_col: Optional[str] = None) -> pd.DataFrame:
+        """Reconstrói um DataFrame (usado apenas na serialização)"""
+        dates = np.full(len(self), np.datetime64('NaT'), dtype='datetime64[ns]')
+        valid_days = self.days != INVALID_DAY
+        dates[valid_days] = self.days[valid_days].astype('datetime64[D]')
+        values = np.full(len(self), np.nan)
+        valid_cents = self.cents != INVALID_CENTS
+        values[valid_cents] = self.cents[valid_cents] / 100.0
+
+        data = {date_col: dates, desc_col: self.description_values(), value_col: values}
+        if id_col and self.ids is not None:
+            data[id_col] = self.ids
+        return pd.DataFrame(data)
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos arrays numéricos do lote"""
+        total = self.cents.nbytes + self.days.nbytes + self.desc_ids.nbytes + self.row_index.nbytes
+        return total + self.descriptions.nbytes
+
+    def __len__(self) -> int:
+        return len(self.cents)
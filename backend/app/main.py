@@ -1,12 +1,35 @@
-from fastapi import FastAPI, File, UploadFile, Form  # ← Form adicionado
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, Request, UploadFile, Form  # ← Form adicionado
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
+import pyarrow as pa
+import contextlib
+import logging
+import mmap
+import time
 import tempfile
+import shutil
 import os
+from typing import BinaryIO, Iterator, Literal, Optional
+from app.core.assignment import ASSIGNMENT_MODES
+from app.core.cache import DEFAULT_CACHE_DIR, ReconciliationCache
 from app.core.csv_processor import CSVProcessor
+from app.core.incremental import IncrementalReconciler
+from app.core.job_manager import JobManager, QueueFullError
+from app.core.ledger_index import DEFAULT_LEDGER_DIR, LedgerStore
+from app.core.metrics import REGISTRY
 from app.core.pdf_processor import PDFProcessor
-from app.core.reconciliation_processor import ReconciliationProcessor  # ← Nova importação
+from app.core.reconciliation_processor import MATCH_TIERS, ReconciliationProcessor, reconcile_files  # ← Nova importação
+from app.core.result_store import DEFAULT_PAGE_SIZE, DEFAULT_RESULT_DIR, ResultStore
+from app.core.similarity import SCORERS
+from app.core.tracing import configure_logging, debug_enabled, trace
+
+# RECONCILE_DEBUG=1 liga os logs de depuração (e as estatísticas caras que só eles usam)
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Opções validadas pelo FastAPI (422 com as opções aceitas em vez de ValueError no processador)
+ScorerName = Literal[tuple(SCORERS)]
+AssignmentMode = Literal[ASSIGNMENT_MODES]
 
 app = FastAPI(
     title="Sistema de Conciliação Bancária",
@@ -22,6 +45,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latência das requisições por endpoint", ("method", "path", "status")
+)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Histograma de latência por rota (o template da rota, não o caminho com ids)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        path=route.path if route is not None else "unmatched",
+        status=str(response.status_code)
+    )
+    return response
+
+# Pool limitado de processos para as conciliações assíncronas (/jobs)
+job_manager = JobManager(
+    max_workers=int(os.environ.get("RECONCILE_WORKERS", "0")) or None,
+    max_pending=int(os.environ.get("RECONCILE_MAX_PENDING", "8"))
+)
+
+# Cache de entradas normalizadas e resultados; o diretório é compartilhado com os workers
+cache_dir = os.environ.get("RECONCILE_CACHE_DIR", DEFAULT_CACHE_DIR)
+reconcile_cache = ReconciliationCache(
+    cache_dir,
+    max_bytes=int(os.environ.get("RECONCILE_CACHE_MAX_MB", "1024")) * 1024 * 1024
+)
+
+# Razões internos registrados (mmap); o diretório é compartilhado entre os workers do uvicorn
+ledger_store = LedgerStore(os.environ.get("RECONCILE_LEDGER_DIR", DEFAULT_LEDGER_DIR))
+
+# Resultados consultados por página ou em streaming a partir do result_id; gravados em um
+# diretório compartilhado, então qualquer worker (ou o processo reiniciado) encontra o resultado
+result_store = ResultStore(
+    int(os.environ.get("RECONCILE_RESULT_STORE_ITEMS", "32")),
+    directory=os.environ.get("RECONCILE_RESULT_DIR", DEFAULT_RESULT_DIR),
+    max_bytes=int(os.environ.get("RECONCILE_RESULT_STORE_MAX_MB", "2048")) * 1024 * 1024
+)
+
+# Estado da conciliação incremental (criado na primeira requisição)
+_incremental: Optional[IncrementalReconciler] = None
+
+def _incremental_reconciler() -> IncrementalReconciler:
+    global _incremental
+    if _incremental is None:
+        _incremental = IncrementalReconciler(
+            os.environ.get("RECONCILE_STATE_URL", "sqlite:///conciliacao_estado.db")
+        )
+    return _incremental
+
+@app.on_event("shutdown")
+def shutdown_job_manager():
+    job_manager.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Sistema de Conciliação Bancária API"}
@@ -30,33 +110,68 @@ async def root():
 async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/metrics")
+def metrics():
+    """Métricas do processo da API no formato texto do Prometheus (etapas e latência por endpoint).
+    
+    Jobs rodam em outros processos e suas etapas não aparecem aqui.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def _match_tiers(split_payments: bool, description_matching: bool = False) -> tuple:
+    """Camadas padrão, mais as opcionais pedidas (descrição antes de pagamentos divididos)"""
+    tiers = MATCH_TIERS
+    if description_matching:
+        tiers += ('description',)
+    if split_payments:
+        tiers += ('split',)
+    return tiers
+
+@contextlib.contextmanager
+def _upload_stream(upload: UploadFile) -> Iterator[BinaryIO]:
+    """Lê o upload sem cópias: o buffer em memória do SpooledTemporaryFile ou, se ele
+    já foi para disco, um mmap somente leitura do arquivo temporário"""
+    spooled = upload.file
+    spooled.seek(0)
+    if not getattr(spooled, '_rolled', False) or os.fstat(spooled.fileno()).st_size == 0:
+        yield spooled
+        return
+    
+    mapped = mmap.mmap(spooled.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield mapped
+    finally:
+        mapped.close()
+
+def _upload_path(upload: UploadFile) -> Optional[str]:
+    """Caminho do upload que já foi para disco, para processos de um pool abrirem o
+    arquivo sem cópia; None se ele ainda está em memória. O temporário do
+    SpooledTemporaryFile costuma não ter nome, então usa-se o link do descritor em /proc"""
+    spooled = upload.file
+    if not getattr(spooled, '_rolled', False):
+        return None
+    spooled.flush()
+    name = getattr(spooled._file, 'name', None)
+    if isinstance(name, str) and os.path.exists(name):
+        return name
+    path = f"/proc/{os.getpid()}/fd/{spooled.fileno()}"
+    return path if os.path.exists(path) else None
+
 @app.post("/upload/csv")
-async def upload_csv(file: UploadFile = File(...)):
-    """Endpoint para upload de arquivos CSV"""
+def upload_csv(file: UploadFile = File(...), bank: str = Form(None)):
+    """Endpoint para upload de arquivos CSV (lido direto do upload, sem arquivo temporário)"""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
-        
         processor = CSVProcessor()
-        df = processor.read_csv(tmp_path)
+        with _upload_stream(file) as stream:
+            df = processor.read_csv(stream, bank=bank)
         df_clean = processor.standardize_data(df)
         
-        os.unlink(tmp_path)
-        
-        # Prepara os dados para JSON (converte datas para string)
-        preview_data = df_clean.head(5).copy()
-        for col in preview_data.columns:
-            # Se for datetime ou timestamp, converte para string
-            if str(preview_data[col].dtype).startswith('datetime'):
-                preview_data[col] = preview_data[col].dt.strftime('%Y-%m-%d')
-        
+        # Datas tipadas só viram texto aqui, na saída JSON
         return JSONResponse({
             "filename": file.filename,
             "columns": df_clean.columns.tolist(),
             "row_count": len(df_clean),
-            "preview": preview_data.to_dict(orient="records")
+            "preview": processor.prepare_for_json(df_clean.head(5))
         })
         
     except Exception as e:
@@ -66,24 +181,24 @@ async def upload_csv(file: UploadFile = File(...)):
         )
 
 @app.post("/upload/pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    """Endpoint para upload de arquivos PDF"""
+def upload_pdf(file: UploadFile = File(...)):
+    """Endpoint para upload de arquivos PDF (lido direto do upload, sem arquivo temporário)"""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
-        
-        processor = PDFProcessor()
-        text = processor.extract_text_from_pdf(tmp_path)
+        processor = PDFProcessor(workers=int(os.environ.get("PDF_WORKERS", "1")))
+        # O pool de páginas só roda com caminho: upload em disco vai por caminho, em memória por stream
+        path = _upload_path(file) if processor.workers > 1 else None
+        if path is not None:
+            text = processor.extract_text_from_pdf(path)
+        else:
+            with _upload_stream(file) as stream:
+                text = processor.extract_text_from_pdf(stream)
         df = processor.parse_bank_statement(text)
         
-        os.unlink(tmp_path)
-        
         return JSONResponse({
             "filename": file.filename,
             "text_length": len(text),
             "transactions_count": len(df),
+            "layout": df.attrs.get("layout"),
             "preview_text": text[:200] + "..." if len(text) > 200 else text,
             "preview_data": df.head().to_dict(orient="records") if not df.empty else []
         })
@@ -95,61 +210,55 @@ async def upload_pdf(file: UploadFile = File(...)):
         )
 
 @app.post("/reconcile")
-async def reconcile_transactions(
+def reconcile_transactions(
     bank_file: UploadFile = File(...),
-    internal_file: UploadFile = File(...),
+    internal_file: UploadFile = File(None),
+    ledger_id: str = Form(None),
     date_col: str = Form("Data"),
     value_col: str = Form("Valor"),
     desc_col: str = Form("Descricao"),
     id_col: str = Form(None),
     date_tolerance: int = Form(1),
     value_tolerance: float = Form(0.01),
-    similarity_threshold: float = Form(0.8)
+    similarity_threshold: float = Form(0.8),
+    scorer: ScorerName = Form("ratio"),
+    assignment_mode: AssignmentMode = Form("optimal"),
+    split_payments: bool = Form(False),
+    description_matching: bool = Form(False),
+    canonical_descriptions: bool = Form(False),
+    page_size: int = Form(DEFAULT_PAGE_SIZE)
 ):
-    """Endpoint para conciliação de transações"""
+    """Endpoint síncrono para conciliação de transações (arquivos pequenos).
+    
+    Definido como função síncrona para rodar no threadpool, sem bloquear o event loop.
+    O lado interno é o ``internal_file`` ou um razão registrado em /ledgers (``ledger_id``).
+    Retorna o summary e a primeira página de cada categoria; o restante é lido em
+    /results/{result_id}/{categoria} (paginado) ou .../stream (NDJSON).
+    """
+    ledger = None
     try:
-        print(f"🔍 Iniciando conciliação...")
-        print(f"📋 Config: date_col={date_col}, value_col={value_col}, desc_col={desc_col}, id_col={id_col}")
-        
-        # Processar arquivo do banco
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_bank:
-            content = await bank_file.read()
-            tmp_bank.write(content)
-            tmp_bank_path = tmp_bank.name
-        
-        bank_processor = CSVProcessor()
-        bank_df = bank_processor.read_csv(tmp_bank_path)
-        print(f"📊 Banco: {len(bank_df)} transações")
-        bank_df_clean = bank_processor.standardize_data(bank_df)
-        print(f"✅ Banco processado: {len(bank_df_clean)} transações")
-        
-        # Processar arquivo interno
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_internal:
-            content = await internal_file.read()
-            tmp_internal.write(content)
-            tmp_internal_path = tmp_internal.name
-        
-        internal_processor = CSVProcessor()
-        internal_df = internal_processor.read_csv(tmp_internal_path)
-        print(f"📊 Sistema: {len(internal_df)} transações")
-        internal_df_clean = internal_processor.standardize_data(internal_df)
-        print(f"✅ Sistema processado: {len(internal_df_clean)} transações")
-        
-        # Limpar arquivos temporários
-        os.unlink(tmp_bank_path)
-        os.unlink(tmp_internal_path)
-        
-        # Verificar se os DataFrames não estão vazios
-        if bank_df_clean.empty:
-            raise ValueError("DataFrame do banco está vazio após processamento")
-        if internal_df_clean.empty:
-            raise ValueError("DataFrame do sistema interno está vazio após processamento")
+        if ledger_id:
+            ledger = ledger_store.get(ledger_id)
+            if ledger is None:
+                return JSONResponse({"error": f"Razão {ledger_id} não encontrado"}, status_code=404)
+        elif internal_file is None:
+            return JSONResponse({"error": "Envie internal_file ou ledger_id"}, status_code=400)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    try:
+        logger.debug("📋 Config: date_col=%s, value_col=%s, desc_col=%s, id_col=%s", date_col, value_col, desc_col, id_col)
         
         # Configurar processador de conciliação
         processor = ReconciliationProcessor(
             date_tolerance_days=date_tolerance,
             value_tolerance=value_tolerance,
-            similarity_threshold=similarity_threshold
+            similarity_threshold=similarity_threshold,
+            scorer=scorer,
+            assignment_mode=assignment_mode,
+            match_tiers=_match_tiers(split_payments, description_matching),
+            canonical_descriptions=canonical_descriptions,
+            cache=reconcile_cache
         )
         
         config = {
@@ -159,23 +268,287 @@ async def reconcile_transactions(
             'id_col': id_col if id_col else None
         }
         
-        print(f"🔧 Executando algoritmo de conciliação...")
-        # Executar conciliação
-        results = processor.reconcile(bank_df_clean, internal_df_clean, config)
-        
-        print(f"🎯 Conciliação concluída: {results['summary']['matched_count']} matches")
-        return JSONResponse(results)
+        # Os uploads são lidos em blocos direto do arquivo recebido; reexecuções
+        # sobre os mesmos arquivos reaproveitam entradas e resultados do cache
+        with trace() as run_trace:
+            if ledger is not None:
+                with _upload_stream(bank_file) as bank_stream:
+                    result = processor.reconcile_ledger(bank_stream, ledger, config)
+            else:
+                with _upload_stream(bank_file) as bank_stream, _upload_stream(internal_file) as internal_stream:
+                    result = processor.reconcile_sources(bank_stream, internal_stream, config)
+            
+            logger.info("🎯 Conciliação concluída: %d matches", result.summary['matched_count'])
+            result_id = result_store.put(result)
+            response = result.first_page(result_id, page_size)
+        if debug_enabled():
+            response['trace'] = run_trace.to_list()
+        return ORJSONResponse(response)
         
     except Exception as e:
-        print(f"❌ ERRO na conciliação: {str(e)}")
-        import traceback
-        traceback.print_exc()  # Isso mostrará o traceback completo no terminal
+        logger.exception("❌ ERRO na conciliação: %s", e)
         
         return JSONResponse(
             {"error": f"Erro na conciliação: {str(e)}"},
             status_code=500
         )
 
+@app.post("/ledgers")
+def register_ledger(
+    internal_file: UploadFile = File(...),
+    name: str = Form(None),
+    date_col: str = Form("Data"),
+    value_col: str = Form("Valor"),
+    desc_col: str = Form("Descricao"),
+    id_col: str = Form(None)
+):
+    """Registra o razão do sistema interno uma vez; as conciliações passam a usá-lo por ``ledger_id``"""
+    config = {
+        'date_col': date_col,
+        'value_col': value_col,
+        'desc_col': desc_col,
+        'id_col': id_col if id_col else None
+    }
+    try:
+        with _upload_stream(internal_file) as stream:
+            _, batch = ReconciliationProcessor()._load_batch(stream, config, 'sistema interno')
+        ledger = ledger_store.register(batch, config, name)
+        return JSONResponse(ledger.meta, status_code=201)
+    except (ValueError, pa.ArrowException) as e:
+        # Colunas ausentes ou dados que não viram lote/arquivos do razão
+        logger.warning("⚠️ Razão rejeitado: %s", e)
+        return JSONResponse({"error": f"Dados do razão inválidos: {str(e)}"}, status_code=400)
+    except Exception as e:
+        logger.exception("❌ ERRO ao registrar razão: %s", e)
+        return JSONResponse({"error": f"Erro ao registrar razão: {str(e)}"}, status_code=500)
+
+@app.get("/ledgers")
+def list_ledgers():
+    """Razões registrados"""
+    return JSONResponse(ledger_store.list())
+
+@app.get("/ledgers/{ledger_id}")
+def get_ledger(ledger_id: str):
+    """Metadados de um razão registrado"""
+    try:
+        ledger = ledger_store.get(ledger_id)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if ledger is None:
+        return JSONResponse({"error": f"Razão {ledger_id} não encontrado"}, status_code=404)
+    return JSONResponse(ledger.meta)
+
+@app.delete("/ledgers/{ledger_id}")
+def delete_ledger(ledger_id: str):
+    """Remove um razão registrado"""
+    try:
+        deleted = ledger_store.delete(ledger_id)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if not deleted:
+        return JSONResponse({"error": f"Razão {ledger_id} não encontrado"}, status_code=404)
+    return JSONResponse({"ledger_id": ledger_id, "deleted": True})
+
+@app.get("/results/{result_id}")
+def get_result_summary(result_id: str, page_size: int = DEFAULT_PAGE_SIZE):
+    """Summary e primeira página de cada categoria de um resultado"""
+    result = result_store.get(result_id)
+    if result is None:
+        return JSONResponse({"error": f"Resultado {result_id} não encontrado (inexistente ou expirado)"}, status_code=404)
+    return ORJSONResponse(result.first_page(result_id, page_size))
+
+@app.get("/results/{result_id}/{category}")
+def get_result_page(
+    result_id: str,
+    category: str,
+    cursor: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    match_type: Optional[str] = None
+):
+    """Página de uma categoria (matched, exceptions, bank_only, internal_only).
+    
+    ``cursor`` vem do ``next_cursor`` da página anterior; os filtros de score e
+    match_type valem para matched e exceptions.
+    """
+    result = result_store.get(result_id)
+    if result is None:
+        return JSONResponse({"error": f"Resultado {result_id} não encontrado (inexistente ou expirado)"}, status_code=404)
+    try:
+        return ORJSONResponse(result.page(category, cursor, limit, min_score, max_score, match_type))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+@app.get("/results/{result_id}/{category}/stream")
+def stream_result(
+    result_id: str,
+    category: str,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    match_type: Optional[str] = None
+):
+    """Categoria inteira em NDJSON (um registro por linha), serializada em blocos"""
+    result = result_store.get(result_id)
+    if result is None:
+        return JSONResponse({"error": f"Resultado {result_id} não encontrado (inexistente ou expirado)"}, status_code=404)
+    try:
+        selected = result.selection(category, min_score, max_score, match_type)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return StreamingResponse(result.iter_ndjson(category, selected), media_type="application/x-ndjson")
+
+@app.post("/reconcile/incremental")
+def reconcile_incremental(
+    account: str = Form(...),
+    bank_file: UploadFile = File(...),
+    internal_file: UploadFile = File(...),
+    date_col: str = Form("Data"),
+    value_col: str = Form("Valor"),
+    desc_col: str = Form("Descricao"),
+    id_col: str = Form(None),
+    date_tolerance: int = Form(1),
+    value_tolerance: float = Form(0.01),
+    similarity_threshold: float = Form(0.8),
+    scorer: ScorerName = Form("ratio"),
+    assignment_mode: AssignmentMode = Form("optimal"),
+    split_payments: bool = Form(False),
+    description_matching: bool = Form(False),
+    canonical_descriptions: bool = Form(False)
+):
+    """Conciliação incremental: concilia só as linhas ainda não vistas da conta contra os itens em aberto"""
+    try:
+        config = {
+            'date_col': date_col,
+            'value_col': value_col,
+            'desc_col': desc_col,
+            'id_col': id_col if id_col else None
+        }
+        processor = ReconciliationProcessor(
+            date_tolerance_days=date_tolerance,
+            value_tolerance=value_tolerance,
+            similarity_threshold=similarity_threshold,
+            scorer=scorer,
+            assignment_mode=assignment_mode,
+            match_tiers=_match_tiers(split_payments, description_matching),
+            canonical_descriptions=canonical_descriptions,
+            cache=reconcile_cache
+        )
+        with _upload_stream(bank_file) as bank_stream, _upload_stream(internal_file) as internal_stream:
+            _, bank = processor._load_batch(bank_stream, config, 'banco')
+            _, internal = processor._load_batch(internal_stream, config, 'sistema interno')
+        
+        results = _incremental_reconciler().reconcile(account, bank, internal, config, processor)
+        logger.info("🎯 Conciliação incremental (%s): %d novos matches", account, results['summary']['matched_count'])
+        return JSONResponse(results)
+        
+    except Exception as e:
+        logger.exception("❌ ERRO na conciliação incremental: %s", e)
+        return JSONResponse(
+            {"error": f"Erro na conciliação incremental: {str(e)}"},
+            status_code=500
+        )
+
+
+def _spool_upload(upload: UploadFile) -> str:
+    """Copia o upload em blocos para um arquivo temporário nomeado (o worker de outro
+    processo precisa de um caminho) e retorna o caminho; o arquivo é removido se a cópia falhar"""
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            upload.file.seek(0)
+            shutil.copyfileobj(upload.file, tmp_file)
+    except BaseException:
+        _remove_files(path)
+        raise
+    return path
+
+def _remove_files(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+@app.post("/jobs/reconcile", status_code=202)
+def submit_reconcile_job(
+    bank_file: UploadFile = File(...),
+    internal_file: UploadFile = File(...),
+    date_col: str = Form("Data"),
+    value_col: str = Form("Valor"),
+    desc_col: str = Form("Descricao"),
+    id_col: str = Form(None),
+    date_tolerance: int = Form(1),
+    value_tolerance: float = Form(0.01),
+    similarity_threshold: float = Form(0.8),
+    scorer: ScorerName = Form("ratio"),
+    assignment_mode: AssignmentMode = Form("optimal"),
+    split_payments: bool = Form(False),
+    description_matching: bool = Form(False),
+    canonical_descriptions: bool = Form(False)
+):
+    """Submete uma conciliação para execução em background e retorna o id do job"""
+    config = {
+        'date_col': date_col,
+        'value_col': value_col,
+        'desc_col': desc_col,
+        'id_col': id_col if id_col else None
+    }
+    params = {
+        'date_tolerance_days': date_tolerance,
+        'value_tolerance': value_tolerance,
+        'similarity_threshold': similarity_threshold,
+        'scorer': scorer,
+        'assignment_mode': assignment_mode,
+        'match_tiers': _match_tiers(split_payments, description_matching),
+        'canonical_descriptions': canonical_descriptions
+    }
+    
+    # Até o job ser aceito, os temporários são responsabilidade desta requisição
+    paths = []
+    try:
+        paths.append(_spool_upload(bank_file))
+        paths.append(_spool_upload(internal_file))
+        job = job_manager.submit(
+            reconcile_files, paths[0], paths[1], config, params, cache_dir,
+            cleanup=lambda: _remove_files(*paths)
+        )
+    except QueueFullError as e:
+        _remove_files(*paths)
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "30"})
+    except BaseException:
+        _remove_files(*paths)
+        raise
+    
+    logger.info("📨 Job de conciliação submetido: %s", job.job_id)
+    return JSONResponse(job.to_dict(include_result=False), status_code=202)
+
+@app.get("/jobs/{job_id}")
+def get_reconcile_job(job_id: str):
+    """Status e (quando concluído) summary e primeira página do resultado.
+    
+    O resultado fica no result store com o próprio job_id como result_id.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Job {job_id} não encontrado"}, status_code=404)
+    data = job.to_dict(include_result=False)
+    if job.status == 'done':
+        result = result_store.get(job_id)
+        if result is None:
+            result = job.result
+            result_store.put(result, job_id)
+        data['result'] = result.first_page(job_id)
+    return ORJSONResponse(data)
+
+@app.delete("/jobs/{job_id}")
+def cancel_reconcile_job(job_id: str):
+    """Cancela um job em fila ou em execução"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Job {job_id} não encontrado"}, status_code=404)
+    return JSONResponse(job.to_dict(include_result=False))
+
 
 if __name__ == "__main__":
     import uvicorn
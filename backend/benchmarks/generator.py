@@ -0,0 +1,126 @@
+"""Gerador sintético de extratos pareados (banco × sistema interno) para benchmarks.
+
+Uso:
+    python -m benchmarks.generator --rows 10000 --out /tmp/bench
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+
+PREFIXES = ['PIX RECEBIDO', 'PIX ENVIADO', 'TED', 'DOC', 'BOLETO', 'PAGAMENTO', 'TRANSF', 'DEPÓSITO', 'TEF']
+NAMES = ['JOAO SILVA', 'MARIA SOUZA', 'ACME LTDA', 'PADARIA CENTRAL', 'ENEL LUZ', 'SABESP AGUA',
+         'CLARO TELECOM', 'POSTO SHELL', 'MERCADO LIVRE', 'FOLHA PAGAMENTO', 'ALUGUEL SALA 12',
+         'FORNECEDOR ABC', 'CONDOMINIO', 'SEGURO AUTO', 'IMPOSTO DAS']
+# Valores recorrentes (folha, aluguel, PIX fixos) usados nas duplicatas de valor
+RECURRING_AMOUNTS = [1500.00, 2500.00, 100.00, 50.00, 1200.00, 89.90]
+
+
+def _noisy(descriptions: np.ndarray, noise: float, rng: np.random.Generator) -> np.ndarray:
+    """Aplica ruído de descrição: caixa, pontuação, truncamento e troca de caracteres"""
+    out = descriptions.astype(object).copy()
+    for k in np.flatnonzero(rng.random(len(out)) < noise):
+        text = out[k]
+        op = rng.integers(0, 4)
+        if op == 0:
+            text = text.title()
+        elif op == 1:
+            text = text.replace(' ', ' - ', 1)
+        elif op == 2:
+            text = text[:max(4, int(len(text) * 0.7))]
+        else:
+            pos = int(rng.integers(0, len(text)))
+            text = text[:pos] + chr(int(rng.integers(65, 91))) + text[pos + 1:]
+        out[k] = text
+    return out
+
+
+def generate_pair(rows: int, seed: int = 42, duplicate_amount_rate: float = 0.1,
+                  date_jitter_days: int = 1, description_noise: float = 0.3,
+                  id_fraction: float = 0.2, orphan_rate: float = 0.05) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray]:
+    """Gera (banco, interno, gabarito).
+
+    O gabarito é um array (k, 2) com os pares verdadeiros (linha do banco,
+    linha do interno). ``orphan_rate`` das linhas de cada lado não têm par.
+    """
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2025-01-01')
+
+    days = rng.integers(0, 31, rows)
+    amounts = np.round(rng.lognormal(5, 1.2, rows), 2) * np.where(rng.random(rows) < 0.4, -1, 1)
+    recurring = rng.random(rows) < duplicate_amount_rate
+    amounts[recurring] = rng.choice(RECURRING_AMOUNTS, int(recurring.sum()))
+    descriptions = np.array([f"{p} {n}" for p, n in zip(rng.choice(PREFIXES, rows), rng.choice(NAMES, rows))],
+                            dtype=object)
+    ids = np.array([f"TX{seed:03d}{k:08d}" for k in range(rows)], dtype=object)
+
+    bank = pd.DataFrame({
+        'Data': (start + days).astype(str),
+        'Descricao': descriptions,
+        'Valor': amounts,
+        'ID': np.where(rng.random(rows) < id_fraction, ids, None),
+    })
+
+    # Lado interno: mesmas transações com jitter de data, ruído de descrição e ID parcial
+    has_pair = rng.random(rows) >= orphan_rate
+    paired = np.flatnonzero(has_pair)
+    jitter = rng.integers(-date_jitter_days, date_jitter_days + 1, len(paired))
+    internal = pd.DataFrame({
+        'Data': (start + days[paired] + jitter).astype(str),
+        'Descricao': _noisy(descriptions[paired], description_noise, rng),
+        'Valor': amounts[paired],
+        'ID': np.where(pd.notna(bank['ID'].to_numpy()[paired]), ids[paired], None),
+    })
+
+    orphans = int(rows * orphan_rate)
+    internal_orphans = pd.DataFrame({
+        'Data': (start + rng.integers(0, 31, orphans)).astype(str),
+        'Descricao': rng.choice(NAMES, orphans),
+        'Valor': np.round(rng.lognormal(5, 1.2, orphans), 2),
+        'ID': [None] * orphans,
+    })
+    internal = pd.concat([internal, internal_orphans], ignore_index=True)
+
+    # Embaralha o lado interno e traduz o gabarito
+    perm = rng.permutation(len(internal))
+    internal = internal.iloc[perm].reset_index(drop=True)
+    new_position = np.empty(len(perm), dtype=np.int64)
+    new_position[perm] = np.arange(len(perm))
+    truth = np.stack([paired, new_position[:len(paired)]], axis=1)
+
+    return bank, internal, truth
+
+
+def write_pair(out_dir: str, rows: int, **kwargs) -> Dict[str, str]:
+    """Grava banco.csv, interno.csv e gabarito.npy em ``out_dir``"""
+    os.makedirs(out_dir, exist_ok=True)
+    bank, internal, truth = generate_pair(rows, **kwargs)
+    paths = {
+        'bank': os.path.join(out_dir, 'banco.csv'),
+        'internal': os.path.join(out_dir, 'interno.csv'),
+        'truth': os.path.join(out_dir, 'gabarito.npy'),
+    }
+    bank.to_csv(paths['bank'], index=False)
+    internal.to_csv(paths['internal'], index=False)
+    np.save(paths['truth'], truth)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera extratos sintéticos pareados")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--out', default='bench_data')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duplicate-amount-rate', type=float, default=0.1)
+    parser.add_argument('--date-jitter-days', type=int, default=1)
+    parser.add_argument('--description-noise', type=float, default=0.3)
+    parser.add_argument('--id-fraction', type=float, default=0.2)
+    args = parser.parse_args()
+
+    paths = write_pair(args.out, args.rows, seed=args.seed,
+                       duplicate_amount_rate=args.duplicate_amount_rate,
+                       date_jitter_days=args.date_jitter_days,
+                       description_noise=args.description_noise,
+                       id_fraction=args.id_fraction)
+    print(f"Arquivos gerados: {paths}")
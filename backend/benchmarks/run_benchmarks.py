@@ -0,0 +1,187 @@
+"""Benchmark da conciliação por etapa, com memória de pico e precisão/recall.
+
+Cada tamanho roda em um processo novo (memória de pico isolada) sobre dados
+gerados por benchmarks.generator. O resultado é gravado em JSON para comparar
+versões.
+
+Uso (a partir de backend/):
+    python -m benchmarks.run_benchmarks --sizes 1000 10000
+    python -m benchmarks.run_benchmarks --compare antes.json depois.json
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import tempfile
+import time
+import numpy as np
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks.generator import write_pair
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+CONFIG = {'date_col': 'Data', 'value_col': 'Valor', 'desc_col': 'Descricao', 'id_col': 'ID'}
+
+
+def _peak_rss_mb() -> float:
+    """Memória residente de pico do processo, em MB (ru_maxrss é KB no Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _precision_recall(bank_idx: np.ndarray, internal_idx: np.ndarray, truth: np.ndarray,
+                      n_internal: int) -> Dict[str, float]:
+    """Precisão e recall dos pares encontrados contra o gabarito"""
+    predicted = bank_idx.astype(np.int64) * n_internal + internal_idx
+    expected = truth[:, 0].astype(np.int64) * n_internal + truth[:, 1]
+    hits = int(np.isin(predicted, expected).sum())
+    return {
+        'precision': hits / len(predicted) if len(predicted) else 0.0,
+        'recall': hits / len(expected) if len(expected) else 0.0,
+    }
+
+
+def run_size(rows: int, params: Dict, generator_kwargs: Dict) -> Dict:
+    """Executa todas as etapas para um tamanho e retorna tempos, memória e qualidade"""
+    from app.core.csv_processor import CSVProcessor
+    from app.core.reconciliation_processor import ReconciliationProcessor
+
+    stages: Dict[str, Dict[str, float]] = {}
+
+    @contextlib.contextmanager
+    def stage(name: str):
+        start = time.perf_counter()
+        yield
+        stages[name] = {'seconds': time.perf_counter() - start, 'peak_rss_mb': _peak_rss_mb()}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_pair(tmp, rows, **generator_kwargs)
+        truth = np.load(paths['truth'])
+        csv = CSVProcessor()
+        processor = ReconciliationProcessor(**params)
+
+        with stage('read_csv'):
+            bank_raw = csv.read_csv(paths['bank'])
+            internal_raw = csv.read_csv(paths['internal'])
+
+        with stage('standardize_data'):
+            bank_df = csv.standardize_data(bank_raw)
+            internal_df = csv.standardize_data(internal_raw)
+        del bank_raw, internal_raw
+
+        with stage('normalize'):
+            bank = processor._to_batch(bank_df, CONFIG, 'do banco')
+            internal = processor._to_batch(internal_df, CONFIG, 'interno')
+
+        with stage('matching'):
+            matches, tier_stats = processor._match_tiers(bank, internal, use_id=True)
+            matches = matches.take(~matches.is_exception())
+        for tier in tier_stats:
+            stages[f"tier:{tier['tier']}"] = {'seconds': tier['seconds'], 'matched': tier['matched']}
+
+        with stage('serialization'):
+            payload = processor._serialize_matches(
+                processor._rows(bank_df, bank, matches.bank_idx, CONFIG),
+                processor._rows(internal_df, internal, matches.internal_idx, CONFIG),
+                matches
+            )
+            encoded = json.dumps(payload)
+
+    return {
+        'rows': rows,
+        'internal_rows': len(internal),
+        'matched': len(matches),
+        'tiers': tier_stats,
+        'output_bytes': len(encoded),
+        'total_seconds': sum(s['seconds'] for name, s in stages.items() if not name.startswith('tier:')),
+        'peak_rss_mb': _peak_rss_mb(),
+        'stages': stages,
+        **_precision_recall(matches.bank_idx, matches.internal_idx, truth, len(internal)),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecida'
+
+
+def run(sizes: List[int], params: Dict, generator_kwargs: Dict) -> Dict:
+    """Roda cada tamanho em um processo novo e agrega os resultados"""
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for rows in sizes:
+        with ctx.Pool(1) as pool:
+            result = pool.apply(run_size, (rows, params, generator_kwargs))
+        print(f"{rows:>9} linhas: {result['total_seconds']:.2f}s, pico {result['peak_rss_mb']:.0f} MB, "
+              f"precisão {result['precision']:.3f}, recall {result['recall']:.3f}")
+        results.append(result)
+
+    return {
+        'revision': _git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'params': params,
+        'generator': generator_kwargs,
+        'results': results,
+    }
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Imprime a variação de tempo por etapa entre dois arquivos de resultado"""
+    with open(before_path) as f:
+        before = {r['rows']: r for r in json.load(f)['results']}
+    with open(after_path) as f:
+        after = {r['rows']: r for r in json.load(f)['results']}
+
+    for rows in sorted(set(before) & set(after)):
+        print(f"== {rows} linhas")
+        for name, new in after[rows]['stages'].items():
+            old = before[rows]['stages'].get(name)
+            if old:
+                ratio = new['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+                print(f"   {name:<18} {old['seconds']:>9.3f}s -> {new['seconds']:>9.3f}s  ({ratio:.2f}x)")
+        print(f"   {'pico RSS':<18} {before[rows]['peak_rss_mb']:>8.0f}MB -> {after[rows]['peak_rss_mb']:>8.0f}MB")
+        print(f"   {'recall':<18} {before[rows]['recall']:>9.3f} -> {after[rows]['recall']:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da conciliação bancária")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duplicate-amount-rate', type=float, default=0.1)
+    parser.add_argument('--date-jitter-days', type=int, default=1)
+    parser.add_argument('--description-noise', type=float, default=0.3)
+    parser.add_argument('--id-fraction', type=float, default=0.2)
+    parser.add_argument('--similarity-threshold', type=float, default=0.8)
+    parser.add_argument('--assignment-mode', default='optimal')
+    parser.add_argument('--out', default=None, help="Arquivo JSON de saída")
+    parser.add_argument('--compare', nargs=2, metavar=('ANTES', 'DEPOIS'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        generator_kwargs = {
+            'seed': args.seed,
+            'duplicate_amount_rate': args.duplicate_amount_rate,
+            'date_jitter_days': args.date_jitter_days,
+            'description_noise': args.description_noise,
+            'id_fraction': args.id_fraction,
+        }
+        params = {
+            'date_tolerance_days': max(1, args.date_jitter_days),
+            'similarity_threshold': args.similarity_threshold,
+            'assignment_mode': args.assignment_mode,
+        }
+        report = run(args.sizes, params, generator_kwargs)
+
+        out = args.out or os.path.join('benchmarks', 'results', f"bench-{report['revision']}-{int(time.time())}.json")
+        os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+        with open(out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados gravados em {out}")
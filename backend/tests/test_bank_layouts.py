@@ -0,0 +1,34 @@
+from app.core.bank_layouts import detect_layout
+
+ITAU = "\n".join([
+    "Itau Unibanco S.A. - Extrato conta corrente",
+    "Data Lancamento Valor Saldo",
+    "05/01/2025 PIX TRANSF FULANO BRADESCO 05/01 -1.234,56 -234,56",
+    "06/01/2025 TED RECEBIDA ACME 2.000,00",
+])
+
+BRADESCO = "\n".join([
+    "Bradesco - Extrato Mensal",
+    "Data Historico Docto. Credito Debito Saldo",
+    "05/01/2025 TRANSFERENCIA PIX 1234567 -50,00 50,00",
+    "06/01/2025 DEPOSITO 77 500,00 540,00",
+])
+
+
+def test_mention_of_another_bank_does_not_pick_its_layout():
+    assert detect_layout(ITAU).name == 'itau'
+    assert detect_layout("Extrato\n05/01/2025 PIX para conta Bradesco R$ 10,00") is None
+
+
+def test_bradesco_header():
+    assert detect_layout(BRADESCO).name == 'bradesco'
+
+
+def test_best_scoring_layout_wins():
+    # Os fingerprints do Itaú e do Nubank casam; só o perfil Nubank reconhece as linhas
+    nubank = "\n".join([
+        "Nu Pagamentos S.A.",
+        "05 JAN 2025 Total de entradas + 1.500,00",
+        "Transferencia recebida Banco Itau FULANO 1.500,00",
+    ])
+    assert detect_layout(nubank).name == 'nubank'
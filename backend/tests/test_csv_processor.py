@@ -0,0 +1,29 @@
+import io
+
+import pytest
+
+from app.core.csv_processor import SNIFF_BYTES, CSVProcessor
+
+
+def _latin1_after_sample() -> bytes:
+    """CSV latin-1 só com ASCII na amostra e nos primeiros blocos (detectado como UTF-8)"""
+    header = b"Data,Valor,Descricao\n"
+    ascii_rows = b"2025-01-05,1.00,linha\n" * (100 * SNIFF_BYTES // 22)
+    return header + ascii_rows + "2025-01-06,2.00,Pagamento João\n".encode('latin-1')
+
+
+def test_iter_chunks_reads_latin1_past_the_sample():
+    chunks = list(CSVProcessor().iter_chunks(io.BytesIO(_latin1_after_sample()), chunksize=1000))
+    assert chunks[-1]['Descricao'].iloc[-1] == 'Pagamento João'
+
+
+def test_read_csv_reads_latin1_past_the_sample():
+    df = CSVProcessor().read_csv(io.BytesIO(_latin1_after_sample()))
+    assert df['Descricao'].iloc[-1] == 'Pagamento João'
+
+
+def test_read_csv_parse_errors_are_not_retried_as_latin1(caplog):
+    rows = b"2025-01-05,1.00\n" * (2 * SNIFF_BYTES // 16)
+    with pytest.raises(ValueError, match='Expected 2 columns'):
+        CSVProcessor().read_csv(io.BytesIO(b"Data,Valor\n" + rows + b"2025-01-06,2.00,extra\n"))
+    assert 'latin-1' not in caplog.text
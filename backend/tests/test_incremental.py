@@ -0,0 +1,23 @@
+import pandas as pd
+
+from app.core.incremental import IncrementalReconciler
+from app.core.reconciliation_processor import MATCH_TIERS, ReconciliationProcessor
+
+
+def test_split_payment_counts_once_in_totals(tmp_path):
+    reconciler = IncrementalReconciler(f"sqlite:///{tmp_path / 'ledger.db'}")
+    processor = ReconciliationProcessor(match_tiers=MATCH_TIERS + ('split',))
+    bank = pd.DataFrame({
+        'Data': pd.to_datetime(['2025-01-02', '2025-01-03', '2025-01-04']),
+        'Valor': [60.0, 20.0, 7.0],
+        'Descricao': ['Depósito', 'TED X', 'PIX Y'],
+    })
+    internal = pd.DataFrame({
+        'Data': pd.to_datetime(['2025-01-02', '2025-01-02', '2025-01-03', '2025-01-04']),
+        'Valor': [10.0, 50.0, 20.0, 7.0],
+        'Descricao': ['Recebível A', 'Recebível B', 'TED X', 'PIX Y'],
+    })
+
+    summary = reconciler.reconcile('conta', bank, internal, {}, processor)['summary']
+    assert summary['matched_count'] == 3
+    assert summary['total_matched_count'] == 3
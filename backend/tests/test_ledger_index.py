@@ -0,0 +1,17 @@
+import numpy as np
+
+from app.core.ledger_index import LedgerStore
+from app.core.transaction_batch import TransactionBatch
+
+
+def test_mixed_type_ids_are_normalized(tmp_path):
+    batch = TransactionBatch.from_columns(
+        ['2025-01-05', '2025-01-06', '2025-01-07', '2025-01-08'],
+        [100.0, -20.0, 35.5, 1.0],
+        ['PIX A', 'Tarifa', 'TED', 'DOC'],
+        ids=np.array([101, 'abc', 102.0, None], dtype=object),
+    )
+    ledger = LedgerStore(str(tmp_path)).register(batch, {})
+
+    reopened = LedgerStore(str(tmp_path)).get(ledger.ledger_id)
+    assert reopened.batch.ids.tolist() == ['101', 'abc', '102', None]
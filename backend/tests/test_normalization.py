@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+from app.core.normalization import detect_decimal, parse_amounts
+
+
+def test_detect_decimal_ignores_whole_numbers():
+    values = pd.Series(['100', '1.234,56', '-50,25'])
+    assert detect_decimal(values) == ','
+    np.testing.assert_allclose(parse_amounts(values), [100.0, 1234.56, -50.25])
+
+
+def test_detect_decimal_dot_values():
+    values = pd.Series(['100', '1,234.56', '-50.25'])
+    assert detect_decimal(values) == '.'
+    assert detect_decimal(pd.Series(['100', '200'])) == '.'
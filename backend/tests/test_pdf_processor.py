@@ -0,0 +1,27 @@
+import pytest
+
+from app.core.pdf_processor import PDFProcessor
+
+
+@pytest.fixture
+def processor():
+    return PDFProcessor()
+
+
+def _rows(processor, text):
+    df = processor.parse_bank_statement(text, layout=None)
+    return list(zip(df['Descrição'], df['Valor']))
+
+
+def test_separator_dash_is_not_a_sign(processor):
+    assert _rows(processor, "05/01/2025 PIX RECEBIDO - R$ 100,00") == [("PIX RECEBIDO -", 100.0)]
+
+
+def test_attached_signs(processor):
+    text = "05/01/2025 Tarifa -R$ 5,00\n05/01/2025 Saque R$ -10,00\n05/01/2025 Juros R$ 1,50-"
+    assert [value for _, value in _rows(processor, text)] == [-5.0, -10.0, -1.5]
+
+
+def test_dc_flag_requires_space_or_end(processor):
+    text = "05/01/2025 TED R$ 12,34 C/C 123\n05/01/2025 Compra R$ 7,00 D\n05/01/2025 R$ 100,00 D"
+    assert _rows(processor, text) == [("TED  C/C 123", 12.34), ("Compra", -7.0), ("", -100.0)]
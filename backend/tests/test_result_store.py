@@ -0,0 +1,31 @@
+import pandas as pd
+
+from app.core.reconciliation_processor import ReconciliationProcessor
+from app.core.result_store import CATEGORIES, ResultStore
+
+
+def _result():
+    bank = pd.DataFrame({
+        'Data': pd.to_datetime(['2025-01-05', '2025-01-06', '2025-01-07']),
+        'Valor': [100.0, -20.0, 35.5],
+        'Descricao': ['PIX A', 'Tarifa', 'TED C'],
+        'Extra': ['x', 'y', 'z'],
+    })
+    internal = bank.iloc[:2].copy()
+    return ReconciliationProcessor().reconcile_result(bank, internal, {})
+
+
+def test_results_are_shared_through_the_directory(tmp_path):
+    result = _result()
+    result_id = ResultStore(directory=str(tmp_path)).put(result)
+
+    # Outro worker (ou o processo reiniciado): memória vazia, mesmo diretório
+    other = ResultStore(directory=str(tmp_path)).get(result_id)
+    assert other is not None
+    assert other.summary == result.summary
+    for category in CATEGORIES:
+        assert other.page(category, 0, 10) == result.page(category, 0, 10)
+
+
+def test_unknown_result_id(tmp_path):
+    assert ResultStore(directory=str(tmp_path)).get('desconhecido') is None
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
+import { fetchResultPage } from '../services/reconciliationService';
 
 const Reconciliation = () => {
   const location = useLocation();
@@ -12,6 +13,7 @@ const Reconciliation = () => {
   const [results, setResults] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(null);
 
   useEffect(() => {
     // Verificar se os dados essenciais existem
@@ -44,7 +46,14 @@ const Reconciliation = () => {
         });
 
         // Dados de exemplo baseados nos dados reais
+        // Mesmo formato de /reconcile: primeira página de cada categoria, totais em summary
         const mockResults = {
+          result_id: null,
+          next_cursors: { matched: null, exceptions: null, bank_only: null, internal_only: null },
+          totals: { matched: Math.min(3, bankData.length), exceptions: 0,
+                    bank_only: Math.min(2, Math.max(0, bankData.length - 3)),
+                    internal_only: Math.min(2, Math.max(0, systemData.length - 3)) },
+          exceptions: [],
           matched: bankData.slice(0, 3).map((row, index) => ({
             bank_transaction: Object.fromEntries(
               row.map((value, i) => [`Column ${i + 1}`, value])
@@ -82,6 +91,52 @@ const Reconciliation = () => {
     }, 1500);
   };
 
+  // Próxima página de uma categoria (GET /results/{result_id}/{categoria})
+  const loadMore = async (category) => {
+    const cursor = results?.next_cursors?.[category];
+    if (!results?.result_id || cursor === null || cursor === undefined) return;
+
+    setLoadingMore(category);
+    try {
+      const page = await fetchResultPage(results.result_id, category, cursor);
+      setResults(prev => ({
+        ...prev,
+        [category]: [...prev[category], ...page.items],
+        next_cursors: { ...prev.next_cursors, [category]: page.next_cursor }
+      }));
+    } catch (err) {
+      console.error('❌ Erro ao carregar página:', err);
+      setError('Erro ao carregar resultados: ' + err.message);
+    } finally {
+      setLoadingMore(null);
+    }
+  };
+
+  const renderCategory = (category, title) => {
+    const total = results.totals?.[category] ?? results[category].length;
+    return (
+      <div>
+        <h3 className="text-lg font-semibold mb-3">
+          {title} ({results[category].length} de {total})
+        </h3>
+        <div className="bg-gray-50 rounded-lg p-4">
+          <pre className="text-sm overflow-auto">
+            {JSON.stringify(results[category], null, 2)}
+          </pre>
+        </div>
+        {results.result_id && results.next_cursors?.[category] != null && (
+          <button
+            onClick={() => loadMore(category)}
+            disabled={loadingMore === category}
+            className="mt-2 px-4 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-600 disabled:opacity-50"
+          >
+            {loadingMore === category ? 'Carregando...' : 'Carregar mais'}
+          </button>
+        )}
+      </div>
+    );
+  };
+
   if (!bankData || !systemData) {
     return (
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">
@@ -185,32 +240,11 @@ const Reconciliation = () => {
         {/* Resultados */}
         {results && (
           <div className="space-y-6">
-            <div>
-              <h3 className="text-lg font-semibold mb-3">Transações Conciliadas ({results.matched.length})</h3>
-              <div className="bg-gray-50 rounded-lg p-4">
-                <pre className="text-sm overflow-auto">
-                  {JSON.stringify(results.matched, null, 2)}
-                </pre>
-              </div>
-            </div>
-
-            <div>
-              <h3 className="text-lg font-semibold mb-3">Apenas no Banco ({results.bank_only.length})</h3>
-              <div className="bg-gray-50 rounded-lg p-4">
-                <pre className="text-sm overflow-auto">
-                  {JSON.stringify(results.bank_only, null, 2)}
-                </pre>
-              </div>
-            </div>
-
-            <div>
-              <h3 className="text-lg font-semibold mb-3">Apenas no Sistema ({results.internal_only.length})</h3>
-              <div className="bg-gray-50 rounded-lg p-4">
-                <pre className="text-sm overflow-auto">
-                  {JSON.stringify(results.internal_only, null, 2)}
-                </pre>
-              </div>
-            </div>
+            {/* As listas trazem só as páginas já carregadas; o total de cada uma vem em `totals` */}
+            {renderCategory('matched', 'Transações Conciliadas')}
+            {results.exceptions.length > 0 && renderCategory('exceptions', 'Exceções')}
+            {renderCategory('bank_only', 'Apenas no Banco')}
+            {renderCategory('internal_only', 'Apenas no Sistema')}
           </div>
         )}
 
@@ -1,4 +1,33 @@
 // services/reconciliationService.js
+import axios from 'axios';
+
+const API_URL = 'http://localhost:8000';
+
+// Categorias paginadas do resultado (mesmos nomes da API)
+export const RESULT_CATEGORIES = ['matched', 'exceptions', 'bank_only', 'internal_only'];
+
+// POST /reconcile: devolve só a primeira página de cada categoria.
+// Os totais de linhas ficam em `totals[categoria]`, os indicadores em `summary`
+// e o restante vem de fetchResultPage com o cursor em `next_cursors[categoria]`.
+export async function reconcileFiles(bankFile, internalFile, config = {}) {
+  const form = new FormData();
+  form.append('bank_file', bankFile);
+  form.append('internal_file', internalFile);
+  Object.entries(config).forEach(([key, value]) => {
+    if (value !== null && value !== undefined) form.append(key, value);
+  });
+  const { data } = await axios.post(`${API_URL}/reconcile`, form);
+  return data;
+}
+
+// GET /results/{result_id}/{categoria}: { items, next_cursor, total }
+export async function fetchResultPage(resultId, category, cursor = 0, limit = 100) {
+  const { data } = await axios.get(`${API_URL}/results/${resultId}/${category}`, {
+    params: { cursor, limit }
+  });
+  return data;
+}
+
 export class ReconciliationProcessor {
   constructor(date_tolerance_days = 1, value_tolerance = 0.01, similarity_threshold = 0.8) {
     this.date_tolerance_days = date_tolerance_days;
@@ -37,10 +66,15 @@ export class ReconciliationProcessor {
     // Implementação adaptada para JavaScript puro...
     // Esta é uma versão simplificada para o contexto do navegador
     
+    // Mesmo formato da resposta de /reconcile (primeira página + summary)
     const results = {
+      result_id: null,
       matched: [],
+      exceptions: [],
       bank_only: [],
       internal_only: [],
+      next_cursors: { matched: null, exceptions: null, bank_only: null, internal_only: null },
+      totals: { matched: 0, exceptions: 0, bank_only: 0, internal_only: 0 },
       summary: {
         total_bank_transactions: bank_df.length,
         total_internal_transactions: internal_df.length,